@@ -0,0 +1,54 @@
+"""Compare loading the dashboard through five endpoint calls with one /api/v1/dashboard call.
+
+    python benchmarks/dashboard_bench.py --base-url http://localhost:8000 --interval 3 --token-id 1
+
+The separate endpoints are requested one after another, the way the frontend
+does. Start the API with RESPONSE_CACHE_MAX_ENTRIES=0 to measure the queries
+themselves rather than cache hits.
+"""
+import argparse, asyncio, statistics, time
+import httpx
+
+async def separate_calls(client, interval, token_id, limit):
+    await client.get("/api/v1/time-based-data", params={"interval": interval})
+    await client.get("/api/v1/top-buyers-sellers", params={"interval": interval, "limit": limit})
+    await client.get("/api/v1/marketplace-comparison", params={"interval": interval})
+    await client.get("/api/v1/top-resale-token", params={"interval": interval, "limit": limit})
+    if token_id is not None:
+        await client.get("/api/v1/token-transaction", params={"token_id": token_id, "interval": interval})
+
+async def dashboard_call(client, interval, token_id, limit):
+    params = {"interval": interval, "limit": limit}
+    if token_id is not None:
+        params["token_id"] = token_id
+    response = await client.get("/api/v1/dashboard", params=params)
+    response.raise_for_status()
+
+async def measure(load, client, args):
+    timings = []
+    for _ in range(args.rounds):
+        started = time.perf_counter()
+        await load(client, args.interval, args.token_id, args.limit)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+def summarize(name, timings):
+    timings = sorted(timings)
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(f"{name:<16} median {statistics.median(timings):8.1f} ms   p95 {p95:8.1f} ms   ({len(timings)} rounds)")
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--interval", type=int, default=3)
+    parser.add_argument("--token-id", default=None)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=5)
+    args = parser.parse_args()
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60) as client:
+        summarize("separate calls", await measure(separate_calls, client, args))
+        summarize("dashboard", await measure(dashboard_call, client, args))
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,59 @@
+"""Measure the API process's peak RSS while exporting growing date ranges.
+
+    python benchmarks/export_rss.py --pid $(pgrep -f "uvicorn src.api.main") --format csv --days 30 365 1000 5000
+
+For each range the peak RSS of the API process (VmHWM) is reset, the export
+is downloaded and discarded, and the peak is read again. With the
+server-side cursor the peak should stay flat while rows and bytes grow.
+Run it on the same host as the API (it reads /proc/<pid>); resetting the
+peak needs permission to write /proc/<pid>/clear_refs (same user or root).
+"""
+import argparse, time
+from datetime import date, timedelta
+import httpx
+
+def read_status(pid, field):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) // 1024
+    return None
+
+def reset_peak(pid):
+    try:
+        with open(f"/proc/{pid}/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--pid", type=int, required=True, help="PID of the API worker serving the export")
+    parser.add_argument("--format", default="csv", choices=["csv", "ndjson", "parquet"])
+    parser.add_argument("--compress", action="store_true")
+    parser.add_argument("--days", type=int, nargs="+", default=[30, 365, 1000, 5000])
+    args = parser.parse_args()
+
+    end = date.today()
+    print(f"{'days':>6} {'lines':>10} {'MB sent':>9} {'seconds':>8} {'peak RSS MB':>12}")
+    with httpx.Client(base_url=args.base_url, timeout=None) as client:
+        for days in args.days:
+            if not reset_peak(args.pid):
+                print("Cannot reset the peak RSS; the numbers below are cumulative peaks.")
+            params = {"start": str(end - timedelta(days=days)), "end": str(end), "format": args.format, "compress": args.compress}
+
+            started = time.perf_counter()
+            lines = size = 0
+            with client.stream("GET", "/api/v1/export", params=params) as response:
+                response.raise_for_status()
+                for chunk in response.iter_raw():
+                    size += len(chunk)
+                    lines += chunk.count(b"\n")
+            elapsed = time.perf_counter() - started
+
+            print(f"{days:>6} {lines if args.format != 'parquet' and not args.compress else '-':>10} {size / 2**20:>9.1f} {elapsed:>8.1f} {read_status(args.pid, 'VmHWM'):>12}")
+
+if __name__ == "__main__":
+    main()
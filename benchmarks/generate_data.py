@@ -0,0 +1,170 @@
+"""Fill a local MySQL database with seeded synthetic BAYC sales for load tests.
+
+    python benchmarks/generate_data.py --transactions 1000000 --seed 1 --reset
+    python benchmarks/generate_data.py --transactions 10000000 --seed 1 --reset
+
+Writes markets, actions, addresses and transactions into the database in .env
+(DB_HOST, ...) through the ETL's own loader, then rebuilds every derived table
+(rollups, leaderboards, token summaries, address stats), bumps the data
+version and publishes the snapshot, exactly like `rebuild.py` does. The same
+seed and sizes always give the same rows, so reports from
+benchmarks/load_test.py taken on different releases are comparable.
+
+Sales are spread over the --days before now, at the same offsets from now on
+every run, so each interval covers the same rows whenever they are generated;
+token ids are uniform over 0-9999, buyers follow a long-tailed distribution so the
+leaderboards have whales, and each sale's seller and previous price are the
+buyer and price of the token's previous sale, as the ETL computes them.
+
+Only runs against localhost unless --allow-remote is given, and refuses to
+add to a database that already has transactions unless --reset (which empties
+transactions, addresses and every derived table) is given.
+"""
+import argparse, os, sys, time
+from datetime import datetime, timezone
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "etl"))
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+from db.manager import DataBaseManager
+from load import DataLoader, TOKEN_COUNT
+from snapshot import SnapshotPublisher
+import rebuild
+
+MARKETS = {"OpenSea": 0.62, "Blur": 0.2, "LooksRare": 0.08, "X2Y2": 0.06, "Sudoswap": 0.02, "Rarible": 0.02}
+ACTIONS = {"Bought": 0.85, "Bid Won": 0.15}
+REBUILD_TARGETS = ["rollups", "leaderboards", "tokens", "addresses"]
+# 衍生表有外鍵指向 addresses，--reset 時要一起清掉
+RESET_TABLES = [
+    "transactions", "daily_stats", "daily_market_stats", "daily_address_stats", "leaderboard_windows",
+    "address_leaderboards", "daily_top_resales", "resale_leaderboards", "token_summaries", "address_stats", "addresses",
+]
+LOCAL_HOSTS = {"localhost", "127.0.0.1", "::1"}
+CHUNK_ROWS = 50000
+
+def hex_strings(rng, count, size):
+    digits = rng.bytes(size * count).hex()
+    width = size * 2
+    return ["0x" + digits[i * width:(i + 1) * width] for i in range(count)]
+
+def lookup(db, table):
+    return {name: row_id for row_id, name in db.fetch_all(f"SELECT id, name FROM {table}")}
+
+def insert_dimensions(db, loader, rng, address_count):
+    loader.insert_markets(pd.DataFrame({"name": list(MARKETS)}))
+    loader.insert_actions(pd.DataFrame({"name": list(ACTIONS)}))
+    loader.insert_addresses(pd.DataFrame({"address": hex_strings(rng, address_count, 20)}))
+
+    markets, actions = lookup(db, "markets"), lookup(db, "actions")
+    address_ids = np.array(sorted(row_id for (row_id,) in db.fetch_all("SELECT id FROM addresses")))
+    return (
+        np.array([markets[name] for name in MARKETS]), np.array(list(MARKETS.values())),
+        np.array([actions[name] for name in ACTIONS]), np.array(list(ACTIONS.values())),
+        address_ids,
+    )
+
+def sale_times(rng, count, days, end):
+    # 依時間排序寫入，transaction_id 和 ETL 一樣隨時間遞增；最後一筆落在現在，7 天區間才一定有資料
+    offsets = np.sort(rng.integers(0, days * 86400, count))[::-1]
+    offsets[-1] = 0
+    return (int(end.timestamp()) - offsets).astype("datetime64[s]")
+
+def buyers(rng, address_ids, count):
+    # 三成的成交集中在少數大戶（Zipf 分布），其餘平均分散
+    whales = rng.random(count) < 0.3
+    index = np.where(whales, (rng.zipf(1.6, count) - 1) % len(address_ids), rng.integers(0, len(address_ids), count))
+    return address_ids[index]
+
+def nullable(values, cast, index):
+    # object 欄位才能放 None（寫成 NULL）；混在數字欄位裡 pandas 會把它變回 NaN
+    return pd.Series([None if np.isnan(value) else cast(value) for value in values], index=index, dtype=object)
+
+def transaction_chunks(rng, times, dimensions, chunk_rows):
+    market_ids, market_weights, action_ids, action_weights, address_ids = dimensions
+    last_buyer = np.full(TOKEN_COUNT, -1, dtype=np.int64)
+    last_price = np.full(TOKEN_COUNT, np.nan)
+
+    for offset in range(0, len(times), chunk_rows):
+        chunk_times = times[offset:offset + chunk_rows]
+        count = len(chunk_times)
+        df = pd.DataFrame({
+            "transaction_hash": hex_strings(rng, count, 32),
+            "time": pd.to_datetime(chunk_times),
+            "price": np.round(rng.lognormal(11.3, 0.8, count), 2),
+            "token_id": rng.integers(0, TOKEN_COUNT, count),
+            "market_id": rng.choice(market_ids, count, p=market_weights / market_weights.sum()),
+            "action_id": rng.choice(action_ids, count, p=action_weights / action_weights.sum()),
+            "buyer_id": buyers(rng, address_ids, count),
+        })
+
+        # 同一個 token 的上一筆成交：chunk 內用 shift，chunk 的第一筆接上前面 chunk 留下的最後一筆
+        previous = df.groupby("token_id")[["buyer_id", "price"]].shift(1)
+        first = previous["buyer_id"].isna().to_numpy()
+        tokens = df["token_id"].to_numpy()
+        seller = previous["buyer_id"].to_numpy(dtype=float, copy=True)
+        previous_price = previous["price"].to_numpy(dtype=float, copy=True)
+        seller[first] = np.where(last_buyer[tokens[first]] >= 0, last_buyer[tokens[first]], np.nan)
+        previous_price[first] = last_price[tokens[first]]
+
+        last = df.drop_duplicates("token_id", keep="last")
+        last_buyer[last["token_id"].to_numpy()] = last["buyer_id"].to_numpy()
+        last_price[last["token_id"].to_numpy()] = last["price"].to_numpy()
+
+        # 欄位順序要和 DataLoader.insert_transactions 的 INSERT 一致
+        df["seller_id"] = nullable(seller, int, df.index)
+        df["previous_price"] = nullable(previous_price, float, df.index)
+        yield df[["transaction_hash", "time", "price", "token_id", "market_id", "action_id", "buyer_id", "seller_id", "previous_price"]]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transactions", type=int, default=1000000, help="Number of sales to generate (e.g. 1000000, 10000000).")
+    parser.add_argument("--addresses", type=int, default=None, help="Number of addresses (default: one per 20 sales, at least 1000).")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--days", type=int, default=1800, help="Spread the sales over this many days before now.")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--reset", action="store_true", help="Empty transactions, addresses and the derived tables first.")
+    parser.add_argument("--allow-remote", action="store_true", help="Allow a DB_HOST that is not local.")
+    args = parser.parse_args()
+
+    load_dotenv()
+    if os.getenv("DB_HOST") not in LOCAL_HOSTS and not args.allow_remote:
+        sys.exit(f"DB_HOST={os.getenv('DB_HOST')} is not a local database; pass --allow-remote if this is intended.")
+
+    db = DataBaseManager()
+    if db.connection is None:
+        sys.exit("Could not connect to the database.")
+    loader = DataLoader(db=db)
+    try:
+        if args.reset:
+            db.execute("SET FOREIGN_KEY_CHECKS = 0")
+            for table in RESET_TABLES:
+                db.execute(f"TRUNCATE TABLE {table}")
+            db.execute("SET FOREIGN_KEY_CHECKS = 1")
+            db.commit()
+        elif db.fetch_one("SELECT 1 FROM transactions LIMIT 1"):
+            sys.exit("transactions is not empty; pass --reset to replace its rows with synthetic ones.")
+
+        rng = np.random.default_rng(args.seed)
+        end = datetime.now(timezone.utc).replace(microsecond=0)
+        address_count = args.addresses or max(args.transactions // 20, 1000)
+
+        started = time.perf_counter()
+        dimensions = insert_dimensions(db, loader, rng, address_count)
+        loader.ensure_transaction_partitions()
+        times = sale_times(rng, args.transactions, args.days, end)
+        for chunk in transaction_chunks(rng, times, dimensions, args.chunk_rows):
+            if not loader.insert_transactions(chunk):
+                sys.exit("Inserting transactions failed; derived tables were not rebuilt.")
+        print(f"{args.transactions} transactions and {address_count} addresses written in {time.perf_counter() - started:.0f} s.")
+
+        for target in REBUILD_TARGETS:
+            rebuild.rebuild(target, loader)
+        loader.bump_data_version(rebuild=True)
+        SnapshotPublisher(db=db).publish()
+        print(f"Done in {time.perf_counter() - started:.0f} s (seed {args.seed}).")
+    finally:
+        loader.close_connection()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Show that slow leaderboard queries no longer take the latency of cheap endpoints down with them.
+
+    python benchmarks/load_shedding.py --heavy-requests 40 --cheap-requests 200 --slow-seconds 5
+
+Runs the app in-process against the database configured in .env (DB_HOST, ...).
+The all-time leaderboard queries are replaced by a slow stand-in: it holds a
+pooled connection like a real query would and, like MySQL's
+MAX_EXECUTION_TIME, gives up with error 3024 once the endpoint's budget is
+spent. Cheap token-summary requests (one indexed query each) are measured
+alone, then next to the slow leaderboard burst, once with the budgets and
+limiter on and once with them off. token-summary is cached like any other
+endpoint, so the response cache is cleared before every phase and each
+request in a burst asks for a different token (up to 10000 requests): every
+one is a miss that goes to the database. Don't run it with
+RESPONSE_CACHE_MAX_ENTRIES=0, which also drops the last good responses the
+shed leaderboard requests fall back to.
+"""
+import argparse, asyncio, os, sys, time, statistics
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import httpx, pymysql
+from sqlalchemy.exc import OperationalError
+from src.api.db.database import engine
+from src.api.cache import response_cache
+import src.api.budgets as budgets
+import src.api.main as main
+
+# limit 不同，鍵就不同，single-flight 不會把它們併成一個查詢
+HEAVY_PATHS = [f"/api/v1/{endpoint}?interval=3&limit={limit}" for limit in range(1, 21) for endpoint in ("top-buyers-sellers", "top-resale-token")]
+
+def slow_stand_in(original, slow_seconds):
+    async def stand_in(db, *args, **kwargs):
+        await db.connection()
+        budget = budgets.query_budget_ms.get()
+        if budget and slow_seconds * 1000 > budget:
+            await asyncio.sleep(budget / 1000)
+            raise OperationalError("SELECT ...", None, pymysql.err.OperationalError(budgets.ER_QUERY_TIMEOUT, "Query execution was interrupted, maximum statement execution time exceeded"))
+        await asyncio.sleep(slow_seconds)
+        return await original(db, *args, **kwargs)
+    return stand_in
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+async def timed_get(client, path):
+    started = time.perf_counter()
+    response = await client.get(path)
+    return response, time.perf_counter() - started
+
+async def cheap_burst(client, count):
+    results = await asyncio.gather(*[timed_get(client, f"/api/v1/token-summary?token_id={i % 10000}") for i in range(count)])
+    return [elapsed for _, elapsed in results]
+
+async def run_phase(client, args, heavy):
+    # 清掉回應快取，token-summary 才會真的查資料庫；最後一次的好結果另外保存，不受影響
+    response_cache.clear()
+    heavy_tasks = [asyncio.create_task(timed_get(client, HEAVY_PATHS[i % len(HEAVY_PATHS)])) for i in range(args.heavy_requests if heavy else 0)]
+    await asyncio.sleep(0.2)
+    cheap = await cheap_burst(client, args.cheap_requests)
+    heavy_results = await asyncio.gather(*heavy_tasks)
+
+    outcomes = {}
+    for response, _ in heavy_results:
+        outcome = "stale" if "warning" in response.headers else str(response.status_code)
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+    return cheap, outcomes
+
+def report(name, cheap, outcomes):
+    print(f"{name:<28} cheap p50 {statistics.median(cheap) * 1000:8.1f} ms   p95 {percentile(cheap, 95) * 1000:8.1f} ms   max {max(cheap) * 1000:8.1f} ms   heavy {outcomes or '-'}")
+
+async def main_async():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--heavy-requests", type=int, default=len(HEAVY_PATHS))
+    parser.add_argument("--cheap-requests", type=int, default=200)
+    parser.add_argument("--slow-seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        # 先用正常速度跑一次，讓排行榜有「上一次的好結果」可以備用
+        for path in HEAVY_PATHS:
+            (await client.get(path)).raise_for_status()
+
+        report("cheap alone", *await run_phase(client, args, heavy=False))
+
+        analytics = main.analytics
+        originals = analytics.top_addresses, analytics.top_resales
+        analytics.top_addresses = slow_stand_in(originals[0], args.slow_seconds)
+        analytics.top_resales = slow_stand_in(originals[1], args.slow_seconds)
+        try:
+            report("slow heavy, budgets on", *await run_phase(client, args, heavy=True))
+
+            saved = dict(budgets.QUERY_BUDGETS_MS), budgets.limiter
+            budgets.QUERY_BUDGETS_MS.clear()
+            budgets.limiter = budgets.EndpointLimiter((), 0, 0)
+            try:
+                report("slow heavy, budgets off", *await run_phase(client, args, heavy=True))
+            finally:
+                budgets.QUERY_BUDGETS_MS.update(saved[0])
+                budgets.limiter = saved[1]
+        finally:
+            analytics.top_addresses, analytics.top_resales = originals
+    await engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main_async())
@@ -0,0 +1,213 @@
+"""Drive concurrent load through every API endpoint and interval and write a latency report.
+
+    uvicorn src.api.main:app --port 8000
+    python benchmarks/load_test.py --base-url http://localhost:8000 --concurrency 32 --duration 60 --output report.json
+    python benchmarks/load_test.py --base-url http://localhost:8000 --compare last-release.json
+
+Fill the database with benchmarks/generate_data.py first so runs on different
+releases see the same rows. Each of `--concurrency` clients sends requests
+back to back for `--duration` seconds (after `--warmup` seconds that are not
+counted), drawing from a seeded mix of every analytics endpoint at every
+interval, with random token ids and wallet addresses taken from the
+leaderboard. The live feed (a long-lived stream) and nft-details (an external
+API) are left out.
+
+The JSON report has p50/p95/p99 latency and throughput per scenario (endpoint
+and interval), the same per route plus the SQL time per request, read from
+the difference in the server's /metrics `db_query_duration_seconds` before
+and after the run. With several workers, set PROMETHEUS_MULTIPROC_DIR so
+/metrics sums them all. Hit the API port directly rather than nginx, whose
+cache would answer most requests.
+Start the API with RESPONSE_CACHE_MAX_ENTRIES=0 to measure every request
+against the database instead of the response cache.
+
+With --compare, prints each scenario's latency next to an earlier report and
+exits non-zero if any p95 grew by more than --max-regression percent.
+"""
+import argparse, asyncio, json, random, re, subprocess, sys, time
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+INTERVALS = [0, 1, 2, 3]
+TOKEN_COUNT = 10000
+METRIC_LINE = re.compile(r'^db_query_duration_seconds_(sum|count)\{endpoint="([^"]*)"\} (\S+)$')
+
+def scenarios(addresses):
+    # (名稱, 路由樣板, 產生網址的函式)；token id 和地址每次隨機，才不會全部打在同一個快取鍵上
+    today = datetime.now(timezone.utc).date()
+    mix = []
+    for interval in INTERVALS:
+        mix += [
+            (f"time-based-data interval={interval}", "/api/v1/time-based-data", lambda rng, interval=interval: f"/api/v1/time-based-data?interval={interval}"),
+            (f"top-buyers-sellers interval={interval}", "/api/v1/top-buyers-sellers", lambda rng, interval=interval: f"/api/v1/top-buyers-sellers?interval={interval}&limit={rng.choice([5, 100])}"),
+            (f"marketplace-comparison interval={interval}", "/api/v1/marketplace-comparison", lambda rng, interval=interval: f"/api/v1/marketplace-comparison?interval={interval}"),
+            (f"top-resale-token interval={interval}", "/api/v1/top-resale-token", lambda rng, interval=interval: f"/api/v1/top-resale-token?interval={interval}&limit={rng.choice([5, 100])}"),
+            (f"token-transaction interval={interval}", "/api/v1/token-transaction", lambda rng, interval=interval: f"/api/v1/token-transaction?token_id={rng.randrange(TOKEN_COUNT)}&interval={interval}&limit=100"),
+            (f"dashboard interval={interval}", "/api/v1/dashboard", lambda rng, interval=interval: f"/api/v1/dashboard?interval={interval}&token_id={rng.randrange(TOKEN_COUNT)}"),
+        ]
+    mix += [
+        ("time-series day 90d", "/api/v1/time-series", lambda rng: f"/api/v1/time-series?start={today - timedelta(days=90)}&end={today}&bucket=day"),
+        ("time-series week 1y", "/api/v1/time-series", lambda rng: f"/api/v1/time-series?start={today - timedelta(days=365)}&end={today}&bucket=week"),
+        ("token-summary", "/api/v1/token-summary", lambda rng: f"/api/v1/token-summary?token_id={rng.randrange(TOKEN_COUNT)}"),
+        ("token-summary bulk 100", "/api/v1/token-summary", lambda rng: f"/api/v1/token-summary?token_ids={','.join(str(token_id) for token_id in rng.sample(range(TOKEN_COUNT), 100))}"),
+        ("export 1 day", "/api/v1/export", lambda rng: f"/api/v1/export?start={today - timedelta(days=1)}&end={today}&format=csv"),
+    ]
+    if addresses:
+        mix.append(("address", "/api/v1/address/{address}", lambda rng: f"/api/v1/address/{rng.choice(addresses)}"))
+    return mix
+
+async def leaderboard_addresses(client):
+    response = await client.get("/api/v1/top-buyers-sellers?interval=3&limit=100")
+    response.raise_for_status()
+    body = response.json()
+    return sorted({row["address"] for row in body["top_buyers"] + body["top_sellers"]})
+
+async def query_time(client):
+    # route -> [SQL 秒數總和, 查詢次數]
+    totals = {}
+    for line in (await client.get("/metrics")).text.splitlines():
+        match = METRIC_LINE.match(line)
+        if match:
+            kind, route, value = match.groups()
+            totals.setdefault(route, [0.0, 0])[kind == "count"] += float(value)
+    return totals
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))] if values else None
+
+def summarize(samples, seconds):
+    latencies = [elapsed for elapsed, status in samples]
+    statuses = {}
+    for _, status in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    ms = lambda value: round(value * 1000, 2) if value is not None else None
+    return {
+        "requests": len(samples),
+        "errors": sum(count for status, count in statuses.items() if not status.startswith(("2", "3"))),
+        "statuses": statuses,
+        "throughput_rps": round(len(samples) / seconds, 2),
+        "mean_ms": ms(sum(latencies) / len(latencies)) if latencies else None,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "max_ms": ms(max(latencies, default=None)),
+    }
+
+async def drive(client, mix, args, seconds, rng):
+    samples = {name: [] for name, _, _ in mix}
+    deadline = time.perf_counter() + seconds
+
+    async def worker(worker_rng):
+        while time.perf_counter() < deadline:
+            name, _, build = worker_rng.choice(mix)
+            path = build(worker_rng)
+            started = time.perf_counter()
+            try:
+                response = await client.get(path)
+                status = response.status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            samples[name].append((time.perf_counter() - started, status))
+
+    await asyncio.gather(*[worker(random.Random(rng.random())) for _ in range(args.concurrency)])
+    return samples
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def build_report(args, mix, samples, before, after, started_at, seconds):
+    routes = {}
+    for name, route, _ in mix:
+        routes.setdefault(route, []).extend(samples[name])
+
+    route_report = {}
+    for route, route_samples in routes.items():
+        stats = summarize(route_samples, seconds)
+        sql_seconds = after.get(route, [0.0, 0])[0] - before.get(route, [0.0, 0])[0]
+        queries = after.get(route, [0.0, 0])[1] - before.get(route, [0.0, 0])[1]
+        if stats["requests"]:
+            stats["db_ms_per_request"] = round(sql_seconds * 1000 / stats["requests"], 2)
+            stats["db_queries_per_request"] = round(queries / stats["requests"], 2)
+        route_report[route] = stats
+
+    return {
+        "meta": {
+            "revision": git_revision(),
+            "started_at": started_at.isoformat(timespec="seconds"),
+            "base_url": args.base_url,
+            "concurrency": args.concurrency,
+            "duration_seconds": seconds,
+            "warmup_seconds": args.warmup,
+            "seed": args.seed,
+        },
+        "total": summarize([sample for route_samples in routes.values() for sample in route_samples], seconds),
+        "routes": route_report,
+        "scenarios": {name: summarize(samples[name], seconds) for name, _, _ in mix},
+    }
+
+def compare(report, baseline, max_regression):
+    print(f"\n{'scenario':<40} {'p50 ms':>18} {'p95 ms':>18} {'p99 ms':>18}")
+    regressions = []
+    for name, stats in report["scenarios"].items():
+        old = baseline.get("scenarios", {}).get(name)
+        if not old or not stats["requests"] or not old["requests"]:
+            continue
+        cells = [f"{old[key]:>8.1f} → {stats[key]:<7.1f}" for key in ("p50_ms", "p95_ms", "p99_ms")]
+        change = (stats["p95_ms"] - old["p95_ms"]) / old["p95_ms"] * 100 if old["p95_ms"] else 0
+        flag = ""
+        if max_regression is not None and change > max_regression:
+            regressions.append(name)
+            flag = f"  p95 +{change:.0f}%"
+        print(f"{name:<40} {cells[0]:>18} {cells[1]:>18} {cells[2]:>18}{flag}")
+    print(f"\nbaseline {baseline['meta'].get('revision')} ({baseline['total']['throughput_rps']} req/s)  →  {report['meta'].get('revision')} ({report['total']['throughput_rps']} req/s)")
+    return regressions
+
+async def main_async():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=60, help="Measured seconds.")
+    parser.add_argument("--warmup", type=float, default=10, help="Seconds of load before measuring.")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--output", default="load-test-report.json")
+    parser.add_argument("--compare", help="Earlier report to compare against.")
+    parser.add_argument("--max-regression", type=float, default=None, help="With --compare, fail if a scenario's p95 grew by more than this many percent.")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        mix = scenarios(await leaderboard_addresses(client))
+        if args.warmup:
+            await drive(client, mix, args, args.warmup, rng)
+        started_at = datetime.now(timezone.utc)
+        before = await query_time(client)
+        samples = await drive(client, mix, args, args.duration, rng)
+        after = await query_time(client)
+
+    report = build_report(args, mix, samples, before, after, started_at, args.duration)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{'route':<36} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'db ms/req':>10} {'errors':>7}")
+    for route, stats in sorted(report["routes"].items()):
+        if stats["requests"]:
+            print(f"{route:<36} {stats['throughput_rps']:>8.1f} {stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f} {stats['db_ms_per_request']:>10.2f} {stats['errors']:>7}")
+    total = report["total"]
+    print(f"{'total':<36} {total['throughput_rps']:>8.1f} {total['p50_ms']:>8.1f} {total['p95_ms']:>8.1f} {total['p99_ms']:>8.1f}")
+    print(f"\nReport written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.max_regression)
+        if regressions:
+            sys.exit(f"p95 regressed by more than {args.max_regression:g}% on: {', '.join(regressions)}")
+
+if __name__ == "__main__":
+    asyncio.run(main_async())
@@ -0,0 +1,40 @@
+"""Watch where API reads go while the replica falls behind and catches up.
+
+    python benchmarks/replica_routing.py --seconds 60
+
+Uses DB_* (primary) and DB_REPLICA_* from .env. Every second it runs the
+router's lag check, then a query through the API's session factory, and
+prints both servers' data versions and which server answered. To try it with
+two local MySQL instances (say ports 3306 and 3307, DB_REPLICA_PORT=3307),
+load src/etl/db/models.sql into both, then bump data_version.version on the
+primary (or run an ETL load against it): reads move to the primary until the
+replica's data_version catches up, or while the replica is stopped.
+"""
+import argparse, asyncio, os, sys, time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy import text
+from src.api.db.database import AsyncSessionLocal, replica_router, engine, replica_engine
+
+async def main_async():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=int, default=60)
+    args = parser.parse_args()
+
+    if replica_engine is None:
+        sys.exit("DB_REPLICA_HOST is not set.")
+
+    print(f"{'time':>8} {'primary v':>10} {'replica v':>10} {'reads go to':>12}  answered by")
+    for _ in range(args.seconds):
+        await replica_router.check()
+        async with AsyncSessionLocal() as db:
+            host, port = (await db.execute(text("SELECT @@hostname, @@port"))).one()
+        route = "replica" if replica_router.use_replica else "primary"
+        print(f"{time.strftime('%H:%M:%S'):>8} {str(replica_router.primary_version):>10} {str(replica_router.replica_version):>10} {route:>12}  {host}:{port}")
+        await asyncio.sleep(1)
+
+    await engine.dispose()
+    await replica_engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main_async())
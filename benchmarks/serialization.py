@@ -0,0 +1,94 @@
+"""Compare the old and new JSON paths for a 10k-row token history.
+
+    python benchmarks/serialization.py --rows 10000 --repeat 20
+
+Uses synthetic rows shaped like the token-transaction query result, so no
+database is needed (main still reads DB_* from .env to build its engine).
+
+- before: one TokenTransactionData per row, then FastAPI's response_model
+  validation, jsonable_encoder and JSONResponse (stdlib json)
+- after: main.transaction_record dicts serialized once by pydantic-core, as
+  the cached endpoint does on a miss; a cache hit reuses the bytes as-is
+
+Also prints what gzip and brotli (if installed) do to the payload.
+"""
+import argparse, asyncio, os, sys, time
+from collections import namedtuple
+from datetime import datetime, timedelta
+from decimal import Decimal
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+import src.api.models as api_models
+import src.api.main as main
+from src.api.responses import dumps
+from src.api.compression import compress, brotli
+
+Record = namedtuple("Record", "transaction_id sold_date price transaction_hash buyer_address")
+
+def build_records(count):
+    start = datetime(2021, 5, 1)
+    return [
+        Record(i, start + timedelta(minutes=37 * i), Decimal(f"{10 + i % 90}.{i % 100:02d}"), f"0x{i:064x}", f"0x{i % 5000:040x}")
+        for i in range(count)
+    ]
+
+def before(records, field):
+    response = api_models.TokenTransactionResponse(
+        token_id="1",
+        interval=3,
+        next_cursor=None,
+        data=[
+            api_models.TokenTransactionData(
+                sold_date=record.sold_date,
+                price=float(record.price or 0),
+                transaction_hash=record.transaction_hash,
+                buyer_address=record.buyer_address
+            )
+            for record in records
+        ]
+    )
+    content = asyncio.run(serialize_response(field=field, response_content=response, is_coroutine=True))
+    return JSONResponse(content).body
+
+def after(records):
+    return dumps({
+        "token_id": "1",
+        "interval": 3,
+        "data": [main.transaction_record(record) for record in records],
+        "next_cursor": None
+    })
+
+def timed(fn, repeat):
+    fn()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - started) / repeat, result
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    records = build_records(args.rows)
+    field = create_model_field(name="Response_token_transaction", type_=api_models.TokenTransactionResponse, mode="serialization")
+
+    before_seconds, before_body = timed(lambda: before(records, field), args.repeat)
+    after_seconds, after_body = timed(lambda: after(records), args.repeat)
+    if before_body != after_body:
+        sys.exit("The two paths produced different JSON.")
+
+    print(f"{args.rows} rows, {len(after_body) / 1024:.0f} KiB of JSON (identical bytes on both paths)")
+    print(f"before (models + response_model + json): {before_seconds * 1000:8.2f} ms")
+    print(f"after  (dicts + pydantic-core):          {after_seconds * 1000:8.2f} ms   {before_seconds / after_seconds:.1f}x faster")
+
+    for encoding in ["gzip"] + (["br"] if brotli else []):
+        seconds, body = timed(lambda: compress(after_body, encoding), args.repeat)
+        print(f"{encoding:<5} {len(body) / 1024:8.0f} KiB ({len(body) / len(after_body):.0%}) in {seconds * 1000:.2f} ms")
+
+if __name__ == "__main__":
+    main_cli()
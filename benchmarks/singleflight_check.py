@@ -0,0 +1,58 @@
+"""Show that concurrent identical analytics requests run their query once.
+
+    python benchmarks/singleflight_check.py --endpoint top-resale-token --interval 3 --requests 50
+
+Runs against the database configured in .env (DB_HOST, ...). The response
+cache is cleared first, the data version is read once up front, and then
+every SQL statement issued while the requests run concurrently is counted.
+Exits non-zero unless the statements are those of a single request.
+"""
+import argparse, asyncio, os, sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy import event
+from src.api.db.database import AsyncSessionLocal, engine
+from src.api.cache import response_cache, query_flights
+import src.api.main as main
+
+ENDPOINTS = {
+    "time-based-data": lambda args: main.with_session(main.time_based_data, interval=args.interval),
+    "top-buyers-sellers": lambda args: main.with_session(main.top_buyers_sellers_data, interval=args.interval, limit=args.limit),
+    "marketplace-comparison": lambda args: main.with_session(main.marketplace_comparison_data, interval=args.interval),
+    "top-resale-token": lambda args: main.with_session(main.top_resale_token, interval=args.interval, limit=args.limit),
+}
+
+async def count_statements(requests):
+    statements = []
+    listener = lambda conn, cursor, statement, *rest: statements.append(statement)
+    event.listen(engine.sync_engine, "before_cursor_execute", listener)
+    try:
+        await asyncio.gather(*requests())
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", listener)
+    return len(statements)
+
+async def main_async():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoint", choices=ENDPOINTS, default="top-resale-token")
+    parser.add_argument("--interval", type=int, default=3)
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+
+    async with AsyncSessionLocal() as db:
+        await response_cache.sync_version(db)
+
+    response_cache.clear()
+    single = await count_statements(lambda: [ENDPOINTS[args.endpoint](args)])
+    response_cache.clear()
+    before = query_flights.calls
+    concurrent = await count_statements(lambda: [ENDPOINTS[args.endpoint](args) for _ in range(args.requests)])
+    await engine.dispose()
+
+    print(f"1 request:             {single} SQL statements")
+    print(f"{args.requests} concurrent requests: {concurrent} SQL statements, {query_flights.calls - before} query run(s)")
+    return concurrent == single
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(main_async()) else 1)
@@ -0,0 +1,214 @@
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+import src.api.db.models as db_models
+
+# 時間區間拆成兩段：完整的日期從 daily rollup 讀，開頭不滿一天的部分才掃 transactions
+def split_at_day_boundary(start_time: datetime | None):
+    """Return (first_rollup_day, edge_end) for a window starting at start_time.
+
+    Rows in [start_time, edge_end) are read from transactions; whole days from
+    first_rollup_day onwards are read from the rollups. edge_end is None when
+    start_time is already at midnight (or the window is all time).
+    """
+    if start_time is None:
+        return None, None
+    if start_time.time() == time.min:
+        return start_time.date(), None
+    first_rollup_day = start_time.date() + timedelta(days=1)
+    return first_rollup_day, datetime.combine(first_rollup_day, time.min, tzinfo=start_time.tzinfo)
+
+async def time_based_totals(db: AsyncSession, start_time: datetime | None):
+    first_rollup_day, edge_end = split_at_day_boundary(start_time)
+
+    rollup_query = select(
+        func.sum(db_models.DailyStats.total_volume).label('total_volume'),
+        func.sum(db_models.DailyStats.transaction_count).label('transaction_count')
+    )
+    highest_query = select(
+        db_models.DailyStats.max_price_token_id.label('token_id'),
+        db_models.DailyStats.max_price.label('highest_price')
+    ).order_by(db_models.DailyStats.max_price.desc(), db_models.DailyStats.day).limit(1)
+
+    if first_rollup_day:
+        rollup_query = rollup_query.where(db_models.DailyStats.day >= first_rollup_day)
+        highest_query = highest_query.where(db_models.DailyStats.day >= first_rollup_day)
+
+    rollup = (await db.execute(rollup_query)).one()
+    total_volume = rollup.total_volume or Decimal(0)
+    transaction_count = int(rollup.transaction_count or 0)
+    highest = (await db.execute(highest_query)).first()
+
+    if edge_end:
+        edge = (await db.execute(
+            select(
+                func.sum(db_models.Transaction.price).label('total_volume'),
+                func.count(db_models.Transaction.transaction_id).label('transaction_count')
+            ).where(
+                db_models.Transaction.time >= start_time,
+                db_models.Transaction.time < edge_end
+            )
+        )).one()
+        total_volume += edge.total_volume or Decimal(0)
+        transaction_count += edge.transaction_count or 0
+
+        edge_highest = (await db.execute(
+            select(
+                db_models.Transaction.token_id.label('token_id'),
+                db_models.Transaction.price.label('highest_price')
+            ).where(
+                db_models.Transaction.time >= start_time,
+                db_models.Transaction.time < edge_end
+            ).order_by(db_models.Transaction.price.desc(), db_models.Transaction.transaction_id).limit(1)
+        )).first()
+
+        # 同價時取較早的一筆，和重建 rollup 的規則一致
+        if edge_highest and (not highest or edge_highest.highest_price >= highest.highest_price):
+            highest = edge_highest
+
+    return {
+        'total_volume': total_volume,
+        'transaction_count': transaction_count,
+        'average_price': total_volume / transaction_count if transaction_count else Decimal(0),
+        'highest_price_token_id': highest.token_id if highest else None,
+        'highest_price': highest.highest_price if highest else None,
+    }
+
+async def marketplace_totals(db: AsyncSession, start_time: datetime | None):
+    first_rollup_day, edge_end = split_at_day_boundary(start_time)
+
+    rollup_query = (
+        select(
+            db_models.Market.name.label('marketplace'),
+            func.sum(db_models.DailyMarketStats.total_volume).label('total_volume'),
+            func.sum(db_models.DailyMarketStats.transaction_count).label('transaction_count')
+        )
+        .join(
+            db_models.Market,
+            db_models.DailyMarketStats.market_id == db_models.Market.id
+        )
+    )
+
+    if first_rollup_day:
+        rollup_query = rollup_query.where(db_models.DailyMarketStats.day >= first_rollup_day)
+
+    totals = {
+        row.marketplace: [row.total_volume or Decimal(0), int(row.transaction_count or 0)]
+        for row in (await db.execute(rollup_query.group_by(db_models.Market.name))).all()
+    }
+
+    if edge_end:
+        edge_rows = (await db.execute(
+            select(
+                db_models.Market.name.label('marketplace'),
+                func.sum(db_models.Transaction.price).label('total_volume'),
+                func.count(db_models.Transaction.transaction_id).label('transaction_count')
+            )
+            .join(
+                db_models.Market,
+                db_models.Transaction.market_id == db_models.Market.id
+            )
+            .where(
+                db_models.Transaction.time >= start_time,
+                db_models.Transaction.time < edge_end
+            )
+            .group_by(db_models.Market.name)
+        )).all()
+        for row in edge_rows:
+            market = totals.setdefault(row.marketplace, [Decimal(0), 0])
+            market[0] += row.total_volume or Decimal(0)
+            market[1] += row.transaction_count or 0
+
+    return [
+        {
+            'marketplace': marketplace,
+            'total_volume': total_volume,
+            'transaction_count': transaction_count,
+            'average_price': total_volume / transaction_count if transaction_count else Decimal(0),
+        }
+        for marketplace, (total_volume, transaction_count) in sorted(totals.items(), key=lambda item: item[1][0], reverse=True)
+    ]
+
+# 排行榜由 ETL 依 interval 增量維護，這裡只要照 ranking 索引的順序取前幾名（同額時 address_id 大的在前）
+async def top_addresses(db: AsyncSession, role: str, interval: int, limit: int):
+    return (await db.execute(
+        select(
+            db_models.Address.address.label('address'),
+            db_models.AddressLeaderboard.total_volume.label('total_volume'),
+            db_models.AddressLeaderboard.transaction_count.label('transaction_count')
+        )
+        .join(
+            db_models.Address,
+            db_models.AddressLeaderboard.address_id == db_models.Address.id
+        )
+        .where(
+            db_models.AddressLeaderboard.role == role,
+            db_models.AddressLeaderboard.interval_id == interval
+        )
+        .order_by(db_models.AddressLeaderboard.total_volume.desc(), db_models.AddressLeaderboard.address_id.desc())
+        .limit(limit)
+    )).all()
+
+async def top_resales(db: AsyncSession, interval: int, limit: int):
+    return (await db.execute(
+        select(
+            db_models.ResaleLeaderboard.token_id.label('token_id'),
+            db_models.ResaleLeaderboard.price_difference.label('price_difference'),
+            db_models.Address.address.label('seller')
+        )
+        .join(
+            db_models.Address,
+            db_models.ResaleLeaderboard.seller_id == db_models.Address.id
+        )
+        .where(db_models.ResaleLeaderboard.interval_id == interval)
+        .order_by(db_models.ResaleLeaderboard.price_difference.desc(), db_models.ResaleLeaderboard.transaction_id)
+        .limit(limit)
+    )).all()
+
+BUCKETS = ['day', 'week', 'month']
+
+def bucket_start(day: date, bucket: str) -> date:
+    # 週從星期一開始（ISO week）
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+# 一天一列 daily_stats，依 bucket 合併；讀取的列數只和日期範圍有關，不碰 transactions
+async def time_series(db: AsyncSession, start: date, end: date, bucket: str):
+    days = (await db.execute(
+        select(db_models.DailyStats)
+        .where(db_models.DailyStats.day >= start, db_models.DailyStats.day <= end)
+        .order_by(db_models.DailyStats.day)
+    )).scalars().all()
+
+    series = {}
+    for day in days:
+        key = bucket_start(day.day, bucket)
+        point = series.get(key)
+        if point is None:
+            series[key] = {
+                'bucket_start': key,
+                'total_volume': day.total_volume,
+                'transaction_count': day.transaction_count,
+                'min_price': day.min_price,
+                'max_price': day.max_price,
+                'max_price_token_id': day.max_price_token_id,
+                'open_price': day.open_price,
+                'close_price': day.close_price,
+            }
+            continue
+
+        point['total_volume'] += day.total_volume
+        point['transaction_count'] += day.transaction_count
+        point['min_price'] = min(point['min_price'], day.min_price)
+        # 同價時保留較早的那天，和 time_based_totals 的規則一致
+        if day.max_price > point['max_price']:
+            point['max_price'], point['max_price_token_id'] = day.max_price, day.max_price_token_id
+        point['close_price'] = day.close_price
+
+    for point in series.values():
+        point['average_price'] = point['total_volume'] / point['transaction_count'] if point['transaction_count'] else Decimal(0)
+    return list(series.values())
@@ -0,0 +1,113 @@
+import os, asyncio
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from fastapi import Request
+from sqlalchemy.exc import OperationalError
+from src.api.metrics import registry
+
+# 每個端點的 SQL 在資料庫端最多能跑多久（毫秒），超過由 MySQL 的 MAX_EXECUTION_TIME 中斷
+QUERY_BUDGETS_MS = {
+    'time-based-data': 1000,
+    'time-series': 1000,
+    'top-buyers-sellers': 3000,
+    'marketplace-comparison': 1000,
+    'top-resale-token': 3000,
+    'token-transaction': 1000,
+    'token-summary': 500,
+    'address': 500,
+}
+# 全期間排行榜這類重查詢同時最多跑幾個，其餘排隊；排不到就不再佔用連線池
+# time-series 只讀 daily_stats（一天一列），和 time-based-data 一樣是輕查詢，不限流
+HEAVY_ENDPOINTS = ('top-buyers-sellers', 'top-resale-token')
+HEAVY_QUERY_CONCURRENCY = int(os.getenv('HEAVY_QUERY_CONCURRENCY', 4))
+HEAVY_QUERY_WAIT_SECONDS = float(os.getenv('HEAVY_QUERY_WAIT_SECONDS', 1))
+RETRY_AFTER_SECONDS = 5
+
+# MySQL: Query execution was interrupted, maximum statement execution time exceeded
+ER_QUERY_TIMEOUT = 3024
+STALE_WARNING = '110 - "Response is Stale"'
+
+query_budget_ms: ContextVar[int | None] = ContextVar('query_budget_ms', default=None)
+stale_marker: ContextVar[list | None] = ContextVar('stale_marker', default=None)
+
+shed_requests = registry.counter('api_shed_total', 'Endpoint computations abandoned because no slot was free (busy) or the query ran out of its budget (timeout).', ('endpoint', 'reason'))
+stale_responses = registry.counter('api_stale_responses_total', 'Last good responses served in place of an abandoned computation.', ('endpoint',))
+
+class Overloaded(Exception):
+    """The endpoint's query ran out of its time budget or could not get a slot in time."""
+
+def add_execution_hint(conn, cursor, statement, parameters, context, executemany):
+    # 只有 SELECT 能帶這個 optimizer hint；預算由 run_within_budget 依端點設定
+    budget = query_budget_ms.get()
+    if budget and statement[:6].upper() == 'SELECT':
+        statement = f'SELECT /*+ MAX_EXECUTION_TIME({budget}) */{statement[6:]}'
+    return statement, parameters
+
+def is_query_timeout(error: OperationalError):
+    args = getattr(error.orig, 'args', ())
+    return bool(args) and args[0] == ER_QUERY_TIMEOUT
+
+class EndpointLimiter:
+    """Cap how many computations of each heavy endpoint run at once.
+
+    A caller that cannot get a slot within `wait_seconds` is shed with
+    Overloaded instead of queueing on the connection pool, so a spike of slow
+    leaderboard queries cannot take every connection from the cheap endpoints.
+    """
+
+    def __init__(self, endpoints, concurrency: int, wait_seconds: float):
+        self.wait_seconds = wait_seconds
+        self._semaphores = {endpoint: asyncio.Semaphore(concurrency) for endpoint in endpoints}
+
+    @asynccontextmanager
+    async def slot(self, endpoint: str):
+        semaphore = self._semaphores.get(endpoint)
+        if semaphore is None:
+            yield
+            return
+
+        try:
+            await asyncio.wait_for(semaphore.acquire(), self.wait_seconds)
+        except asyncio.TimeoutError:
+            shed_requests.inc(endpoint=endpoint, reason='busy')
+            raise Overloaded(f"Too many concurrent '{endpoint}' queries.")
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+limiter = EndpointLimiter(HEAVY_ENDPOINTS, HEAVY_QUERY_CONCURRENCY, HEAVY_QUERY_WAIT_SECONDS)
+
+async def run_within_budget(endpoint: str, fn):
+    """Run fn() in one of the endpoint's slots with its SQL time budget; raise Overloaded if either runs out."""
+    async with limiter.slot(endpoint):
+        token = query_budget_ms.set(QUERY_BUDGETS_MS.get(endpoint))
+        try:
+            return await fn()
+        except OperationalError as error:
+            if not is_query_timeout(error):
+                raise
+            shed_requests.inc(endpoint=endpoint, reason='timeout')
+            raise Overloaded(f"'{endpoint}' query exceeded its {QUERY_BUDGETS_MS[endpoint]} ms budget.") from error
+        finally:
+            query_budget_ms.reset(token)
+
+def mark_stale(endpoint: str):
+    stale_responses.inc(endpoint=endpoint)
+    marker = stale_marker.get()
+    if marker is not None:
+        marker.append(endpoint)
+
+async def stale_warning(request: Request, call_next):
+    """Mark responses that contain a last good result with a Warning header and keep caches from storing them."""
+    marker = []
+    token = stale_marker.set(marker)
+    try:
+        response = await call_next(request)
+    finally:
+        stale_marker.reset(token)
+
+    if marker:
+        response.headers['Warning'] = STALE_WARNING
+        response.headers['Cache-Control'] = 'no-store'
+    return response
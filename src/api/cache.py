@@ -0,0 +1,193 @@
+import os, time, functools
+from collections import OrderedDict
+from fastapi import HTTPException
+from fastapi.responses import Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.api.db.database import AsyncSessionLocal
+import src.api.db.models as db_models
+from src.api.intervals import window_anchor
+from src.api.singleflight import SingleFlight
+from src.api.budgets import Overloaded, run_within_budget, mark_stale, RETRY_AFTER_SECONDS
+from src.api.responses import JSONBytesResponse, dumps
+
+class ResponseCache:
+    """In-process LRU cache of endpoint responses, bounded by entry count and size.
+
+    Every entry is tagged with the data version it was computed under. The ETL
+    bumps `data_version` after each load; once a request sees a new version the
+    whole cache is dropped. The version row is read at most once every
+    `version_check_seconds`, so a hit normally costs no SQL at all.
+
+    Separately it remembers the last good response per endpoint and parameters
+    (at most `max_entries`), across versions and window anchors, to serve when
+    a fresh one cannot be computed in time.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl_seconds: float, version_check_seconds: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.version_check_seconds = version_check_seconds
+
+        self._entries = OrderedDict()
+        self._last_good = OrderedDict()
+        self._size = 0
+        self._version = None
+        self._version_checked_at = 0.0
+        self.updated_at = None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def version(self):
+        return self._version
+
+    def version_check_due(self):
+        return time.monotonic() - self._version_checked_at >= self.version_check_seconds
+
+    async def sync_version(self, db: AsyncSession | None = None):
+        if not self.version_check_due():
+            return
+        self._version_checked_at = time.monotonic()
+
+        row = await self._read_version(db)
+        version, self.updated_at = row if row else (0, None)
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self.clear()
+            self._version = version
+
+    async def refresh_version(self):
+        # 給沒有 session 的呼叫端（例如 middleware）用，只有到了檢查時間、而且真的要查時才開連線
+        await self.sync_version()
+
+    async def _read_version(self, db: AsyncSession | None):
+        query = select(db_models.DataVersion.version, db_models.DataVersion.updated_at).where(db_models.DataVersion.id == 1)
+        if db is None:
+            async with AsyncSessionLocal() as db:
+                return (await db.execute(query)).first()
+        return (await db.execute(query)).first()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        value, size, expires_at = entry
+        if time.monotonic() >= expires_at:
+            self._remove(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value, size: int):
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+
+        self._entries[key] = (value, size, time.monotonic() + self.ttl_seconds)
+        self._size += size
+
+        while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def remember(self, key, value):
+        self._last_good[key] = value
+        self._last_good.move_to_end(key)
+        while len(self._last_good) > self.max_entries:
+            self._last_good.popitem(last=False)
+
+    def last_good(self, key):
+        return self._last_good.get(key)
+
+    def clear(self):
+        self._entries.clear()
+        self._size = 0
+
+    def stats(self):
+        return {
+            'data_version': self._version,
+            'entries': len(self._entries),
+            'size_bytes': self._size,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+        }
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._size -= size
+
+response_cache = ResponseCache(
+    max_entries=int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 1024)),
+    max_bytes=int(os.getenv('RESPONSE_CACHE_MAX_BYTES', 64 * 1024 * 1024)),
+    ttl_seconds=float(os.getenv('RESPONSE_CACHE_TTL_SECONDS', 300)),
+    version_check_seconds=float(os.getenv('DATA_VERSION_CHECK_SECONDS', 5)),
+)
+
+query_flights = SingleFlight()
+
+def cached(endpoint: str):
+    """Cache an endpoint's serialized response by endpoint name, query parameters and window anchor.
+
+    The wrapped endpoint must take its session as the `db` keyword argument and
+    return a response model or plain dicts/lists; it is serialized to JSON
+    bytes once per computation and every hit reuses those bytes.
+    Keying on the quantized window anchor means sliding windows (last 7 days,
+    ...) move to a new entry once per INTERVAL_GRANULARITY; new data always
+    invalidates through the data version. On a miss, concurrent requests for
+    the same key share one computation through `query_flights`, which runs
+    within the endpoint's SQL time budget and concurrency limit (budgets.py).
+    If it is shed, the last good response is served marked stale, or 503 when
+    there is none.
+    """
+    def decorator(func):
+        async def compute(kwargs):
+            # 共用的查詢用自己的 session，發起的那個請求斷線時 session 才不會被關掉
+            async with AsyncSessionLocal() as db:
+                result = await run_within_budget(endpoint, lambda: func(**{**kwargs, 'db': db}))
+            # 在共用的計算裡序列化，等同一個查詢的請求拿到的都是同一份 bytes
+            return result if isinstance(result, Response) else dumps(result)
+
+        @functools.wraps(func)
+        async def wrapper(**kwargs):
+            await response_cache.sync_version(kwargs['db'])
+            params = tuple(sorted((name, value) for name, value in kwargs.items() if name != 'db'))
+            key = (endpoint, window_anchor()) + params
+
+            body = response_cache.get(key)
+            if body is None:
+                # 計算途中別的請求可能讀到新版本、清掉快取；那時算出來的是舊資料，不能放回新版本的快取
+                version = response_cache.version
+                try:
+                    body, joined = await query_flights.do((version,) + key, lambda: compute(kwargs))
+                except Overloaded as error:
+                    body = response_cache.last_good((endpoint,) + params)
+                    if body is None:
+                        raise HTTPException(status_code=503, detail=str(error), headers={"Retry-After": str(RETRY_AFTER_SECONDS)})
+                    mark_stale(endpoint)
+                    return JSONBytesResponse(body)
+                # 串流回應（StreamingResponse）只能送一次，不共用也不快取
+                if isinstance(body, Response):
+                    return await func(**kwargs) if joined else body
+                if not joined and response_cache.version == version:
+                    response_cache.put(key, body, size=len(body))
+                    response_cache.remember((endpoint,) + params, body)
+            return JSONBytesResponse(body)
+        return wrapper
+    return decorator
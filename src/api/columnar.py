@@ -0,0 +1,251 @@
+import sys, asyncio
+from collections import namedtuple
+from datetime import datetime, time
+from decimal import Decimal
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.api.db.database import AsyncSessionLocal
+import src.api.db.models as db_models
+import src.api.aggregates as aggregates
+from src.api.cache import response_cache
+from src.api.intervals import VALID_INTERVALS, INTERVAL_DAYS, get_interval_date_range
+
+LOAD_CHUNK_SIZE = 50000
+
+AddressTotal = namedtuple('AddressTotal', ['address', 'total_volume', 'transaction_count'])
+Resale = namedtuple('Resale', ['token_id', 'price_difference', 'seller'])
+
+def to_decimal(cents) -> Decimal:
+    return Decimal(int(round(cents))).scaleb(-2)
+
+class ColumnarEngine:
+    """In-memory column arrays of `transactions`, answering the analytics queries with NumPy.
+
+    Prices are kept as integer cents so sums are exact, like the DECIMAL
+    columns. Rows are appended by transaction_id whenever the data version
+    changes. Everything is reloaded only when `rebuild_generation` in
+    data_version changes, which `rebuild.py` bumps after rewriting rows.
+    The functions mirror src.api.aggregates, so the endpoints can use either.
+    """
+
+    def __init__(self):
+        self.transaction_id = np.empty(0, np.int64)
+        self.time = np.empty(0, 'datetime64[us]')
+        self.token_id = np.empty(0, np.int32)
+        self.buyer_id = np.empty(0, np.int32)
+        self.seller_id = np.empty(0, np.int32)
+        self.market_id = np.empty(0, np.int32)
+        self.price = np.empty(0, np.int64)
+        self.previous_price = np.empty(0, np.int64)
+        self.has_previous = np.empty(0, bool)
+
+        self.addresses = {}
+        self.markets = {}
+        self.windows = {}
+        self.version = None
+        self.rebuild_generation = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def last_transaction_id(self):
+        return int(self.transaction_id[-1]) if len(self.transaction_id) else 0
+
+    async def sync(self, db: AsyncSession):
+        await response_cache.sync_version(db)
+        if self.version is not None and self.version == response_cache.version:
+            return
+
+        async with self._lock:
+            version = response_cache.version
+            if self.version is not None and self.version == version:
+                return
+            rebuild_generation = (await db.execute(
+                select(db_models.DataVersion.rebuild_generation).where(db_models.DataVersion.id == 1)
+            )).scalar() or 0
+            if rebuild_generation != self.rebuild_generation:
+                self.__init_columns()
+                self.addresses.clear()
+            await self._load_rows(db, self.last_transaction_id)
+            await self._load_dimensions(db)
+            self.version = version
+            self.rebuild_generation = rebuild_generation
+
+    def __init_columns(self):
+        for name, column in vars(self).items():
+            if isinstance(column, np.ndarray):
+                setattr(self, name, column[:0])
+
+    async def _load_rows(self, db: AsyncSession, since_transaction_id: int):
+        result = await db.stream(
+            select(
+                db_models.Transaction.transaction_id,
+                db_models.Transaction.time,
+                db_models.Transaction.token_id,
+                db_models.Transaction.buyer_id,
+                db_models.Transaction.seller_id,
+                db_models.Transaction.market_id,
+                db_models.Transaction.price,
+                db_models.Transaction.previous_price
+            )
+            .where(db_models.Transaction.transaction_id > since_transaction_id)
+            .order_by(db_models.Transaction.transaction_id)
+            .execution_options(yield_per=LOAD_CHUNK_SIZE)
+        )
+
+        chunks = []
+        async for partition in result.partitions():
+            transaction_ids, times, token_ids, buyer_ids, seller_ids, market_ids, prices, previous_prices = zip(*partition)
+            chunks.append({
+                'transaction_id': np.array(transaction_ids, np.int64),
+                'time': np.array(times, 'datetime64[us]'),
+                'token_id': np.array(token_ids, np.int32),
+                # NULL 的外鍵記成 -1
+                'buyer_id': np.array([-1 if value is None else value for value in buyer_ids], np.int32),
+                'seller_id': np.array([-1 if value is None else value for value in seller_ids], np.int32),
+                'market_id': np.array([-1 if value is None else value for value in market_ids], np.int32),
+                'price': np.array([int(value * 100) for value in prices], np.int64),
+                'previous_price': np.array([0 if value is None else int(value * 100) for value in previous_prices], np.int64),
+                'has_previous': np.array([value is not None for value in previous_prices], bool),
+            })
+
+        for name in (chunks[0] if chunks else ()):
+            setattr(self, name, np.concatenate([getattr(self, name)] + [chunk[name] for chunk in chunks]))
+
+    async def _load_dimensions(self, db: AsyncSession):
+        max_address_id = max(self.addresses, default=0)
+        self.addresses.update((await db.execute(
+            select(db_models.Address.id, db_models.Address.address).where(db_models.Address.id > max_address_id)
+        )).all())
+        self.markets = dict((await db.execute(select(db_models.Market.id, db_models.Market.name))).all())
+        self.windows = dict((await db.execute(
+            select(db_models.LeaderboardWindow.interval_id, db_models.LeaderboardWindow.window_start)
+        )).all())
+
+    def _since(self, start_time):
+        if start_time is None:
+            return np.ones(len(self.time), bool)
+        # transactions.time 存的是不帶時區的 UTC
+        return self.time >= np.datetime64(start_time.replace(tzinfo=None), 'us')
+
+    def _leaderboard_mask(self, interval: int):
+        # 排行榜的區間和 ETL 一樣，從 leaderboard_windows 記錄的那天 00:00 開始算
+        if INTERVAL_DAYS.get(interval) is None:
+            return self._since(None)
+        window_start = self.windows.get(interval)
+        if window_start is None:
+            return np.zeros(len(self.time), bool)
+        return self._since(datetime.combine(window_start, time.min))
+
+    def _top(self, rows, primary, secondary, limit: int):
+        # argpartition 找出第 limit 名的門檻，門檻上同分的全部留下再排序，結果才和 SQL 的 ORDER BY 一致
+        if len(rows) > limit:
+            threshold = primary[np.argpartition(-primary, limit - 1)[limit - 1]]
+            keep = primary >= threshold
+            rows, primary, secondary = rows[keep], primary[keep], secondary[keep]
+        return rows[np.lexsort((secondary, -primary))][:limit]
+
+    async def time_based_totals(self, db: AsyncSession, start_time: datetime | None):
+        await self.sync(db)
+        rows = np.flatnonzero(self._since(start_time))
+        prices = self.price[rows]
+        total_volume = to_decimal(prices.sum())
+        transaction_count = len(rows)
+
+        highest = None
+        if transaction_count:
+            candidates = rows[prices == prices.max()]
+            # 同價時取較早的一筆，和 rollup 的規則一致
+            highest = candidates[np.lexsort((self.transaction_id[candidates], self.time[candidates]))[0]]
+
+        return {
+            'total_volume': total_volume,
+            'transaction_count': transaction_count,
+            'average_price': total_volume / transaction_count if transaction_count else Decimal(0),
+            'highest_price_token_id': int(self.token_id[highest]) if highest is not None else None,
+            'highest_price': to_decimal(self.price[highest]) if highest is not None else None,
+        }
+
+    async def marketplace_totals(self, db: AsyncSession, start_time: datetime | None):
+        await self.sync(db)
+        mask = self._since(start_time) & (self.market_id >= 0)
+        market_ids = self.market_id[mask]
+        volumes = np.bincount(market_ids, weights=self.price[mask])
+        counts = np.bincount(market_ids)
+
+        totals = [
+            (self.markets[market_id], to_decimal(volumes[market_id]), int(counts[market_id]))
+            for market_id in np.flatnonzero(counts)
+            if market_id in self.markets
+        ]
+        return [
+            {
+                'marketplace': marketplace,
+                'total_volume': total_volume,
+                'transaction_count': transaction_count,
+                'average_price': total_volume / transaction_count,
+            }
+            for marketplace, total_volume, transaction_count in sorted(totals, key=lambda market: market[1], reverse=True)
+        ]
+
+    async def top_addresses(self, db: AsyncSession, role: str, interval: int, limit: int):
+        await self.sync(db)
+        address_ids = self.buyer_id if role == 'buyer' else self.seller_id
+        mask = self._leaderboard_mask(interval) & (address_ids >= 0)
+        volumes = np.bincount(address_ids[mask], weights=self.price[mask])
+        counts = np.bincount(address_ids[mask])
+
+        candidates = np.flatnonzero(counts)
+        # 同額時 address_id 大的在前
+        top = self._top(candidates, volumes[candidates], -candidates, limit)
+        return [
+            AddressTotal(self.addresses.get(int(address_id)), to_decimal(volumes[address_id]), int(counts[address_id]))
+            for address_id in top
+        ]
+
+    async def top_resales(self, db: AsyncSession, interval: int, limit: int):
+        await self.sync(db)
+        rows = np.flatnonzero(self._leaderboard_mask(interval) & self.has_previous & (self.seller_id >= 0))
+        differences = self.price[rows] - self.previous_price[rows]
+
+        top = self._top(rows, differences, self.transaction_id[rows], limit)
+        return [
+            Resale(int(self.token_id[row]), to_decimal(self.price[row] - self.previous_price[row]), self.addresses.get(int(self.seller_id[row])))
+            for row in top
+        ]
+
+columnar_engine = ColumnarEngine()
+
+async def verify(limit: int = 100):
+    """Run every analytics query through both engines and print the ones that differ."""
+    consistent = True
+    async with AsyncSessionLocal() as db:
+        await columnar_engine.sync(db)
+        print(f'Loaded {len(columnar_engine.transaction_id)} transactions (data version {columnar_engine.version}).')
+
+        for interval in VALID_INTERVALS:
+            start_time = get_interval_date_range(interval)
+            checks = {
+                'time-based': (aggregates.time_based_totals(db, start_time), columnar_engine.time_based_totals(db, start_time)),
+                'marketplaces': (aggregates.marketplace_totals(db, start_time), columnar_engine.marketplace_totals(db, start_time)),
+                'top buyers': (aggregates.top_addresses(db, 'buyer', interval, limit), columnar_engine.top_addresses(db, 'buyer', interval, limit)),
+                'top sellers': (aggregates.top_addresses(db, 'seller', interval, limit), columnar_engine.top_addresses(db, 'seller', interval, limit)),
+                'top resales': (aggregates.top_resales(db, interval, limit), columnar_engine.top_resales(db, interval, limit)),
+            }
+            for name, (sql_query, columnar_query) in checks.items():
+                sql_result, columnar_result = await sql_query, await columnar_query
+                if not isinstance(sql_result, dict):
+                    sql_result = [row if isinstance(row, dict) else tuple(row) for row in sql_result]
+                    columnar_result = [row if isinstance(row, dict) else tuple(row) for row in columnar_result]
+                matches = sql_result == columnar_result
+                print(f'Interval {interval} {name}: {"OK" if matches else "MISMATCH"}')
+                if not matches:
+                    print(f'  sql:      {sql_result}\n  columnar: {columnar_result}')
+                consistent = consistent and matches
+    return consistent
+
+if __name__ == '__main__':
+    # python -m src.api.columnar --verify
+    if sys.argv[1:] != ['--verify']:
+        sys.exit('usage: python -m src.api.columnar --verify')
+    sys.exit(0 if asyncio.run(verify()) else 1)
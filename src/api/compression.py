@@ -0,0 +1,82 @@
+import os, zlib
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', 1024))
+COMPRESSIBLE_TYPES = ('application/json', 'text/')
+
+def negotiate(accept_encoding: str):
+    # 只看有沒有列出、q 是不是 0；有裝 brotli 就優先用 br
+    accepted = set()
+    for item in accept_encoding.lower().split(','):
+        name, _, params = item.partition(';')
+        params = params.replace(' ', '')
+        if params.startswith('q='):
+            try:
+                if float(params[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name.strip())
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=5)
+    compressor = zlib.compressobj(6, wbits=31)
+    return compressor.compress(body) + compressor.flush()
+
+class CompressionMiddleware:
+    """Compress complete JSON/text responses of at least `minimum_size` bytes with br or gzip.
+
+    Unlike Starlette's GZipMiddleware it never touches streamed responses
+    (exports, NDJSON, Server-Sent Events), which must reach the client chunk
+    by chunk, or responses that already have a Content-Encoding.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        encoding = negotiate(Headers(scope=scope).get('accept-encoding', ''))
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, passthrough
+            if message['type'] == 'http.response.start':
+                start = message
+                return
+            if passthrough:
+                return await send(message)
+
+            passthrough = True
+            headers = MutableHeaders(raw=start['headers'])
+            body = message.get('body', b'')
+            compressible = headers.get('content-type', '').startswith(COMPRESSIBLE_TYPES)
+            if compressible and not message.get('more_body', False) and 'content-encoding' not in headers:
+                headers.add_vary_header('Accept-Encoding')
+                if len(body) >= self.minimum_size:
+                    body = compress(body, encoding)
+                    headers['Content-Encoding'] = encoding
+                    headers['Content-Length'] = str(len(body))
+                    message = {**message, 'body': body}
+            await send(start)
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
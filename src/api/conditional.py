@@ -0,0 +1,80 @@
+import os
+from datetime import timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import Request, Response
+from src.api.cache import response_cache
+from src.api.intervals import window_anchor
+
+# 這些端點的結果只會隨 ETL 載入（data version）和區間錨點改變
+CONDITIONAL_PATHS = {
+    "/api/v1/time-based-data",
+    "/api/v1/time-series",
+    "/api/v1/top-buyers-sellers",
+    "/api/v1/marketplace-comparison",
+    "/api/v1/top-resale-token",
+    "/api/v1/token-transaction",
+    "/api/v1/token-summary",
+    "/api/v1/dashboard",
+}
+CONDITIONAL_PREFIXES = ("/api/v1/address/",)
+CACHE_MAX_AGE = int(os.getenv('API_CACHE_MAX_AGE', 60))
+
+def validators():
+    """Return (etag, last_modified) for the current data version and window anchor, or None if unknown."""
+    if response_cache.version is None:
+        return None
+
+    anchor = window_anchor()
+    last_modified = anchor
+    if response_cache.updated_at:
+        last_modified = max(anchor, response_cache.updated_at.replace(tzinfo=timezone.utc))
+    return f'W/"{response_cache.version}-{int(anchor.timestamp())}"', last_modified
+
+def not_modified(request: Request, etag: str, last_modified):
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        # HTTP-date 一律是 GMT；"-0000" 之類的時區會被解析成不帶時區的時間，和帶時區的比較會出錯
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+async def conditional_get(request: Request, call_next):
+    """Add ETag/Last-Modified/Cache-Control to analytics responses and answer revalidations with 304.
+
+    The validators come from the data version the response cache already tracks,
+    so a matching If-None-Match is answered before any endpoint query runs.
+    """
+    path = request.url.path
+    if request.method != "GET" or not (path in CONDITIONAL_PATHS or path.startswith(CONDITIONAL_PREFIXES)):
+        return await call_next(request)
+
+    await response_cache.refresh_version()
+    current = validators()
+    if current is None:
+        return await call_next(request)
+
+    etag, last_modified = current
+    headers = {
+        "ETag": etag,
+        "Last-Modified": format_datetime(last_modified, usegmt=True),
+        "Cache-Control": f"public, max-age={CACHE_MAX_AGE}",
+    }
+
+    if not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+
+    response = await call_next(request)
+    # 過期的備用結果（有 Warning）不能掛上目前版本的 ETag 被快取
+    if response.status_code == 200 and "warning" not in response.headers:
+        response.headers.update(headers)
+    return response
@@ -1,11 +1,132 @@
-import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import os, time, asyncio, logging
+from sqlalchemy import event, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import declarative_base, Session
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from dotenv import load_dotenv
+from src.api import metrics, budgets
 
 load_dotenv()
-DATABASE_URL = f"mysql+pymysql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
+logger = logging.getLogger("src.api.db")
 
-engine = create_engine(DATABASE_URL, echo=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def database_url(prefix: str):
+    # DB_REPLICA_* 沒設定的帳號、密碼、埠號、資料庫名稱沿用 primary 的
+    setting = lambda name: os.getenv(f'{prefix}_{name}', os.getenv(f'DB_{name}'))
+    return f"mysql+aiomysql://{setting('USER')}:{setting('PASSWORD')}@{setting('HOST')}:{setting('PORT')}/{setting('NAME')}"
+
+DATABASE_URL = database_url('DB')
+REPLICA_DATABASE_URL = database_url('DB_REPLICA') if os.getenv('DB_REPLICA_HOST') else None
+REPLICA_CHECK_SECONDS = float(os.getenv('REPLICA_CHECK_SECONDS', 5))
+REPLICA_CHECK_TIMEOUT = 2
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    # 記錄等連線池給連線的時間（池滿時會一直等到 pool_timeout）
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.pool_checkout_wait.observe(time.perf_counter() - started)
+
+def create_engine(url: str):
+    # 連線池大小要明確設定，超過 pool_timeout 拿不到連線就直接報錯，不要無限等待
+    # 每條 SQL 都印出來很慢，只有除錯時才用 DB_ECHO=true 打開
+    engine = create_async_engine(
+        url,
+        echo=os.getenv('DB_ECHO', 'false').lower() in ('1', 'true', 'yes'),
+        poolclass=TimedQueuePool,
+        pool_size=int(os.getenv('DB_POOL_SIZE', 10)),
+        max_overflow=int(os.getenv('DB_MAX_OVERFLOW', 5)),
+        pool_timeout=float(os.getenv('DB_POOL_TIMEOUT', 10)),
+        pool_recycle=int(os.getenv('DB_POOL_RECYCLE', 1800)),
+        pool_pre_ping=True,
+    )
+    event.listen(engine.sync_engine, "before_cursor_execute", metrics.before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", metrics.after_cursor_execute)
+    event.listen(engine.sync_engine, "before_cursor_execute", budgets.add_execution_hint, retval=True)
+    return engine
+
+engine = create_engine(DATABASE_URL)
+replica_engine = create_engine(REPLICA_DATABASE_URL) if REPLICA_DATABASE_URL else None
+
+class ReplicaRouter:
+    """Decide whether API reads go to the read replica or the primary.
+
+    Every `check_seconds` it reads the data version (the ETL's load watermark)
+    from both servers. Reads use the replica only while it has replayed the
+    primary's latest load; when it is behind or unreachable they fall back to
+    the primary until a later check finds it caught up. Because the response
+    cache reads its data version through the same routing, cached responses
+    always match the data of the server that answered them.
+    """
+
+    def __init__(self, primary, replica, check_seconds: float):
+        self.primary = primary
+        self.replica = replica
+        self.check_seconds = check_seconds
+        self.use_replica = False
+        self.primary_version = None
+        self.replica_version = None
+        self._task = None
+
+    async def _read_version(self, engine):
+        async def read():
+            async with engine.connect() as conn:
+                return (await conn.execute(text("SELECT version FROM data_version WHERE id = 1"))).scalar() or 0
+        try:
+            return await asyncio.wait_for(read(), REPLICA_CHECK_TIMEOUT)
+        except (SQLAlchemyError, OSError, asyncio.TimeoutError) as e:
+            logger.warning("Could not read the data version from %s: %s", engine.url.host, e)
+            return None
+
+    async def check(self):
+        self.replica_version = await self._read_version(self.replica)
+        self.primary_version = await self._read_version(self.primary)
+        # primary 連不上時，有資料的 replica 總比沒有好
+        self.use_replica = self.replica_version is not None and (self.primary_version is None or self.replica_version >= self.primary_version)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.check_seconds)
+            await self.check()
+
+    async def start(self):
+        if self.replica is None:
+            return
+        await self.check()
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    def bind_for(self, clause, flushing: bool):
+        # 寫入（NFT metadata 快取）一律走 primary
+        if self.use_replica and not flushing and not isinstance(clause, UpdateBase):
+            return self.replica.sync_engine
+        return self.primary.sync_engine
+
+replica_router = ReplicaRouter(engine, replica_engine, REPLICA_CHECK_SECONDS)
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        return replica_router.bind_for(clause, self._flushing)
+
+def pool_gauges():
+    for prefix, pool_engine in (('db_pool', engine), ('db_replica_pool', replica_engine)):
+        if pool_engine is None:
+            continue
+        pool = pool_engine.sync_engine.pool
+        yield f'{prefix}_size', 'Configured pool size.', pool.size()
+        yield f'{prefix}_checked_out', 'Connections currently checked out of the pool.', pool.checkedout()
+        yield f'{prefix}_overflow', 'Connections open beyond pool_size.', max(pool.overflow(), 0)
+    if replica_engine is not None:
+        yield 'db_reads_on_replica', '1 while reads go to the replica, 0 while they fall back to the primary.', int(replica_router.use_replica)
+
+metrics.registry.collectors.append(pool_gauges)
+
+AsyncSessionLocal = async_sessionmaker(sync_session_class=RoutingSession, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
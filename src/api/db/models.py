@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, DECIMAL
+from sqlalchemy import Index, Column, Integer, BigInteger, String, ForeignKey, Date, DateTime, DECIMAL
 from sqlalchemy.orm import relationship
 from src.api.db.database import Base
 
@@ -21,13 +21,109 @@ class Transaction(Base):
     __tablename__ = 'transactions'
     transaction_id = Column(Integer, primary_key=True, index=True)
     transaction_hash = Column(String(255), nullable=False)
-    time = Column(DateTime, nullable=False, index=True)
+    time = Column(DateTime, primary_key=True)
     action_id = Column(Integer, ForeignKey('actions.id'))
     buyer_id = Column(Integer, ForeignKey('addresses.id'))
     token_id = Column(Integer, nullable=False)
     price = Column(DECIMAL(20, 2), nullable=False)
     market_id = Column(Integer, ForeignKey('markets.id'))
+    seller_id = Column(Integer, ForeignKey('addresses.id'), index=True)
+    previous_price = Column(DECIMAL(20, 2))
 
     action = relationship("Action", backref="transactions")
-    buyer = relationship("Address", backref="transactions")
+    buyer = relationship("Address", backref="transactions", foreign_keys=[buyer_id])
+    seller = relationship("Address", foreign_keys=[seller_id])
     market = relationship("Market", backref="transactions")
+
+    # 依 time 按月分割（PARTITION BY RANGE COLUMNS），所以 time 也在主鍵裡；分割定義在 models.sql
+    __table_args__ = (
+        Index('token_time_idx', 'token_id', 'time'),
+        Index('time_market_price_idx', 'time', 'market_id', 'price'),
+        Index('buyer_time_price_idx', 'buyer_id', 'time', 'price'),
+    )
+
+class DailyStats(Base):
+    __tablename__ = 'daily_stats'
+    day = Column(Date, primary_key=True)
+    total_volume = Column(DECIMAL(30, 2), nullable=False)
+    transaction_count = Column(Integer, nullable=False)
+    min_price = Column(DECIMAL(20, 2), nullable=False)
+    max_price = Column(DECIMAL(20, 2), nullable=False)
+    max_price_token_id = Column(Integer, nullable=False)
+    open_price = Column(DECIMAL(20, 2))
+    open_time = Column(DateTime)
+    close_price = Column(DECIMAL(20, 2))
+    close_time = Column(DateTime)
+
+class DailyMarketStats(Base):
+    __tablename__ = 'daily_market_stats'
+    day = Column(Date, primary_key=True)
+    market_id = Column(Integer, ForeignKey('markets.id'), primary_key=True)
+    total_volume = Column(DECIMAL(30, 2), nullable=False)
+    transaction_count = Column(Integer, nullable=False)
+    min_price = Column(DECIMAL(20, 2), nullable=False)
+    max_price = Column(DECIMAL(20, 2), nullable=False)
+    max_price_token_id = Column(Integer, nullable=False)
+    open_price = Column(DECIMAL(20, 2))
+    open_time = Column(DateTime)
+    close_price = Column(DECIMAL(20, 2))
+    close_time = Column(DateTime)
+
+    market = relationship("Market")
+
+class DataVersion(Base):
+    __tablename__ = 'data_version'
+    id = Column(Integer, primary_key=True)
+    version = Column(BigInteger, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
+    rebuild_generation = Column(BigInteger, nullable=False, default=0)
+
+class NFTMetadata(Base):
+    __tablename__ = 'nft_metadata'
+    token_id = Column(Integer, primary_key=True)
+    image_url = Column(String(512))
+    rarity_rank = Column(Integer)
+    fetched_at = Column(DateTime, nullable=False)
+
+class AddressLeaderboard(Base):
+    __tablename__ = 'address_leaderboards'
+    role = Column(String(6), primary_key=True)
+    interval_id = Column(Integer, primary_key=True)
+    address_id = Column(Integer, ForeignKey('addresses.id'), primary_key=True)
+    total_volume = Column(DECIMAL(30, 2), nullable=False)
+    transaction_count = Column(Integer, nullable=False)
+
+class ResaleLeaderboard(Base):
+    __tablename__ = 'resale_leaderboards'
+    interval_id = Column(Integer, primary_key=True)
+    transaction_id = Column(Integer, primary_key=True)
+    token_id = Column(Integer, nullable=False)
+    seller_id = Column(Integer, ForeignKey('addresses.id'), nullable=False)
+    price_difference = Column(DECIMAL(20, 2), nullable=False)
+
+class LeaderboardWindow(Base):
+    __tablename__ = 'leaderboard_windows'
+    interval_id = Column(Integer, primary_key=True)
+    window_start = Column(Date, nullable=False)
+
+class TokenSummary(Base):
+    __tablename__ = 'token_summaries'
+    token_id = Column(Integer, primary_key=True)
+    sale_count = Column(Integer, nullable=False, default=0)
+    total_volume = Column(DECIMAL(30, 2), nullable=False, default=0)
+    max_price = Column(DECIMAL(20, 2))
+    max_price_time = Column(DateTime)
+    last_price = Column(DECIMAL(20, 2))
+    last_sale_time = Column(DateTime)
+    last_buyer_id = Column(Integer, ForeignKey('addresses.id'), index=True)
+
+    last_buyer = relationship("Address")
+
+class AddressStats(Base):
+    __tablename__ = 'address_stats'
+    address_id = Column(Integer, ForeignKey('addresses.id'), primary_key=True)
+    buy_count = Column(Integer, nullable=False, default=0)
+    buy_volume = Column(DECIMAL(30, 2), nullable=False, default=0)
+    sell_count = Column(Integer, nullable=False, default=0)
+    sell_volume = Column(DECIMAL(30, 2), nullable=False, default=0)
+    realized_pnl = Column(DECIMAL(30, 2), nullable=False, default=0)
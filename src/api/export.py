@@ -0,0 +1,148 @@
+import io, csv, zlib
+from sqlalchemy.orm import aliased
+from sqlalchemy import select
+from src.api.db.database import AsyncSessionLocal
+from src.api.responses import dumps
+import src.api.db.models as db_models
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet',
+}
+COLUMNS = ['transaction_id', 'transaction_hash', 'time', 'token_id', 'price', 'previous_price', 'marketplace', 'buyer_address', 'seller_address']
+
+def export_query(start_time, end_time):
+    buyer = aliased(db_models.Address)
+    seller = aliased(db_models.Address)
+    return (
+        select(
+            db_models.Transaction.transaction_id,
+            db_models.Transaction.transaction_hash,
+            db_models.Transaction.time,
+            db_models.Transaction.token_id,
+            db_models.Transaction.price,
+            db_models.Transaction.previous_price,
+            db_models.Market.name,
+            buyer.address,
+            seller.address
+        )
+        .outerjoin(db_models.Market, db_models.Transaction.market_id == db_models.Market.id)
+        .outerjoin(buyer, db_models.Transaction.buyer_id == buyer.id)
+        .outerjoin(seller, db_models.Transaction.seller_id == seller.id)
+        .where(db_models.Transaction.time >= start_time, db_models.Transaction.time < end_time)
+        .order_by(db_models.Transaction.time, db_models.Transaction.transaction_id)
+    )
+
+class ChunkSink(io.RawIOBase):
+    """Write-only file that hands back whatever was written since the last drain().
+
+    tell() keeps counting across drains, because the Parquet writer records
+    absolute offsets in the footer.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._buffer += data
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+class CsvEncoder:
+    def __init__(self):
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+        self._writer.writerow(COLUMNS)
+
+    def encode(self, rows):
+        self._writer.writerows(rows)
+        data = self._buffer.getvalue().encode()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data
+
+    def finish(self):
+        return self.encode([])
+
+def export_record(row):
+    # 和 token-transaction 的 NDJSON 一樣：價格是數字，時間是 ISO-8601（有 T）
+    record = dict(zip(COLUMNS, row))
+    for key in ('price', 'previous_price'):
+        if record[key] is not None:
+            record[key] = float(record[key])
+    return record
+
+class NdjsonEncoder:
+    def encode(self, rows):
+        return b"".join(dumps(export_record(row)) + b"\n" for row in rows)
+
+    def finish(self):
+        return b""
+
+class ParquetEncoder:
+    SCHEMA = pa.schema([
+        ('transaction_id', pa.int64()),
+        ('transaction_hash', pa.string()),
+        ('time', pa.timestamp('us')),
+        ('token_id', pa.int32()),
+        ('price', pa.decimal128(20, 2)),
+        ('previous_price', pa.decimal128(20, 2)),
+        ('marketplace', pa.string()),
+        ('buyer_address', pa.string()),
+        ('seller_address', pa.string()),
+    ]) if pa else None
+
+    def __init__(self):
+        self._sink = ChunkSink()
+        self._writer = pq.ParquetWriter(self._sink, self.SCHEMA)
+
+    def encode(self, rows):
+        # 每個 chunk 寫成一個 row group，寫完就把這段送出去
+        columns = list(zip(*rows)) or [[] for _ in COLUMNS]
+        self._writer.write_table(pa.Table.from_arrays(
+            [pa.array(column, type=field.type) for column, field in zip(columns, self.SCHEMA)],
+            schema=self.SCHEMA
+        ))
+        return self._sink.drain()
+
+    def finish(self):
+        self._writer.close()
+        return self._sink.drain()
+
+ENCODERS = {'csv': CsvEncoder, 'ndjson': NdjsonEncoder, 'parquet': ParquetEncoder}
+
+async def stream_export(query, format: str, chunk_size: int, compress: bool):
+    """Stream the query's rows in the given format, chunk by chunk, from a server-side cursor.
+
+    Only one chunk of rows (and its encoded bytes) is held in memory at a time.
+    """
+    encoder = ENCODERS[format]()
+    compressor = zlib.compressobj(wbits=31) if compress else None
+
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=chunk_size))
+        async for partition in result.partitions():
+            data = encoder.encode([tuple(row) for row in partition])
+            yield compressor.compress(data) if compressor else data
+
+    data = encoder.finish()
+    yield compressor.compress(data) + compressor.flush() if compressor else data
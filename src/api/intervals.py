@@ -0,0 +1,42 @@
+import os
+from datetime import datetime, timedelta, timezone
+
+VALID_INTERVALS = [0, 1, 2, 3]
+INTERVAL_DAYS = {0: 7, 1: 30, 2: 365, 3: None}
+
+GRANULARITIES = {
+    'minute': timedelta(minutes=1),
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1),
+}
+INTERVAL_GRANULARITY = os.getenv('INTERVAL_GRANULARITY', 'hour')
+if INTERVAL_GRANULARITY not in GRANULARITIES:
+    raise ValueError(f"Invalid INTERVAL_GRANULARITY '{INTERVAL_GRANULARITY}'. Valid values are: {list(GRANULARITIES)}")
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+def window_anchor(now: datetime | None = None) -> datetime:
+    """Floor `now` (UTC) to INTERVAL_GRANULARITY.
+
+    Every request inside the same granule gets the same anchor, so the same
+    window, the same SQL parameters and the same cache key.
+    """
+    now = now or datetime.now(timezone.utc)
+    step = GRANULARITIES[INTERVAL_GRANULARITY]
+    return now - (now - EPOCH) % step
+
+def get_interval_date_range(interval: int, now: datetime | None = None):
+    """Return the inclusive start of the interval's window, or None for all time.
+
+    The window covers every loaded sale with time >= window_anchor(now) - N days.
+    It has no upper bound, because sales only arrive with an ETL load (which
+    bumps the data version). With 'hour' granularity the first day of the
+    window is partial: whole days come from the daily rollups and only that
+    first partial day is read from transactions. With 'day' granularity the
+    window starts at midnight and is served from rollups alone, which is also
+    how the leaderboards count their windows.
+    """
+    days = INTERVAL_DAYS.get(interval)
+    if days is None:
+        return None
+    return window_anchor(now) - timedelta(days=days)
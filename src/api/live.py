@@ -0,0 +1,155 @@
+import os, asyncio, logging
+from sqlalchemy import select, func
+from sqlalchemy.orm import aliased
+from src.api.db.database import AsyncSessionLocal
+import src.api.db.models as db_models
+import src.api.models as api_models
+from src.api.cache import response_cache
+
+logger = logging.getLogger("src.api.live")
+
+LIVE_POLL_SECONDS = float(os.getenv('LIVE_POLL_SECONDS', 5))
+LIVE_HEARTBEAT_SECONDS = float(os.getenv('LIVE_HEARTBEAT_SECONDS', 15))
+LIVE_MAX_SALES = 100
+SUBSCRIBER_QUEUE_SIZE = 8
+
+def format_event(event: str, data: str, id=None):
+    lines = [f'event: {event}']
+    if id is not None:
+        lines.append(f'id: {id}')
+    lines.append(f'data: {data}')
+    return ('\n'.join(lines) + '\n\n').encode()
+
+class LiveFeed:
+    """Push new sales and headline totals to Server-Sent Events subscribers.
+
+    One poller per worker watches the data version the ETL bumps after each
+    load (through the response cache, so it costs no extra queries) and, when
+    it changes, reads the new sales once and puts the same encoded event on
+    every subscriber's queue. The poller only runs while someone is
+    subscribed; an idle subscriber is just a parked coroutine and a heartbeat
+    every LIVE_HEARTBEAT_SECONDS.
+    """
+
+    def __init__(self, headline):
+        # headline(): 回傳要一起推送的總計（TimeBasedResponse 的 JSON 回應），由 main 提供，走 response cache
+        self.headline = headline
+        self._subscribers = set()
+        self._poller = None
+        self._version = None
+        self._last_transaction_id = None
+        self.latest = None
+        self.events = 0
+        self.dropped = 0
+
+    def subscribe(self):
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        if self._poller is None or self._poller.done():
+            self._poller = asyncio.create_task(self._poll())
+        return queue
+
+    def unsubscribe(self, queue):
+        self._subscribers.discard(queue)
+
+    async def close(self):
+        if self._poller is not None:
+            self._poller.cancel()
+            await asyncio.gather(self._poller, return_exceptions=True)
+
+    def publish(self, event: bytes):
+        self.latest = event
+        self.events += 1
+        for queue in self._subscribers:
+            if queue.full():
+                # 跟不上的客戶端丟掉最舊的事件，不讓它拖住其他人
+                queue.get_nowait()
+                self.dropped += 1
+            queue.put_nowait(event)
+
+    async def stream(self):
+        """Yield the SSE byte stream for one subscriber until it disconnects."""
+        queue = self.subscribe()
+        # 訂閱當下的最新事件先送出，之後的事件都從 queue 來，不會重複
+        latest = self.latest
+        try:
+            yield f'retry: {int(LIVE_POLL_SECONDS * 1000)}\n\n'.encode()
+            if latest is not None:
+                yield latest
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), LIVE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    # 註解行，讓 proxy 和瀏覽器知道連線還活著
+                    yield b': keep-alive\n\n'
+        finally:
+            self.unsubscribe(queue)
+
+    async def _poll(self):
+        while self._subscribers:
+            try:
+                await response_cache.refresh_version()
+                version = response_cache.version
+                if version != self._version:
+                    event = await self._build_event(first=self._version is None, version=version)
+                    self._version = version
+                    self.publish(event)
+            except Exception:
+                # 資料庫暫時連不上時保持訂閱，下一輪再試
+                logger.exception("Live feed poll failed")
+            await asyncio.sleep(LIVE_POLL_SECONDS)
+
+    async def _build_event(self, first: bool, version: int):
+        async with AsyncSessionLocal() as db:
+            if first:
+                # 第一次只記下目前最新的一筆，之後只推送新的交易
+                self._last_transaction_id = (await db.execute(select(func.max(db_models.Transaction.transaction_id)))).scalar() or 0
+                sales = []
+            else:
+                sales = await self._new_sales(db)
+        time_based = api_models.TimeBasedResponse.model_validate_json((await self.headline()).body)
+
+        event = api_models.LiveEvent(data_version=version, sales=sales, time_based=time_based)
+        return format_event('sales', event.model_dump_json(), id=version)
+
+    async def _new_sales(self, db):
+        buyer = aliased(db_models.Address)
+        seller = aliased(db_models.Address)
+        rows = (await db.execute(
+            select(
+                db_models.Transaction.transaction_id,
+                db_models.Transaction.transaction_hash,
+                db_models.Transaction.time,
+                db_models.Transaction.token_id,
+                db_models.Transaction.price,
+                db_models.Market.name,
+                buyer.address,
+                seller.address
+            )
+            .outerjoin(db_models.Market, db_models.Transaction.market_id == db_models.Market.id)
+            .outerjoin(buyer, db_models.Transaction.buyer_id == buyer.id)
+            .outerjoin(seller, db_models.Transaction.seller_id == seller.id)
+            .where(db_models.Transaction.transaction_id > self._last_transaction_id)
+            .order_by(db_models.Transaction.transaction_id.desc())
+            .limit(LIVE_MAX_SALES)
+        )).all()
+        if rows:
+            self._last_transaction_id = rows[0].transaction_id
+
+        return [
+            api_models.LiveSale(
+                transaction_hash=transaction_hash,
+                sold_date=sold_date,
+                token_id=str(token_id),
+                price=float(price),
+                marketplace=marketplace,
+                buyer_address=buyer_address,
+                seller_address=seller_address
+            )
+            for _, transaction_hash, sold_date, token_id, price, marketplace, buyer_address, seller_address in reversed(rows)
+        ]
+
+    def gauges(self):
+        yield 'live_subscribers', 'Open /api/v1/live connections.', len(self._subscribers)
+        yield 'live_events', 'Events published to live subscribers.', self.events
+        yield 'live_dropped_events', 'Events dropped because a subscriber fell behind.', self.dropped
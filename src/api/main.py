@@ -1,75 +1,104 @@
-import os, requests, json
+import os, asyncio
+from contextlib import asynccontextmanager
+from datetime import date, datetime, time, timedelta
+from typing import Optional
 from dotenv import load_dotenv
 from fastapi import FastAPI, HTTPException, Query, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import func
-from sqlalchemy.orm import Session
-from datetime import datetime, timedelta, timezone
-from src.api.db.database import SessionLocal
+from fastapi.responses import Response, StreamingResponse, PlainTextResponse
+from sqlalchemy import select, or_, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.api.db.database import AsyncSessionLocal, replica_router
 import src.api.db.models as db_models
 import src.api.models as api_models
+import src.api.aggregates as aggregates
+from src.api.intervals import VALID_INTERVALS, get_interval_date_range
+from src.api.cache import cached, response_cache, query_flights
+from src.api.moralis import moralis_client
+from src.api.conditional import conditional_get
+from src.api.pagination import encode_cursor, decode_cursor
+from src.api.columnar import columnar_engine
+from src.api.snapshot import snapshot_engine
+from src.api.metrics import registry, record_request
+from src.api.budgets import stale_warning
+from src.api.responses import JSONBytesResponse, dumps, join_object
+from src.api.compression import CompressionMiddleware, COMPRESS_MIN_BYTES
+import src.api.export as export
+from src.api.live import LiveFeed
+from src.api.profiling import ProfilingMiddleware, PROFILE_ENABLED
 
 load_dotenv()
+
+# 分析查詢走 SQL（rollup／排行榜表）、記憶體中的欄式陣列，或 ETL 發布的快照檔，三者的函式介面相同
+ANALYTICS_ENGINES = {"sql": aggregates, "columnar": columnar_engine, "snapshot": snapshot_engine}
+ANALYTICS_ENGINE = os.getenv("ANALYTICS_ENGINE", "sql")
+if ANALYTICS_ENGINE not in ANALYTICS_ENGINES:
+    raise ValueError(f"Invalid ANALYTICS_ENGINE '{ANALYTICS_ENGINE}'. Valid values are: {list(ANALYTICS_ENGINES)}")
+analytics = ANALYTICS_ENGINES[ANALYTICS_ENGINE]
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await registry.start()
+    await moralis_client.start()
+    await replica_router.start()
+    if ANALYTICS_ENGINE == "columnar":
+        async with AsyncSessionLocal() as db:
+            await columnar_engine.sync(db)
+    if ANALYTICS_ENGINE == "snapshot":
+        snapshot_engine.check_available()
+    yield
+    await live_feed.close()
+    await replica_router.close()
+    await moralis_client.close()
+    await registry.close()
+
 app = FastAPI(
-    title="Bored Ape Yacht Club NFT Analytics API"
+    title="Bored Ape Yacht Club NFT Analytics API",
+    lifespan=lifespan
 )
-
-def get_db():
-    db = SessionLocal()
-    try:
+# 最內層：只壓縮一次送完的回應，匯出和 SSE 這類串流原樣通過
+app.add_middleware(CompressionMiddleware, minimum_size=COMPRESS_MIN_BYTES)
+app.middleware("http")(stale_warning)
+app.middleware("http")(conditional_get)
+# 最外層：延遲要包含 conditional_get，SQL 時間也要記到這個路由底下
+app.middleware("http")(record_request)
+# 預設不掛：關閉時每個請求連一次 header 檢查都不用做
+if PROFILE_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
-VALID_INTERVALS = [0, 1, 2, 3]
 
-def get_interval_date_range(interval: int):
-    interval_map = {
-        0: datetime.now(timezone.utc) - timedelta(days=7),
-        1: datetime.now(timezone.utc) - timedelta(days=30),
-        2: datetime.now(timezone.utc) - timedelta(days=365),
-        3: None,
-    }
-    return interval_map.get(interval)
+MAX_LEADERBOARD_LIMIT = 100
+MAX_PAGE_SIZE = 1000
+MAX_BULK_TOKENS = 100
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", 5000))
+STREAM_CHUNK_SIZE = 500
+
+def validate_limit(limit: int):
+    if limit < 1 or limit > MAX_LEADERBOARD_LIMIT:
+        raise HTTPException(status_code=400, detail=f"Invalid limit '{limit}'. Valid values are 1 to {MAX_LEADERBOARD_LIMIT}.")
 
 @app.get("/api/v1/time-based-data", response_model=api_models.TimeBasedResponse, 
          summary="Get time-based data", description="Get time-based data in requested interval, including highest sale token ID.")
+@cached("time-based-data")
 async def time_based_data(
     interval: int = Query(..., description="0 = last 7 days, 1 = last 30 days, 2 = last year, 3 = all time"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     if interval not in VALID_INTERVALS:
         raise HTTPException(status_code=400, detail=f"Invalid interval '{interval}'. Valid values are: {VALID_INTERVALS}")
     
     start_time = get_interval_date_range(interval)
+    totals = await analytics.time_based_totals(db, start_time)
 
-    query = db.query(
-        func.sum(db_models.Transaction.price).label('total_volume'),
-        func.avg(db_models.Transaction.price).label('average_price'),
-        func.count(db_models.Transaction.transaction_id).label('transaction_count')
-    )
-
-    if start_time:
-        query = query.filter(db_models.Transaction.time >= start_time)
-
-    result = query.one()
-
-    #highest price
-    highest_price_query = db.query(
-        db_models.Transaction.token_id.label('token_id'),
-        db_models.Transaction.price.label('highest_price')
-    ).order_by(db_models.Transaction.price.desc())
-
-    if start_time:
-        highest_price_query = highest_price_query.filter(db_models.Transaction.time >= start_time)
-
-    highest_price_result = highest_price_query.first()
-
-    total_volume = float(result.total_volume or 0)
-    average_price = float(result.average_price or 0)
-    transaction_count = result.transaction_count or 0
-    highest_price_token_id = str(highest_price_result.token_id) if highest_price_result else "N/A"
-    highest_price = float(highest_price_result.highest_price) if highest_price_result else 0.0
+    total_volume = float(totals['total_volume'])
+    average_price = float(totals['average_price'])
+    transaction_count = totals['transaction_count']
+    highest_price_token_id = str(totals['highest_price_token_id']) if totals['highest_price_token_id'] is not None else "N/A"
+    highest_price = float(totals['highest_price']) if totals['highest_price'] is not None else 0.0
 
     data = [
         api_models.TimeBasedData(
@@ -83,85 +112,57 @@ async def time_based_data(
 
     return api_models.TimeBasedResponse(interval=interval, data=data)
 
+@app.get("/api/v1/time-series", response_model=api_models.TimeSeriesResponse,
+         summary="Get a time series", description="Get daily, weekly or monthly volume, count, average, min/max and open/close prices between two UTC dates (inclusive), from the daily rollups.")
+@cached("time-series")
+async def time_series(
+    start: date = Query(..., description="First day (UTC), YYYY-MM-DD"),
+    end: date = Query(..., description="Last day (UTC), inclusive, YYYY-MM-DD"),
+    bucket: str = Query("day", description=f"Bucket size: {', '.join(aggregates.BUCKETS)}"),
+    db: AsyncSession = Depends(get_db)
+):
+    if bucket not in aggregates.BUCKETS:
+        raise HTTPException(status_code=400, detail=f"Invalid bucket '{bucket}'. Valid values are: {aggregates.BUCKETS}")
+
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end.")
+
+    data = await aggregates.time_series(db, start, end, bucket)
+
+    return api_models.TimeSeriesResponse(
+        start=start,
+        end=end,
+        bucket=bucket,
+        data=[
+            api_models.TimeSeriesData(
+                bucket_start=point['bucket_start'],
+                total_volume=float(point['total_volume']),
+                transaction_count=point['transaction_count'],
+                average_price=float(point['average_price']),
+                min_price=float(point['min_price']),
+                max_price=float(point['max_price']),
+                max_price_token_id=str(point['max_price_token_id']),
+                open_price=float(point['open_price']) if point['open_price'] is not None else None,
+                close_price=float(point['close_price']) if point['close_price'] is not None else None
+            )
+            for point in data
+        ]
+    )
+
 @app.get("/api/v1/top-buyers-sellers", response_model=api_models.BuyerSellerResponse, 
-         summary="Get top buyers and sellers for total volume", description="Get top 5 buyers and sellers for total volume in requested interval")
+         summary="Get top buyers and sellers for total volume", description="Get top buyers and sellers (5 by default) for total volume in requested interval. Windows are counted in whole UTC days.")
+@cached("top-buyers-sellers")
 async def top_buyers_sellers_data(
     interval: int = Query(..., description="0 = last 7 days, 1 = last 30 days, 2 = last year, 3 = all time"),
-    db: Session = Depends(get_db)
+    limit: int = Query(5, description=f"Number of buyers and sellers to return (1-{MAX_LEADERBOARD_LIMIT})"),
+    db: AsyncSession = Depends(get_db)
 ):
     if interval not in VALID_INTERVALS:
         raise HTTPException(status_code=400, detail=f"Invalid interval '{interval}'.")
-    start_time = get_interval_date_range(interval)
-
-    ## Buyers
-    buyers_query = (
-        db.query(
-            db_models.Address.address.label('address'),
-            func.sum(db_models.Transaction.price).label('total_volume'),
-            func.count(db_models.Transaction.transaction_id).label('transaction_count'),
-        )
-        .join(
-            db_models.Address,
-            db_models.Transaction.buyer_id == db_models.Address.id
-        )
-    )
-    
-    if start_time:
-        buyers_query = buyers_query.filter(db_models.Transaction.time >= start_time)
-
-    buyers = (
-        buyers_query
-        .group_by(db_models.Address.address)
-        .order_by(func.sum(db_models.Transaction.price).desc())
-        .limit(5)
-        .all()
-    )
-
-    ## Sellers
-    # -- Step (1): Subquery with LAG
-    sellers_subq = (
-        db.query(
-            db_models.Transaction.token_id.label('token_id'),
-            db_models.Transaction.time.label('time'),
-            db_models.Transaction.price.label('price'),
-            func.lag(db_models.Transaction.buyer_id)
-                .over(
-                    partition_by=db_models.Transaction.token_id,
-                    order_by=db_models.Transaction.time
-                )
-                .label('seller_id')
-        )
-    ).subquery('sellers_subq')
-
-    # -- Step (2): Outer query
-    sellers_query = (
-        db.query(
-            db_models.Address.address.label('address'),
-            func.sum(sellers_subq.c.price).label('total_volume'),
-            func.count(sellers_subq.c.price).label('transaction_count')
-        )
-        .join(
-            db_models.Transaction,
-            (db_models.Transaction.token_id == sellers_subq.c.token_id)
-            & (db_models.Transaction.time == sellers_subq.c.time)
-        )
-        .join(
-            db_models.Address,
-            db_models.Address.id == sellers_subq.c.seller_id
-        )
-        .filter(sellers_subq.c.seller_id.isnot(None))
-    )
+    validate_limit(limit)
 
-    if start_time:
-        sellers_query = sellers_query.filter(db_models.Transaction.time >= start_time)
-
-    sellers = (
-        sellers_query
-        .group_by(db_models.Address.address)
-        .order_by(func.sum(sellers_subq.c.price).desc())
-        .limit(5)
-        .all()
-    )
+    buyers = await analytics.top_addresses(db, 'buyer', interval, limit)
+    sellers = await analytics.top_addresses(db, 'seller', interval, limit)
 
     return api_models.BuyerSellerResponse(
         interval=interval,
@@ -189,46 +190,26 @@ async def top_buyers_sellers_data(
     summary="Compare marketplaces based on total volume and transaction count",
     description="Get comparison data across marketplaces for total volume, average price, and transaction count"
 )
+@cached("marketplace-comparison")
 async def marketplace_comparison_data(
     interval: int = Query(..., description="0 = last 7 days, 1 = last 30 days, 2 = last year, 3 = all time"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     if interval not in VALID_INTERVALS:
         raise HTTPException(status_code=400, detail=f"Invalid interval '{interval}'.")
 
     start_time = get_interval_date_range(interval)
 
-    query = (
-        db.query(
-            db_models.Market.name.label('marketplace'),
-            func.sum(db_models.Transaction.price).label('total_volume'),
-            func.avg(db_models.Transaction.price).label('average_price'),
-            func.count(db_models.Transaction.transaction_id).label('transaction_count')
-        )
-        .join(
-            db_models.Market,
-            db_models.Transaction.market_id == db_models.Market.id
-        )
-    )
-
-    if start_time:
-        query = query.filter(db_models.Transaction.time >= start_time)
-
-    data = (
-        query
-        .group_by(db_models.Market.name)
-        .order_by(func.sum(db_models.Transaction.price).desc())
-        .all()
-    )
+    data = await analytics.marketplace_totals(db, start_time)
 
     return api_models.MarketplaceComparisonResponse(
         interval=interval,
         data=[
             api_models.MarketplaceData(
-                marketplace=market.marketplace,
-                total_volume=float(market.total_volume or 0),
-                average_price=float(market.average_price or 0),
-                transaction_count=market.transaction_count or 0
+                marketplace=market['marketplace'],
+                total_volume=float(market['total_volume']),
+                average_price=float(market['average_price']),
+                transaction_count=market['transaction_count']
             )
             for market in data
         ]
@@ -237,70 +218,21 @@ async def marketplace_comparison_data(
 @app.get(
     "/api/v1/top-resale-token",
     response_model=api_models.TopResaleTokenResponse,
-    summary="Top 5 tokens by largest single resale profit",
-    description="Get the Top 5 tokens with the largest single resale price difference, including the seller"
+    summary="Top tokens by largest single resale profit",
+    description="Get the top tokens (5 by default) with the largest single resale price difference, including the seller. Windows are counted in whole UTC days."
 )
+@cached("top-resale-token")
 async def top_resale_token(
     interval: int = Query(..., description="0 = last 7 days, 1 = last 30 days, 2 = last year, 3 = all time"),
-    db: Session = Depends(get_db)
+    limit: int = Query(5, description=f"Number of resales to return (1-{MAX_LEADERBOARD_LIMIT})"),
+    db: AsyncSession = Depends(get_db)
 ):
     if interval not in VALID_INTERVALS:
         raise HTTPException(status_code=400, detail=f"Invalid interval '{interval}'.")
 
-    start_time = get_interval_date_range(interval)
-
-    resale_subq = (
-        db.query(
-            db_models.Transaction.token_id.label('token_id'),
-            db_models.Transaction.time.label('time'),
-            db_models.Transaction.price.label('price'),
-            func.lag(db_models.Transaction.price)
-                .over(
-                    partition_by=db_models.Transaction.token_id,
-                    order_by=[
-                        db_models.Transaction.time,
-                        db_models.Transaction.transaction_id
-                    ]
-                )
-                .label('previous_price'),
-            func.lag(db_models.Transaction.buyer_id)
-                .over(
-                    partition_by=db_models.Transaction.token_id,
-                    order_by=[
-                        db_models.Transaction.time,
-                        db_models.Transaction.transaction_id
-                    ]
-                )
-                .label('seller_id')
-        )
-        .subquery('resale_subq')
-    )
-
-    price_diff = (resale_subq.c.price - resale_subq.c.previous_price).label('price_difference')
-
-    query = (
-        db.query(
-            resale_subq.c.token_id.label('token_id'),
-            price_diff,
-            db_models.Address.address.label('seller')
-        )
-        .join(
-            db_models.Address,
-            db_models.Address.id == resale_subq.c.seller_id
-        )
-        .filter(resale_subq.c.previous_price.isnot(None))
-        .filter(resale_subq.c.seller_id.isnot(None))
-    )
-
-    if start_time is not None:
-        query = query.filter(resale_subq.c.time >= start_time)
+    validate_limit(limit)
 
-    data = (
-        query
-        .order_by((price_diff).desc())
-        .limit(5)
-        .all()
-    )
+    data = await analytics.top_resales(db, interval, limit)
 
     return api_models.TopResaleTokenResponse(
         interval=interval,
@@ -320,28 +252,31 @@ async def top_resale_token(
     summary="Get transactions for a specific token",
     description="Retrieve transaction history for a specific token within the requested interval"
 )
+@cached("token-transaction")
 async def token_transaction(
     token_id: str = Query(..., description="Token ID (0-9999) for transaction history"),
     interval: int = Query(..., description="Interval for analysis: 0 = last 7 days, 1 = last 30 days, 2 = last year, 3 = all time"),
-    db: Session = Depends(get_db)
+    limit: Optional[int] = Query(None, description=f"Page size (1-{MAX_PAGE_SIZE}, default {MAX_PAGE_SIZE}); ndjson without a limit streams the whole history"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    format: str = Query("json", description="json, or ndjson to stream one transaction per line"),
+    db: AsyncSession = Depends(get_db)
 ):
     if interval not in VALID_INTERVALS:
         raise HTTPException(status_code=400, detail=f"Invalid interval '{interval}'.")
 
-    try:
-        token_id_int = int(token_id)
-        if token_id_int < 0 or token_id_int > 9999:
-            raise ValueError("Token ID must be between 0 and 9999.")
-    except ValueError:
-        raise HTTPException(
-            status_code=400,
-            detail="Token ID must be an integer between 0 and 9999."
-        )
+    if limit is not None and (limit < 1 or limit > MAX_PAGE_SIZE):
+        raise HTTPException(status_code=400, detail=f"Invalid limit '{limit}'. Valid values are 1 to {MAX_PAGE_SIZE}.")
+
+    if format not in ("json", "ndjson"):
+        raise HTTPException(status_code=400, detail=f"Invalid format '{format}'. Valid values are: json, ndjson")
+
+    token_id_int = parse_token_id(token_id)
 
     start_time = get_interval_date_range(interval)
 
     query = (
-        db.query(
+        select(
+            db_models.Transaction.transaction_id.label('transaction_id'),
             db_models.Transaction.time.label('sold_date'),
             db_models.Transaction.price.label('price'),
             db_models.Transaction.transaction_hash.label('transaction_hash'),
@@ -351,64 +286,274 @@ async def token_transaction(
             db_models.Address,
             db_models.Transaction.buyer_id == db_models.Address.id
         )
-        .filter(db_models.Transaction.token_id == token_id)
+        .where(db_models.Transaction.token_id == token_id_int)
     )
 
     if start_time:
-        query = query.filter(db_models.Transaction.time >= start_time)
+        query = query.where(db_models.Transaction.time >= start_time)
 
-    data = query.order_by(db_models.Transaction.time.desc()).all()
+    # keyset：MySQL 不會把 (time, transaction_id) < (...) 這種 row constructor 比較拿來做 range access，
+    # 會從最新一筆往回掃再過濾；拆成 OR/AND 後 time < t 這段才走得到 (token_id, time) 索引
+    if cursor:
+        try:
+            cursor_time, cursor_transaction_id = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        query = query.where(or_(
+            db_models.Transaction.time < cursor_time,
+            and_(db_models.Transaction.time == cursor_time, db_models.Transaction.transaction_id < cursor_transaction_id)
+        ))
+
+    query = query.order_by(db_models.Transaction.time.desc(), db_models.Transaction.transaction_id.desc())
+
+    if format == "ndjson" and not limit:
+        return StreamingResponse(stream_token_transactions(query), media_type="application/x-ndjson")
+
+    # 沒給 limit 的 JSON 也分頁，一次最多 MAX_PAGE_SIZE 筆，不會整段歷史讀進記憶體；前端會依 next_cursor 取下一頁
+    page_size = limit or MAX_PAGE_SIZE
+    data = (await db.execute(query.limit(page_size + 1))).all()
+    next_cursor = None
+    if len(data) > page_size:
+        data = data[:page_size]
+        next_cursor = encode_cursor(data[-1].sold_date, data[-1].transaction_id)
+
+    if format == "ndjson":
+        # 有 limit 的 NDJSON 一頁有上限，直接組好，下一頁的 cursor 放在 X-Next-Cursor header
+        return Response(
+            b"".join(dumps(transaction_record(record)) + b"\n" for record in data),
+            media_type="application/x-ndjson",
+            headers={"X-Next-Cursor": next_cursor} if next_cursor else None
+        )
 
-    return api_models.TokenTransactionResponse(
-        token_id=token_id,
-        interval=interval,
-        data=[
-            api_models.TokenTransactionData(
-                sold_date=record.sold_date,
-                price=float(record.price or 0),
-                transaction_hash=record.transaction_hash,
-                buyer_address=record.buyer_address
-            )
-            for record in data
-        ]
-    )
+    # 歷史可能有上萬筆，不逐筆建 TokenTransactionData，直接從查詢結果組 dict，由 cached 序列化一次
+    return {
+        "token_id": token_id,
+        "interval": interval,
+        "data": [transaction_record(record) for record in data],
+        "next_cursor": next_cursor
+    }
 
-@app.get("/api/v1/nft-details", response_model=api_models.NFTMetadata)
-async def get_nft_details(token_id: str = Query(..., description="Token ID (0-9999) for NFT details")):
+def transaction_record(record):
+    # 欄位和 TokenTransactionData 相同
+    return {
+        "sold_date": record.sold_date,
+        "price": float(record.price or 0),
+        "transaction_hash": record.transaction_hash,
+        "buyer_address": record.buyer_address
+    }
+
+async def stream_token_transactions(query):
+    # 串流在回應送出時才執行，要用自己的 session；stream() 走 server-side cursor，不會整批讀進記憶體
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=STREAM_CHUNK_SIZE))
+        async for partition in result.partitions():
+            yield b"".join(dumps(transaction_record(record)) + b"\n" for record in partition)
+
+def parse_token_id(token_id: str) -> int:
     try:
-        url = f"https://deep-index.moralis.io/api/v2.2/nft/0xBC4CA0EdA7647A8aB7C2061c2E118A18a936f13D/{token_id}"
-        headers = {
-            "accept": "application/json",
-            "X-API-Key": os.getenv('MORALIS_APIKEY')
-        }
-        response = requests.get(url, headers=headers)
+        token_id_int = int(token_id)
+        if token_id_int < 0 or token_id_int > 9999:
+            raise ValueError("Token ID must be between 0 and 9999.")
+    except ValueError:
+        raise HTTPException(
+            status_code=400,
+            detail="Token ID must be an integer between 0 and 9999."
+        )
+    return token_id_int
+
+@app.get(
+    "/api/v1/token-summary",
+    response_model=api_models.TokenSummaryResponse,
+    summary="Get token summaries",
+    description=f"Get the sale count, average price, all-time high and last sale of one token (token_id) or up to {MAX_BULK_TOKENS} tokens (token_ids=1,2,3)"
+)
+@cached("token-summary")
+async def token_summary(
+    token_id: Optional[str] = Query(None, description="Token ID (0-9999)"),
+    token_ids: Optional[str] = Query(None, description=f"Comma-separated token IDs (0-9999), at most {MAX_BULK_TOKENS}"),
+    db: AsyncSession = Depends(get_db)
+):
+    if (token_id is None) == (token_ids is None):
+        raise HTTPException(status_code=400, detail="Pass either token_id or token_ids.")
+
+    requested = [parse_token_id(token_id)] if token_id is not None else [parse_token_id(value.strip()) for value in token_ids.split(",")]
+    requested = list(dict.fromkeys(requested))
+    if len(requested) > MAX_BULK_TOKENS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_TOKENS} token IDs can be requested at once.")
+
+    # 主鍵 IN 查詢，一次取回整批
+    rows = (await db.execute(
+        select(db_models.TokenSummary, db_models.Address.address)
+        .outerjoin(db_models.Address, db_models.TokenSummary.last_buyer_id == db_models.Address.id)
+        .where(db_models.TokenSummary.token_id.in_(requested))
+    )).all()
+    summaries = {summary.token_id: (summary, address) for summary, address in rows}
+
+    data = []
+    for requested_id in requested:
+        summary, address = summaries.get(requested_id, (None, None))
+        if summary is None or not summary.sale_count:
+            data.append(api_models.TokenSummaryData(token_id=str(requested_id), sale_count=0))
+            continue
+        data.append(api_models.TokenSummaryData(
+            token_id=str(requested_id),
+            sale_count=summary.sale_count,
+            average_price=float(summary.total_volume / summary.sale_count),
+            all_time_high=float(summary.max_price) if summary.max_price is not None else None,
+            all_time_high_date=summary.max_price_time,
+            last_price=float(summary.last_price) if summary.last_price is not None else None,
+            last_sale_date=summary.last_sale_time,
+            last_buyer_address=address
+        ))
+
+    return api_models.TokenSummaryResponse(data=data)
+
+@app.get(
+    "/api/v1/address/{address}",
+    response_model=api_models.AddressResponse,
+    summary="Get wallet analytics",
+    description="Get the buy and sell volume and counts, realized profit and currently held tokens of a wallet address"
+)
+@cached("address")
+async def address_analytics(
+    address: str,
+    db: AsyncSession = Depends(get_db)
+):
+    # 都是主鍵或索引查詢，和這個地址交易過幾筆無關
+    found = (await db.execute(
+        select(db_models.Address.id, db_models.Address.address, db_models.AddressStats)
+        .outerjoin(db_models.AddressStats, db_models.AddressStats.address_id == db_models.Address.id)
+        .where(db_models.Address.address == address)
+    )).first()
+    if found is None:
+        raise HTTPException(status_code=404, detail=f"Address '{address}' not found.")
+
+    address_id, address, stats = found
+    held_tokens = (await db.execute(
+        select(db_models.TokenSummary.token_id)
+        .where(db_models.TokenSummary.last_buyer_id == address_id)
+        .order_by(db_models.TokenSummary.token_id)
+    )).scalars().all()
+
+    return api_models.AddressResponse(
+        address=address,
+        buy_count=stats.buy_count if stats else 0,
+        buy_volume=float(stats.buy_volume) if stats else 0.0,
+        sell_count=stats.sell_count if stats else 0,
+        sell_volume=float(stats.sell_volume) if stats else 0.0,
+        realized_pnl=float(stats.realized_pnl) if stats else 0.0,
+        held_tokens=[str(token_id) for token_id in held_tokens]
+    )
 
-        if response.status_code != 200:
-            raise HTTPException(status_code=response.status_code, detail="Failed to fetch NFT details")
+@app.get(
+    "/api/v1/export",
+    summary="Export raw sales",
+    description="Stream every sale between two UTC dates (inclusive) as CSV, NDJSON or Parquet, optionally gzip-compressed"
+)
+async def export_transactions(
+    start: date = Query(..., description="First day (UTC), YYYY-MM-DD"),
+    end: date = Query(..., description="Last day (UTC), inclusive, YYYY-MM-DD"),
+    format: str = Query("csv", description=f"Output format: {', '.join(export.EXPORT_FORMATS)}"),
+    compress: bool = Query(False, description="gzip the response (Content-Encoding: gzip)")
+):
+    if format not in export.EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid format '{format}'. Valid values are: {list(export.EXPORT_FORMATS)}")
 
-        data = response.json()
+    if format == "parquet" and export.pa is None:
+        raise HTTPException(status_code=400, detail="Parquet export is not available on this server (pyarrow is not installed).")
 
-        if not data.get("token_id"):
-            raise HTTPException(status_code=404, detail="NFT not found")
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end.")
 
-        metadata_raw = data.get("metadata", "{}")
-        metadata = {}
-        try:
-            metadata = json.loads(metadata_raw)
-        except json.JSONDecodeError:
-            metadata = {}
-
-        image_url = metadata.get("image") or data.get("normalized_metadata", {}).get("image")
-        if image_url and image_url.startswith("ipfs://"):
-            image_url = image_url.replace("ipfs://", "https://ipfs.io/ipfs/")
-       
-        rarity_rank = data.get("rarity_rank")
-
-        return api_models.NFTMetadata(
-            token_id=data.get("token_id"),
-            image_url=image_url,
-            rarity_rank=rarity_rank
-        )
+    query = export.export_query(datetime.combine(start, time.min), datetime.combine(end + timedelta(days=1), time.min))
+    headers = {"Content-Disposition": f'attachment; filename="bayc_transactions_{start}_{end}.{format}"'}
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+
+    return StreamingResponse(
+        export.stream_export(query, format, EXPORT_CHUNK_SIZE, compress),
+        media_type=export.EXPORT_FORMATS[format],
+        headers=headers
+    )
+
+async def with_session(endpoint, **kwargs):
+    # 每個查詢各自從連線池拿一條連線，才能同時執行
+    async with AsyncSessionLocal() as db:
+        return await endpoint(db=db, **kwargs)
+
+@app.get(
+    "/api/v1/dashboard",
+    response_model=api_models.DashboardResponse,
+    summary="Get all dashboard data in one request",
+    description="Run the time-based, top buyers/sellers, marketplace, top resale and (optionally) token transaction queries concurrently and return them together"
+)
+async def dashboard(
+    interval: int = Query(..., description="0 = last 7 days, 1 = last 30 days, 2 = last year, 3 = all time"),
+    limit: int = Query(5, description=f"Number of top buyers, sellers and resales to return (1-{MAX_LEADERBOARD_LIMIT})"),
+    token_id: Optional[str] = Query(None, description="Token ID (0-9999) to include its transaction history")
+):
+    if interval not in VALID_INTERVALS:
+        raise HTTPException(status_code=400, detail=f"Invalid interval '{interval}'.")
+
+    validate_limit(limit)
+
+    queries = [
+        with_session(time_based_data, interval=interval),
+        with_session(top_buyers_sellers_data, interval=interval, limit=limit),
+        with_session(marketplace_comparison_data, interval=interval),
+        with_session(top_resale_token, interval=interval, limit=limit),
+    ]
+    if token_id is not None:
+        queries.append(with_session(token_transaction, token_id=token_id, interval=interval, limit=None, cursor=None, format="json"))
+
+    results = await asyncio.gather(*queries)
+
+    # 各端點回傳的是已序列化的 body，直接拼起來，格式和 DashboardResponse 相同
+    return JSONBytesResponse(join_object({
+        "interval": interval,
+        "time_based": results[0],
+        "top_buyers_sellers": results[1],
+        "marketplace_comparison": results[2],
+        "top_resale_token": results[3],
+        "token_transaction": results[4] if token_id is not None else None
+    }))
+
+# 每個 worker 一個 poller，資料版本變了才查一次新交易，再推給所有訂閱者
+live_feed = LiveFeed(headline=lambda: with_session(time_based_data, interval=0))
+registry.collectors.append(live_feed.gauges)
+
+@app.get(
+    "/api/v1/live",
+    summary="Subscribe to new sales",
+    description="Server-Sent Events stream: after each ETL load, one `sales` event with the new sales and the updated last-7-days totals"
+)
+async def live():
+    return StreamingResponse(
+        live_feed.stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/v1/cache-stats", response_model=api_models.CacheStats,
+         summary="Get response cache statistics", description="Hit, miss and eviction counters of the in-process analytics response cache, and how many misses shared an in-flight query.")
+async def cache_stats():
+    return api_models.CacheStats(**response_cache.stats(), **query_flights.stats())
 
-    except requests.exceptions.RequestException as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/v1/nft-details", response_model=api_models.NFTMetadata)
+async def get_nft_details(
+    token_id: str = Query(..., description="Token ID (0-9999) for NFT details"),
+    db: AsyncSession = Depends(get_db)
+):
+    token_id_int = parse_token_id(token_id)
+
+    metadata = await moralis_client.get_metadata(db, token_id_int)
+
+    return api_models.NFTMetadata(
+        token_id=str(metadata.token_id),
+        image_url=metadata.image_url,
+        rarity_rank=metadata.rarity_rank
+    )
@@ -0,0 +1,238 @@
+import os, json, glob, time, bisect, asyncio, logging
+from contextvars import ContextVar
+from fastapi import Request
+from starlette.routing import Match
+
+logger = logging.getLogger("src.api.metrics")
+
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 200))
+# uvicorn 的多個 worker 共用同一個埠，/metrics 只會由其中一個回答；
+# 設定這個目錄後每個 worker 定期把自己的數字寫成檔案，回答的 worker 把所有檔案加總
+METRICS_DIR = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+METRICS_FLUSH_SECONDS = float(os.getenv('METRICS_FLUSH_SECONDS', 1))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000, 1000000)
+
+# 目前這個請求對應的路由（例如 /api/v1/top-resale-token），SQL 的時間會記在它底下
+current_endpoint: ContextVar[str] = ContextVar('current_endpoint', default='none')
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in pairs) + '}'
+
+class Counter:
+    def __init__(self, name: str, help: str, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels[name] for name in self.labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def state(self):
+        return [[list(key), value] for key, value in self._values.items()]
+
+    def merge(self, totals, entries):
+        for key, value in entries:
+            key = tuple(key)
+            totals[key] = totals.get(key, 0) + value
+
+    def render(self, values=None):
+        yield f'# HELP {self.name} {self.help}'
+        yield f'# TYPE {self.name} counter'
+        for key, value in (self._values if values is None else values).items():
+            yield f'{self.name}{format_labels(self.labels, key)} {value}'
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels[name] for name in self.labels)
+        series = self._series.get(key)
+        if series is None:
+            # [每個 bucket 的次數..., +Inf 的次數, 總和]
+            series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def state(self):
+        return [[list(key), series] for key, series in self._series.items()]
+
+    def merge(self, totals, entries):
+        for key, series in entries:
+            key = tuple(key)
+            existing = totals.get(key)
+            totals[key] = [a + b for a, b in zip(existing, series)] if existing else list(series)
+
+    def render(self, series_by_key=None):
+        yield f'# HELP {self.name} {self.help}'
+        yield f'# TYPE {self.name} histogram'
+        for key, series in (self._series if series_by_key is None else series_by_key).items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series[:-1]):
+                cumulative += count
+                yield f'{self.name}_bucket{format_labels(self.labels, key, [("le", bound)])} {cumulative}'
+            yield f'{self.name}_sum{format_labels(self.labels, key)} {series[-1]}'
+            yield f'{self.name}_count{format_labels(self.labels, key)} {cumulative}'
+
+class Registry:
+    """Metrics in the Prometheus text exposition format.
+
+    Without PROMETHEUS_MULTIPROC_DIR the numbers are process-local, which is
+    only right with a single worker: uvicorn's workers share one port, so a
+    scrape reaches whichever worker accepts the connection. With the directory
+    set, every worker writes its counters, histograms and gauges to
+    `<pid>.json` there every METRICS_FLUSH_SECONDS, and the worker answering
+    the scrape sums the counters and histograms of all files (including those
+    of exited workers, so they never go backwards) and reports each live
+    worker's gauges with a `worker` label. The directory must be emptied when
+    the server starts. Gauges are read from their source via `collectors`.
+    """
+
+    def __init__(self, directory: str | None = None, flush_seconds: float = 1):
+        self.metrics = []
+        self.collectors = []
+        self.directory = directory
+        self.flush_seconds = flush_seconds
+        self._task = None
+
+    def counter(self, *args, **kwargs):
+        metric = Counter(*args, **kwargs)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, *args, **kwargs):
+        metric = Histogram(*args, **kwargs)
+        self.metrics.append(metric)
+        return metric
+
+    def gauges(self):
+        return [[name, help, value] for collect in self.collectors for name, help, value in collect()]
+
+    def dump(self):
+        # 先寫暫存檔再 os.replace，讀的一方只會看到完整的檔案
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f'{os.getpid()}.json')
+        state = {
+            'pid': os.getpid(),
+            'written_at': time.time(),
+            'metrics': {metric.name: metric.state() for metric in self.metrics},
+            'gauges': self.gauges(),
+        }
+        with open(f'{path}.tmp', 'w') as f:
+            json.dump(state, f)
+        os.replace(f'{path}.tmp', path)
+
+    def collect_workers(self):
+        self.dump()
+        totals = {metric.name: {} for metric in self.metrics}
+        gauges = []
+        for path in sorted(glob.glob(os.path.join(self.directory, '*.json'))):
+            try:
+                with open(path) as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for metric in self.metrics:
+                metric.merge(totals[metric.name], state['metrics'].get(metric.name, []))
+            # 已經結束的 worker 不再更新檔案，它的 gauge（連線池用量等）不算
+            if time.time() - state['written_at'] <= 3 * self.flush_seconds:
+                gauges += [(state['pid'], name, help, value) for name, help, value in state['gauges']]
+        return totals, gauges
+
+    def render(self):
+        lines = []
+        if self.directory is None:
+            for metric in self.metrics:
+                lines.extend(metric.render())
+            for name, help, value in self.gauges():
+                lines += [f'# HELP {name} {help}', f'# TYPE {name} gauge', f'{name} {value}']
+            return '\n'.join(lines) + '\n'
+
+        totals, gauges = self.collect_workers()
+        for metric in self.metrics:
+            lines.extend(metric.render(totals[metric.name]))
+        described = set()
+        for pid, name, help, value in sorted(gauges, key=lambda gauge: gauge[1]):
+            if name not in described:
+                described.add(name)
+                lines += [f'# HELP {name} {help}', f'# TYPE {name} gauge']
+            lines.append(f'{name}{format_labels(("worker",), (pid,))} {value}')
+        return '\n'.join(lines) + '\n'
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            try:
+                self.dump()
+            except OSError as e:
+                logger.warning("Could not write metrics to %s: %s", self.directory, e)
+
+    async def start(self):
+        if self.directory is None:
+            return
+        self.dump()
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self.dump()
+
+registry = Registry(METRICS_DIR, METRICS_FLUSH_SECONDS)
+if METRICS_DIR is None and int(os.getenv('API_WORKERS', 1)) > 1:
+    logger.warning("API_WORKERS=%s but PROMETHEUS_MULTIPROC_DIR is not set: /metrics only reports the worker that answers each scrape.", os.getenv('API_WORKERS'))
+
+request_duration = registry.histogram('http_request_duration_seconds', 'Request latency by route.', ('method', 'endpoint', 'status'))
+query_duration = registry.histogram('db_query_duration_seconds', 'SQL statement execution time by the route that issued it.', ('endpoint',))
+query_rows = registry.histogram('db_query_rows', 'Rows returned (or affected) per SQL statement.', ('endpoint',), buckets=ROW_BUCKETS)
+slow_queries = registry.counter('db_slow_queries_total', f'SQL statements slower than SLOW_QUERY_MS ({SLOW_QUERY_MS:g} ms).', ('endpoint',))
+pool_checkout_wait = registry.histogram('db_pool_checkout_wait_seconds', 'Time spent waiting for a connection from the pool.')
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info['query_started_at'] = time.perf_counter()
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_started_at']
+    endpoint = current_endpoint.get()
+    query_duration.observe(elapsed, endpoint=endpoint)
+    if cursor.rowcount is not None and cursor.rowcount >= 0:
+        query_rows.observe(cursor.rowcount, endpoint=endpoint)
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        slow_queries.inc(endpoint=endpoint)
+        logger.warning("Slow query (%.1f ms, %s): %s", elapsed * 1000, endpoint, " ".join(statement.split())[:1000])
+
+def route_path(request: Request):
+    # 用路由的樣板（/api/v1/address/{address}）而不是實際網址當 label，label 數量才不會無限增加
+    for route in request.app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return route.path
+    return 'unmatched'
+
+async def record_request(request: Request, call_next):
+    endpoint = route_path(request)
+    token = current_endpoint.set(endpoint)
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        request_duration.observe(time.perf_counter() - started, method=request.method, endpoint=endpoint, status=status)
+        current_endpoint.reset(token)
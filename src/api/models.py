@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import date, datetime
 from pydantic import BaseModel, Field
 from enum import Enum
 from typing import Optional
@@ -24,6 +24,24 @@ class TimeBasedResponse(BaseModel):
     )
     data: list[TimeBasedData] = Field(..., description="List of time-based aggregated data.")
 
+# Time Series
+class TimeSeriesData(BaseModel):
+    bucket_start: date = Field(..., description="First day (UTC) of the bucket; the first and last buckets only count days inside the range.")
+    total_volume: float = Field(..., description="Total sales volume in the bucket.")
+    transaction_count: int = Field(..., description="Number of transactions in the bucket.")
+    average_price: float = Field(..., description="Average sale price in the bucket.")
+    min_price: float = Field(..., description="Lowest sale price in the bucket.")
+    max_price: float = Field(..., description="Highest sale price in the bucket.")
+    max_price_token_id: str = Field(..., description="Token ID of the highest sale in the bucket.")
+    open_price: Optional[float] = Field(None, description="Price of the first sale in the bucket.")
+    close_price: Optional[float] = Field(None, description="Price of the last sale in the bucket.")
+
+class TimeSeriesResponse(BaseModel):
+    start: date = Field(..., description="First day (UTC) of the requested range.")
+    end: date = Field(..., description="Last day (UTC) of the requested range, inclusive.")
+    bucket: str = Field(..., description="Bucket size: day, week (starting Monday) or month.")
+    data: list[TimeSeriesData] = Field(..., description="One entry per bucket that has sales, oldest first.")
+
 # Buyer Seller
 class BuyerSellerData(BaseModel):
     address: str = Field(..., description="Wallet address of the buyer or seller.")
@@ -60,7 +78,7 @@ class TopResaleTokenData(BaseModel):
 
 class TopResaleTokenResponse(BaseModel):
     interval: int = Field(..., description="Interval for analysis: 0 = last 7 days, 1 = last 30 days, 2 = last year, 3 = all time.")
-    data: list[TopResaleTokenData] = Field(..., description="List of top 5 resale transactions with seller details.")
+    data: list[TopResaleTokenData] = Field(..., description="List of top resale transactions with seller details.")
 
 # Token Transaction
 class TokenTransactionData(BaseModel):
@@ -75,10 +93,77 @@ class TokenTransactionResponse(BaseModel):
         ..., 
         description="Interval for analysis: 0 = last 7 days, 1 = last 30 days, 2 = last year, 3 = all time."
     )
-    data: list[TokenTransactionData] = Field(..., description="List of transaction data for the token.")
+    data: list[TokenTransactionData] = Field(..., description="List of transaction data for the token, newest first.")
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next (older) page when more transactions remain.")
+
+# Token Summary
+class TokenSummaryData(BaseModel):
+    token_id: str = Field(..., description="Unique ID of the token.")
+    sale_count: int = Field(..., description="Number of sales of the token.")
+    average_price: Optional[float] = Field(None, description="Average sale price of the token.")
+    all_time_high: Optional[float] = Field(None, description="Highest sale price of the token.")
+    all_time_high_date: Optional[datetime] = Field(None, description="Date and time of the first sale at the all-time high.")
+    last_price: Optional[float] = Field(None, description="Price of the last sale.")
+    last_sale_date: Optional[datetime] = Field(None, description="Date and time of the last sale.")
+    last_buyer_address: Optional[str] = Field(None, description="Wallet address of the last buyer.")
+
+class TokenSummaryResponse(BaseModel):
+    data: list[TokenSummaryData] = Field(..., description="One summary per requested token, in the requested order.")
+
+# Address
+class AddressResponse(BaseModel):
+    address: str = Field(..., description="Wallet address.")
+    buy_count: int = Field(..., description="Number of tokens bought.")
+    buy_volume: float = Field(..., description="Total spent on purchases.")
+    sell_count: int = Field(..., description="Number of tokens sold.")
+    sell_volume: float = Field(..., description="Total received from sales.")
+    realized_pnl: float = Field(..., description="Sum of sale price minus the price this address paid, over its sales.")
+    held_tokens: list[str] = Field(..., description="Token IDs whose last sale was to this address.")
+
+# Live Feed
+class LiveSale(BaseModel):
+    transaction_hash: str = Field(..., description="Unique transaction hash for this sale.")
+    sold_date: datetime = Field(..., description="Date and time of the transaction.")
+    token_id: str = Field(..., description="Unique ID of the token.")
+    price: float = Field(..., description="Sale price of the token.")
+    marketplace: Optional[str] = Field(None, description="Marketplace the sale happened on.")
+    buyer_address: Optional[str] = Field(None, description="Wallet address of the buyer.")
+    seller_address: Optional[str] = Field(None, description="Wallet address of the seller.")
+
+class LiveEvent(BaseModel):
+    data_version: int = Field(..., description="Data version after the load that produced this event.")
+    sales: list[LiveSale] = Field(..., description="Sales added by the load, oldest first (at most the newest 100).")
+    time_based: TimeBasedResponse = Field(..., description="Time-based totals for the last 7 days after the load.")
+
+# Dashboard
+class DashboardResponse(BaseModel):
+    interval: Interval = Field(
+        ..., 
+        description="Interval for analysis: 0 = last 7 days, 1 = last 30 days, 2 = last year, 3 = all time."
+    )
+    time_based: TimeBasedResponse = Field(..., description="Time-based aggregated data.")
+    top_buyers_sellers: BuyerSellerResponse = Field(..., description="Top buyers and sellers.")
+    marketplace_comparison: MarketplaceComparisonResponse = Field(..., description="Marketplace comparison data.")
+    top_resale_token: TopResaleTokenResponse = Field(..., description="Top resale transactions.")
+    token_transaction: Optional[TokenTransactionResponse] = Field(None, description="Transaction history of the requested token, if any.")
 
 # NFT Metadata
 class NFTMetadata(BaseModel):
     token_id: str = Field(..., description="The unique ID of the NFT token.")
     image_url: Optional[str] = Field(None, description="URL of the NFT image.")
-    rarity_rank: Optional[int] = Field(None, description="The rarity rank of the NFT in the collection.")
\ No newline at end of file
+    rarity_rank: Optional[int] = Field(None, description="The rarity rank of the NFT in the collection.")
+
+# Response Cache
+class CacheStats(BaseModel):
+    data_version: Optional[int] = Field(None, description="Data version the cached responses were computed under.")
+    entries: int = Field(..., description="Number of cached responses.")
+    size_bytes: int = Field(..., description="Approximate size of the cached responses.")
+    max_entries: int = Field(..., description="Maximum number of cached responses.")
+    max_bytes: int = Field(..., description="Maximum total size of the cached responses.")
+    hits: int = Field(..., description="Requests answered from the cache.")
+    misses: int = Field(..., description="Requests that had to run their queries.")
+    evictions: int = Field(..., description="Responses evicted to stay within the bounds.")
+    invalidations: int = Field(..., description="Times the cache was dropped because new data was loaded.")
+    inflight: int = Field(..., description="Queries currently running on behalf of one or more requests.")
+    calls: int = Field(..., description="Queries started after a cache miss.")
+    coalesced: int = Field(..., description="Requests that waited on an identical in-flight query instead of starting their own.")
\ No newline at end of file
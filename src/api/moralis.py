@@ -0,0 +1,103 @@
+import os, json, asyncio
+from datetime import datetime, timedelta, timezone
+import httpx
+from fastapi import HTTPException
+from sqlalchemy.dialects.mysql import insert
+from src.api.db.database import AsyncSessionLocal
+import src.api.db.models as db_models
+
+BAYC_CONTRACT = "0xBC4CA0EdA7647A8aB7C2061c2E118A18a936f13D"
+
+class MoralisClient:
+    """NFT metadata lookups backed by the `nft_metadata` table.
+
+    BAYC metadata practically never changes, so a stored row is served until it
+    is older than `ttl`. Misses go to Moralis through one pooled keep-alive
+    client, and concurrent misses for the same token share one upstream call.
+    """
+
+    def __init__(self, base_url: str, api_key: str | None, ttl: timedelta, timeout: float, max_connections: int):
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+        self.ttl = ttl
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._client = None
+        self._inflight = {}
+
+    async def start(self):
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={"accept": "application/json", "X-API-Key": self.api_key or ""},
+            timeout=httpx.Timeout(self.timeout),
+            limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+        )
+
+    async def close(self):
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+
+    async def get_metadata(self, db, token_id: int):
+        stored = await db.get(db_models.NFTMetadata, token_id)
+        if stored and stored.fetched_at.replace(tzinfo=timezone.utc) > datetime.now(timezone.utc) - self.ttl:
+            return stored
+
+        task = self._inflight.get(token_id)
+        if task is None:
+            task = asyncio.create_task(self._fetch_and_store(token_id))
+            self._inflight[token_id] = task
+            task.add_done_callback(lambda _: self._inflight.pop(token_id, None))
+        # shield: 某個請求斷線時不要取消其他人也在等的上游請求
+        return await asyncio.shield(task)
+
+    async def _fetch_and_store(self, token_id: int):
+        try:
+            response = await self._client.get(f"/nft/{BAYC_CONTRACT}/{token_id}")
+        except httpx.HTTPError as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+        if response.status_code != 200:
+            raise HTTPException(status_code=response.status_code, detail="Failed to fetch NFT details")
+
+        data = response.json()
+
+        if not data.get("token_id"):
+            raise HTTPException(status_code=404, detail="NFT not found")
+
+        metadata_raw = data.get("metadata") or "{}"
+        metadata = {}
+        try:
+            metadata = json.loads(metadata_raw)
+        except json.JSONDecodeError:
+            metadata = {}
+
+        image_url = metadata.get("image") or (data.get("normalized_metadata") or {}).get("image")
+        if image_url and image_url.startswith("ipfs://"):
+            image_url = image_url.replace("ipfs://", "https://ipfs.io/ipfs/")
+
+        row = {
+            'token_id': token_id,
+            'image_url': image_url,
+            'rarity_rank': data.get("rarity_rank"),
+            'fetched_at': datetime.now(timezone.utc).replace(tzinfo=None),
+        }
+
+        async with AsyncSessionLocal() as db:
+            statement = insert(db_models.NFTMetadata).values(**row)
+            await db.execute(statement.on_duplicate_key_update(
+                image_url=statement.inserted.image_url,
+                rarity_rank=statement.inserted.rarity_rank,
+                fetched_at=statement.inserted.fetched_at,
+            ))
+            await db.commit()
+
+        return db_models.NFTMetadata(**row)
+
+moralis_client = MoralisClient(
+    base_url=os.getenv('MORALIS_BASE_URL', 'https://deep-index.moralis.io/api/v2.2'),
+    api_key=os.getenv('MORALIS_APIKEY'),
+    ttl=timedelta(days=float(os.getenv('NFT_METADATA_TTL_DAYS', 30))),
+    timeout=float(os.getenv('MORALIS_TIMEOUT_SECONDS', 10)),
+    max_connections=int(os.getenv('MORALIS_MAX_CONNECTIONS', 20)),
+)
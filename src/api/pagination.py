@@ -0,0 +1,16 @@
+import base64
+from datetime import datetime
+
+# 游標 = 上一頁最後一筆的 (time, transaction_id)，下一頁從它之後（更舊）開始
+def encode_cursor(time: datetime, transaction_id: int) -> str:
+    raw = f"{time.isoformat()}|{transaction_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    """Return (time, transaction_id) from a cursor, raising ValueError if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        time, transaction_id = raw.split("|")
+        return datetime.fromisoformat(time), int(transaction_id)
+    except (UnicodeDecodeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor '{cursor}'.") from e
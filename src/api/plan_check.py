@@ -0,0 +1,100 @@
+"""Run EXPLAIN on every SQL statement the endpoints issue and fail on full scans.
+
+    python -m src.api.plan_check
+
+Runs against the database configured in .env. Each endpoint is called once
+per interval (bypassing the response cache, on the SQL analytics engine) while
+its statements are captured; then every captured SELECT is EXPLAINed with
+its real parameters on the primary. Exits non-zero if any plan reads a
+large table with a full table scan (type ALL) or a full index scan (type
+index), so a query or index regression is caught before deploying.
+"""
+import sys, asyncio
+from datetime import timedelta
+from sqlalchemy import event, select, func
+from sqlalchemy.engine import Engine
+from src.api.db.database import AsyncSessionLocal, engine
+import src.api.db.models as db_models
+import src.api.aggregates as aggregates
+import src.api.export as export
+from src.api.cache import response_cache
+from src.api.pagination import encode_cursor
+from src.api.intervals import VALID_INTERVALS
+import src.api.main as main
+
+FULL_SCAN_TYPES = {'ALL', 'index'}
+# 維度表只有幾筆，rollup 表一天一筆，整張掃描是預期的
+SMALL_TABLES = {'markets', 'actions', 'data_version', 'daily_stats', 'daily_market_stats'}
+
+async def capture(call):
+    statements = []
+
+    def listener(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip()[:6].upper() in ('SELECT', 'WITH'):
+            statements.append((statement, parameters))
+
+    # 掛在 Engine 類別上，replica 和 primary 的查詢都收得到
+    event.listen(Engine, 'before_cursor_execute', listener)
+    try:
+        response_cache.clear()
+        await call()
+    finally:
+        event.remove(Engine, 'before_cursor_execute', listener)
+    return statements
+
+async def endpoint_calls():
+    async with AsyncSessionLocal() as db:
+        latest = (await db.execute(select(func.max(db_models.Transaction.time)))).scalar()
+        address = (await db.execute(
+            select(db_models.Address.address)
+            .join(db_models.AddressStats, db_models.AddressStats.address_id == db_models.Address.id)
+            .order_by(db_models.AddressStats.buy_count.desc())
+            .limit(1)
+        )).scalar()
+        max_transaction_id = (await db.execute(select(func.max(db_models.Transaction.transaction_id)))).scalar() or 0
+
+    calls = {}
+    for interval in VALID_INTERVALS:
+        calls[f'time-based-data interval={interval}'] = lambda interval=interval: main.with_session(main.time_based_data, interval=interval)
+        calls[f'top-buyers-sellers interval={interval}'] = lambda interval=interval: main.with_session(main.top_buyers_sellers_data, interval=interval, limit=100)
+        calls[f'marketplace-comparison interval={interval}'] = lambda interval=interval: main.with_session(main.marketplace_comparison_data, interval=interval)
+        calls[f'top-resale-token interval={interval}'] = lambda interval=interval: main.with_session(main.top_resale_token, interval=interval, limit=100)
+        calls[f'token-transaction interval={interval}'] = lambda interval=interval: main.with_session(main.token_transaction, token_id='1', interval=interval, limit=100, cursor=None, format='json')
+
+    if latest is not None:
+        calls['time-series'] = lambda: main.with_session(main.time_series, start=latest.date() - timedelta(days=365), end=latest.date(), bucket='week')
+        calls['token-transaction cursor'] = lambda: main.with_session(main.token_transaction, token_id='1', interval=3, limit=100, cursor=encode_cursor(latest, max_transaction_id), format='json')
+        calls['export'] = lambda: main.with_session(lambda db: db.execute(export.export_query(latest - timedelta(days=30), latest).limit(1)))
+    calls['token-summary'] = lambda: main.with_session(main.token_summary, token_id=None, token_ids=','.join(str(token_id) for token_id in range(100)))
+    if address is not None:
+        calls['address'] = lambda: main.with_session(main.address_analytics, address=address)
+
+    async def live_sales():
+        main.live_feed._last_transaction_id = max(max_transaction_id - 100, 0)
+        async with AsyncSessionLocal() as db:
+            await main.live_feed._new_sales(db)
+    calls['live'] = live_sales
+    return calls
+
+async def explain(statement, parameters):
+    async with engine.connect() as conn:
+        return (await conn.exec_driver_sql('EXPLAIN ' + statement, parameters)).mappings().all()
+
+async def check():
+    # 檢查的是 SQL 引擎的查詢；columnar 載入時本來就會讀整張 transactions
+    main.analytics = aggregates
+    failures = 0
+    for name, call in (await endpoint_calls()).items():
+        for statement, parameters in await capture(call):
+            for row in await explain(statement, parameters):
+                table = row['table'] or ''
+                full_scan = row['type'] in FULL_SCAN_TYPES and table not in SMALL_TABLES and not table.startswith('<')
+                failures += full_scan
+                print(f"{'FULL SCAN' if full_scan else 'ok':<9}  {name:<36} {table:<22} type={row['type']!s:<7} key={row['key']!s:<22} rows={row['rows']}")
+    await engine.dispose()
+
+    print(f'\n{failures} full scan(s).' if failures else '\nNo full scans.')
+    return failures == 0
+
+if __name__ == '__main__':
+    sys.exit(0 if asyncio.run(check()) else 1)
@@ -0,0 +1,193 @@
+import os, sys, time, json, hmac, uuid, random, asyncio, logging, threading, functools, sysconfig, cProfile, pstats
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import Headers, MutableHeaders
+
+logger = logging.getLogger("src.api.profiling")
+
+# 預設關閉；關閉時 main 不會掛上 middleware，也不會註冊 SQL 事件
+PROFILE_ENABLED = os.getenv('PROFILE_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+PROFILE_TOKEN = os.getenv('PROFILE_TOKEN')
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0))
+PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join('/tmp', 'api-profiles'))
+PROFILE_STACK_INTERVAL_MS = float(os.getenv('PROFILE_STACK_INTERVAL_MS', 5))
+PROFILE_HEADER = 'x-profile-token'
+# SSE 會一直連著，/metrics 是抓取用的，分析它們沒有意義
+UNPROFILED_PATHS = ('/api/v1/live', '/metrics')
+
+# 依 profiler 記錄的函式位置（檔案:函式名稱）歸類自身時間，第一個符合的類別勝出
+CATEGORIES = (
+    ('wait', ('selectors.py', 'select.epoll', "'poll' of", "'select' of")),
+    ('orm', ('sqlalchemy/orm/', 'sqlalchemy/engine/result.py', 'sqlalchemy/engine/row.py', 'sqlalchemy/engine/cursor.py')),
+    ('sql', ('sqlalchemy/', 'aiomysql/', 'pymysql/')),
+    ('serialization', ('pydantic', 'json', 'fastapi/encoders.py', 'src/api/responses.py', 'src/api/compression.py', 'zlib', 'brotli')),
+)
+
+class RequestProfile:
+    def __init__(self):
+        self.sql_seconds = 0.0
+        self.statements = 0
+
+active_profile: ContextVar[RequestProfile | None] = ContextVar('active_profile', default=None)
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if active_profile.get() is not None:
+        conn.info['profile_query_started_at'] = time.perf_counter()
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = active_profile.get()
+    started = conn.info.pop('profile_query_started_at', None)
+    if profile is not None and started is not None:
+        profile.sql_seconds += time.perf_counter() - started
+        profile.statements += 1
+
+# 只留 site-packages、專案目錄或標準函式庫之後的路徑，火焰圖上才讀得出是哪個套件
+PATH_PREFIXES = ('site-packages' + os.sep, os.getcwd() + os.sep, sysconfig.get_paths()['stdlib'] + os.sep)
+
+@functools.lru_cache(maxsize=16384)
+def frame_name(code):
+    # 取樣執行緒拿著 GIL 做這件事，同一個 code object 只算一次
+    path = code.co_filename
+    for marker in PATH_PREFIXES:
+        if marker in path:
+            path = path.split(marker, 1)[1]
+            break
+    return f'{path}:{code.co_qualname}'
+
+class StackSampler(threading.Thread):
+    """Sample the event loop thread's Python stack every `interval` seconds.
+
+    The counts are written in the collapsed-stack format ("outer;inner count")
+    that flamegraph.pl, speedscope and inferno read.
+    """
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                names.append(frame_name(frame.f_code))
+                frame = frame.f_back
+            if names:
+                self.stacks[';'.join(reversed(names))] += 1
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+    def collapsed(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+def breakdown(profiler):
+    # 各類別的自身時間（毫秒）；async 等待 I/O 的時間算在 event loop 的 wait
+    totals = {name: 0.0 for name, _ in CATEGORIES}
+    totals['other'] = 0.0
+    for (filename, _, function), (_, _, own_seconds, _, _) in pstats.Stats(profiler).stats.items():
+        location = f'{filename}:{function}'.replace(os.sep, '/')
+        category = next((name for name, fragments in CATEGORIES if any(fragment in location for fragment in fragments)), 'other')
+        totals[category] += own_seconds
+    return {name: round(seconds * 1000, 2) for name, seconds in totals.items()}
+
+class ProfilingMiddleware:
+    """Profile sampled API requests and save where their time went.
+
+    A request is profiled when it carries `X-Profile-Token: <PROFILE_TOKEN>`,
+    or at random with probability PROFILE_SAMPLE_RATE, and only one at a time
+    per worker. The profile covers everything the worker's event loop runs
+    meanwhile, including other requests, so use it on a quiet worker or with a
+    low sample rate. For each profiled request PROFILE_DIR gets:
+
+    - `<id>.prof`: the cProfile stats (snakeviz, `python -m pstats`)
+    - `<id>.collapsed`: sampled stacks for a flamegraph
+    - `<id>.json`: wall-clock SQL time (cursor execute, including the wait on
+      MySQL) and the profiler's own time split into SQL driver and Core, ORM
+      row hydration, serialization, event loop wait and other
+
+    The response gets an `X-Profile-Id` header naming the files.
+    """
+
+    def __init__(self, app, token: str | None = PROFILE_TOKEN, sample_rate: float = PROFILE_SAMPLE_RATE, directory: str = PROFILE_DIR):
+        self.app = app
+        self.token = token
+        self.sample_rate = sample_rate
+        self.directory = directory
+        self._active = False
+        # 掛在 Engine 類別上，primary 和 replica 的查詢都算得到
+        event.listen(Engine, 'before_cursor_execute', before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', after_cursor_execute)
+
+    def wanted(self, scope):
+        if scope['type'] != 'http' or self._active or scope['path'] in UNPROFILED_PATHS:
+            return False
+        token = Headers(scope=scope).get(PROFILE_HEADER)
+        if token is not None:
+            return self.token is not None and hmac.compare_digest(token.encode(), self.token.encode())
+        return random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if not self.wanted(scope):
+            return await self.app(scope, receive, send)
+
+        self._active = True
+        profile_id = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+        profile = RequestProfile()
+        status = 500
+
+        async def send_with_id(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                MutableHeaders(raw=message['headers'])['X-Profile-Id'] = profile_id
+            await send(message)
+
+        token = active_profile.set(profile)
+        sampler = StackSampler(threading.get_ident(), PROFILE_STACK_INTERVAL_MS / 1000)
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        sampler.start()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profiler.disable()
+            elapsed = time.perf_counter() - started
+            sampler.stop()
+            active_profile.reset(token)
+            self._active = False
+            summary = {
+                'id': profile_id,
+                'method': scope['method'],
+                'path': scope['path'],
+                'query': scope['query_string'].decode('latin-1'),
+                'status': status,
+                'total_ms': round(elapsed * 1000, 2),
+                'sql_ms': round(profile.sql_seconds * 1000, 2),
+                'sql_statements': profile.statements,
+                'profiled_ms': await asyncio.to_thread(breakdown, profiler),
+            }
+            try:
+                await asyncio.to_thread(self.save, profile_id, profiler, sampler, summary)
+            except OSError as e:
+                logger.warning("Could not save profile %s to %s: %s", profile_id, self.directory, e)
+            else:
+                logger.info("Profiled %s %s in %.1f ms (SQL %.1f ms in %d statements, profiler own time %s), saved as %s",
+                            summary['method'], summary['path'], summary['total_ms'], summary['sql_ms'], summary['sql_statements'], summary['profiled_ms'], profile_id)
+
+    def save(self, profile_id, profiler, sampler, summary):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, profile_id)
+        profiler.dump_stats(f'{path}.prof')
+        with open(f'{path}.collapsed', 'w') as f:
+            f.write(sampler.collapsed())
+        with open(f'{path}.json', 'w') as f:
+            json.dump(summary, f, indent=2)
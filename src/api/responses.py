@@ -0,0 +1,26 @@
+import pydantic_core
+from fastapi.responses import Response
+
+def dumps(content) -> bytes:
+    """Serialize models, dicts, lists, datetimes and Decimals straight to JSON bytes (pydantic-core, no stdlib json)."""
+    return pydantic_core.to_json(content)
+
+class JSONBytesResponse(Response):
+    """JSON response whose content is already-serialized bytes (or anything `dumps` accepts).
+
+    Returning a Response skips FastAPI's response_model validation and
+    jsonable_encoder pass; the declared response_model still documents the
+    schema in OpenAPI.
+    """
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return content if isinstance(content, bytes) else dumps(content)
+
+def join_object(fields: dict) -> bytes:
+    # 把各端點已經序列化好的 body 直接拼成一個 JSON 物件，不用先解析再重新編碼
+    parts = []
+    for name, value in fields.items():
+        body = value.body if isinstance(value, Response) else dumps(value)
+        parts.append(dumps(name) + b':' + body)
+    return b'{' + b','.join(parts) + b'}'
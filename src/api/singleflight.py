@@ -0,0 +1,37 @@
+import asyncio
+
+class SingleFlight:
+    """Share one in-flight call among concurrent callers with the same key.
+
+    The first caller for a key starts the call as a task; everyone arriving
+    before it finishes awaits that same task instead of running their own.
+    Once it finishes the key is free again, so this never serves stale
+    results on its own; it only collapses a burst (e.g. cold caches right
+    after an ETL load) into one query.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key, fn):
+        """Return (result of fn(), joined); joined is True if another caller's call was shared."""
+        task = self._inflight.get(key)
+        joined = task is not None
+        if task is None:
+            task = asyncio.create_task(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._inflight.pop(key) if self._inflight.get(key) is done else None)
+            self.calls += 1
+        else:
+            self.coalesced += 1
+        # shield: 某個請求斷線時不要取消其他人也在等的查詢
+        return await asyncio.shield(task), joined
+
+    def stats(self):
+        return {
+            'inflight': len(self._inflight),
+            'calls': self.calls,
+            'coalesced': self.coalesced,
+        }
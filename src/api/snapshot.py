@@ -0,0 +1,205 @@
+import os, json, mmap, struct, time, logging
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+import src.api.aggregates as aggregates
+from src.api.cache import response_cache
+from src.api.intervals import EPOCH
+
+logger = logging.getLogger("src.api.snapshot")
+
+# 和 src/etl/snapshot.py 寫出的格式相同
+MAGIC = b'APESNAP1'
+HEADER = struct.Struct('<8sQqI')
+INDEX_ENTRY = struct.Struct('<32sQQ')
+
+HOURLY_STATS_DTYPE = np.dtype([
+    ('hour', '<i8'), ('total_volume', '<i8'), ('transaction_count', '<i8'),
+    ('max_price', '<i8'), ('max_price_token_id', '<i8'),
+])
+HOURLY_MARKET_STATS_DTYPE = np.dtype([
+    ('hour', '<i8'), ('market_id', '<i8'), ('total_volume', '<i8'), ('transaction_count', '<i8'),
+])
+
+AddressTotal = namedtuple('AddressTotal', ['address', 'total_volume', 'transaction_count'])
+Resale = namedtuple('Resale', ['token_id', 'price_difference', 'seller'])
+
+def to_decimal(cents) -> Decimal:
+    return Decimal(int(round(cents))).scaleb(-2)
+
+class Snapshot:
+    """One published snapshot file, memory-mapped read-only."""
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            self.stat = os.fstat(f.fileno())
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.version, updated_at, section_count = HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an analytics snapshot.")
+        self.updated_at = datetime.fromtimestamp(updated_at, timezone.utc).replace(tzinfo=None) if updated_at else None
+
+        self.sections = {}
+        for i in range(section_count):
+            name, offset, length = INDEX_ENTRY.unpack_from(self.buffer, HEADER.size + i * INDEX_ENTRY.size)
+            self.sections[name.rstrip(b'\0').decode()] = (offset, length)
+
+        self.hourly_stats = self.array('hourly_stats', HOURLY_STATS_DTYPE)
+        self.hourly_market_stats = self.array('hourly_market_stats', HOURLY_MARKET_STATS_DTYPE)
+        self.markets = {int(market_id): name for market_id, name in self.json('markets').items()}
+
+    def array(self, name: str, dtype: np.dtype):
+        # 直接指向 mmap 的頁面，不複製；同一個檔案的頁面由所有 worker 共用 page cache
+        offset, length = self.sections[name]
+        return np.frombuffer(self.buffer, dtype=dtype, count=length // dtype.itemsize, offset=offset)
+
+    def json(self, name: str):
+        offset, length = self.sections[name]
+        return json.loads(self.buffer[offset:offset + length])
+
+class SnapshotEngine:
+    """Analytics served from the snapshot the ETL publishes after each load.
+
+    Each API worker maps the file read-only and checks its stat at most every
+    `check_seconds`; the ETL swaps in a new file with os.replace, so a changed
+    inode means a new version and the worker simply maps the new file. The
+    snapshot is only used while its version matches `data_version`, so
+    between the ETL's bump and its publish (or when it never publishes) the
+    queries fall back to SQL instead of serving the previous load. Windows
+    are summed from hourly buckets, so they match the SQL path whenever the
+    window starts on the hour ('hour' or 'day' granularity). Anything the
+    snapshot cannot answer falls back to src.api.aggregates.
+    """
+
+    def __init__(self, path: str | None, check_seconds: float):
+        self.path = path
+        self.check_seconds = check_seconds
+        self._snapshot = None
+        self._checked_at = 0.0
+        self._behind_version = None
+
+    def check_available(self):
+        # 沒有檔案不會報錯，只會默默全部走 SQL，所以啟動時要講清楚
+        if not self.path:
+            logger.error("ANALYTICS_ENGINE=snapshot but SNAPSHOT_PATH is not set: every analytics query falls back to SQL.")
+        elif not os.path.exists(self.path):
+            logger.error("ANALYTICS_ENGINE=snapshot but %s does not exist (is the ETL's snapshot volume mounted here?): analytics queries fall back to SQL until the ETL publishes it.", self.path)
+
+    def current(self):
+        if not self.path or time.monotonic() - self._checked_at < self.check_seconds:
+            return self._snapshot
+        self._checked_at = time.monotonic()
+
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return self._snapshot
+        if self._snapshot is None or (stat.st_ino, stat.st_mtime_ns) != (self._snapshot.stat.st_ino, self._snapshot.stat.st_mtime_ns):
+            # 舊的 mmap 不主動 close，還在用它的 array 釋放後自然回收
+            if self._snapshot is None:
+                logger.warning("Serving analytics from the snapshot at %s.", self.path)
+            self._snapshot = Snapshot(self.path)
+        return self._snapshot
+
+    async def fresh(self, db: AsyncSession):
+        # 快照自己記版本；只有和 data_version 一樣時才拿來回答，否則走 SQL
+        await response_cache.sync_version(db)
+        snapshot = self.current()
+        if snapshot is None or snapshot.version == response_cache.version:
+            return snapshot
+        if self._behind_version != response_cache.version:
+            self._behind_version = response_cache.version
+            logger.warning("Snapshot version %s is behind data version %s: analytics queries fall back to SQL until the ETL publishes it.", snapshot.version, response_cache.version)
+        return None
+
+    def _start_hour(self, start_time: datetime | None):
+        if start_time is None:
+            return None
+        elapsed = start_time - EPOCH
+        if elapsed % timedelta(hours=1):
+            raise ValueError("Window does not start on the hour.")
+        return elapsed // timedelta(hours=1)
+
+    async def time_based_totals(self, db: AsyncSession, start_time: datetime | None):
+        snapshot = await self.fresh(db)
+        try:
+            start_hour = self._start_hour(start_time)
+        except ValueError:
+            snapshot = None
+        if snapshot is None:
+            return await aggregates.time_based_totals(db, start_time)
+
+        stats = snapshot.hourly_stats
+        if start_hour is not None:
+            stats = stats[np.searchsorted(stats['hour'], start_hour):]
+
+        total_volume = to_decimal(stats['total_volume'].sum())
+        transaction_count = int(stats['transaction_count'].sum())
+        # argmax 取第一個最大值，也就是最早的那個小時
+        highest = stats[np.argmax(stats['max_price'])] if len(stats) else None
+
+        return {
+            'total_volume': total_volume,
+            'transaction_count': transaction_count,
+            'average_price': total_volume / transaction_count if transaction_count else Decimal(0),
+            'highest_price_token_id': int(highest['max_price_token_id']) if highest is not None else None,
+            'highest_price': to_decimal(highest['max_price']) if highest is not None else None,
+        }
+
+    async def marketplace_totals(self, db: AsyncSession, start_time: datetime | None):
+        snapshot = await self.fresh(db)
+        try:
+            start_hour = self._start_hour(start_time)
+        except ValueError:
+            snapshot = None
+        if snapshot is None:
+            return await aggregates.marketplace_totals(db, start_time)
+
+        stats = snapshot.hourly_market_stats
+        if start_hour is not None:
+            stats = stats[np.searchsorted(stats['hour'], start_hour):]
+
+        volumes = np.bincount(stats['market_id'], weights=stats['total_volume'])
+        counts = np.bincount(stats['market_id'], weights=stats['transaction_count'])
+        totals = [
+            (snapshot.markets[market_id], to_decimal(volumes[market_id]), int(counts[market_id]))
+            for market_id in np.flatnonzero(counts)
+            if market_id in snapshot.markets
+        ]
+        return [
+            {
+                'marketplace': marketplace,
+                'total_volume': total_volume,
+                'transaction_count': transaction_count,
+                'average_price': total_volume / transaction_count,
+            }
+            for marketplace, total_volume, transaction_count in sorted(totals, key=lambda market: market[1], reverse=True)
+        ]
+
+    async def top_addresses(self, db: AsyncSession, role: str, interval: int, limit: int):
+        snapshot = await self.fresh(db)
+        if snapshot is None:
+            return await aggregates.top_addresses(db, role, interval, limit)
+
+        return [
+            AddressTotal(address, Decimal(total_volume), transaction_count)
+            for address, total_volume, transaction_count in snapshot.json(f'top_{role}s/{interval}')[:limit]
+        ]
+
+    async def top_resales(self, db: AsyncSession, interval: int, limit: int):
+        snapshot = await self.fresh(db)
+        if snapshot is None:
+            return await aggregates.top_resales(db, interval, limit)
+
+        return [
+            Resale(token_id, Decimal(price_difference), seller)
+            for token_id, price_difference, seller in snapshot.json(f'top_resales/{interval}')[:limit]
+        ]
+
+snapshot_engine = SnapshotEngine(
+    path=os.getenv('SNAPSHOT_PATH'),
+    check_seconds=float(os.getenv('SNAPSHOT_CHECK_SECONDS', 1)),
+)
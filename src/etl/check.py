@@ -0,0 +1,70 @@
+import sys
+from db.manager import DataBaseManager
+from load import LEADERBOARD_INTERVALS, LEADERBOARD_SIZE
+
+# 用原始 transactions 重算排行榜，和增量維護的結果比對
+def check_address_leaderboard(db, role, interval_id, window_start):
+    address_column = 'buyer_id' if role == 'buyer' else 'seller_id'
+    raw = db.fetch_all(f"""
+        SELECT {address_column}, SUM(price), COUNT(*)
+        FROM transactions
+        WHERE {address_column} IS NOT NULL {'AND time >= %s' if window_start else ''}
+        GROUP BY {address_column}
+        ORDER BY SUM(price) DESC, {address_column} DESC
+        LIMIT %s
+        """, ((window_start,) if window_start else ()) + (LEADERBOARD_SIZE,))
+    board = db.fetch_all("""
+        SELECT address_id, total_volume, transaction_count
+        FROM address_leaderboards
+        WHERE role = %s AND interval_id = %s
+        ORDER BY total_volume DESC, address_id DESC
+        LIMIT %s
+        """, (role, interval_id, LEADERBOARD_SIZE))
+    return list(raw) == list(board)
+
+def check_resale_leaderboard(db, interval_id, window_start):
+    raw = db.fetch_all(f"""
+        SELECT transaction_id, price - previous_price
+        FROM transactions
+        WHERE previous_price IS NOT NULL AND seller_id IS NOT NULL {'AND time >= %s' if window_start else ''}
+        ORDER BY price - previous_price DESC, transaction_id
+        LIMIT %s
+        """, ((window_start,) if window_start else ()) + (LEADERBOARD_SIZE,))
+    board = db.fetch_all("""
+        SELECT transaction_id, price_difference
+        FROM resale_leaderboards
+        WHERE interval_id = %s
+        ORDER BY price_difference DESC, transaction_id
+        LIMIT %s
+        """, (interval_id, LEADERBOARD_SIZE))
+    return list(raw) == list(board)
+
+def check_leaderboards(db):
+    windows = dict(db.fetch_all("SELECT interval_id, window_start FROM leaderboard_windows"))
+    consistent = True
+
+    for interval_id, days in LEADERBOARD_INTERVALS.items():
+        window_start = windows.get(interval_id)
+        if days is not None and window_start is None:
+            print(f'Interval {interval_id}: no window recorded, run `python rebuild.py leaderboards`.')
+            consistent = False
+            continue
+
+        results = {
+            'top buyers': check_address_leaderboard(db, 'buyer', interval_id, window_start),
+            'top sellers': check_address_leaderboard(db, 'seller', interval_id, window_start),
+            'top resales': check_resale_leaderboard(db, interval_id, window_start),
+        }
+        for name, matches in results.items():
+            print(f'Interval {interval_id} {name}: {"OK" if matches else "MISMATCH"}')
+            consistent = consistent and matches
+
+    return consistent
+
+if __name__ == '__main__':
+    db = DataBaseManager()
+    try:
+        consistent = check_leaderboards(db)
+    finally:
+        db.close()
+    sys.exit(0 if consistent else 1)
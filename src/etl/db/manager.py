@@ -5,6 +5,7 @@ from dotenv import load_dotenv
 class DataBaseManager:
     def __init__(self):
         load_dotenv()
+        # ETL 的寫入和對照表查詢一律連 primary（DB_HOST）；DB_REPLICA_* 只給 API 讀
         try:
             self.connection = pymysql.connect(host=os.getenv('DB_HOST'),
                                      user=os.getenv('DB_USER'),
@@ -50,9 +51,17 @@ class DataBaseManager:
     def commit(self):
         try:
             self.connection.commit()
+            return True
         except pymysql.Error as e:
             print(f'Error committing: {e}')
             self.connection.rollback()
+            return False
+
+    def rollback(self):
+        try:
+            self.connection.rollback()
+        except pymysql.Error as e:
+            print(f'Error rolling back: {e}')
 
     def close(self):
         self.cursor.close()
@@ -0,0 +1,25 @@
+-- Daily rollups of the transactions table, kept up to date by DataLoader.update_daily_rollups
+-- and rebuilt from scratch with `python rebuild.py rollups`.
+
+CREATE TABLE IF NOT EXISTS `daily_stats` (
+  `day` date NOT NULL COMMENT 'UTC calendar day of the sales',
+  `total_volume` decimal(30,2) NOT NULL,
+  `transaction_count` int NOT NULL,
+  `min_price` decimal(20,2) NOT NULL,
+  `max_price` decimal(20,2) NOT NULL,
+  `max_price_token_id` int NOT NULL COMMENT 'Token of the highest sale of the day',
+  PRIMARY KEY (`day`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE IF NOT EXISTS `daily_market_stats` (
+  `day` date NOT NULL COMMENT 'UTC calendar day of the sales',
+  `market_id` int NOT NULL,
+  `total_volume` decimal(30,2) NOT NULL,
+  `transaction_count` int NOT NULL,
+  `min_price` decimal(20,2) NOT NULL,
+  `max_price` decimal(20,2) NOT NULL,
+  `max_price_token_id` int NOT NULL COMMENT 'Token of the highest sale of the day on this market',
+  PRIMARY KEY (`day`,`market_id`),
+  KEY `market_id` (`market_id`),
+  CONSTRAINT `daily_market_stats_ibfk_1` FOREIGN KEY (`market_id`) REFERENCES `markets` (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
@@ -0,0 +1,11 @@
+-- Single-row marker bumped by DataLoader.bump_data_version after every committed load.
+-- The API compares it to invalidate cached responses.
+
+CREATE TABLE IF NOT EXISTS `data_version` (
+  `id` tinyint NOT NULL DEFAULT '1',
+  `version` bigint NOT NULL COMMENT 'Bumped by the ETL after every committed load',
+  `updated_at` datetime NOT NULL,
+  PRIMARY KEY (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+INSERT IGNORE INTO `data_version` (`id`, `version`, `updated_at`) VALUES (1, 1, UTC_TIMESTAMP());
@@ -0,0 +1,9 @@
+-- Persistent cache of Moralis NFT metadata, filled by the API's /api/v1/nft-details endpoint.
+
+CREATE TABLE IF NOT EXISTS `nft_metadata` (
+  `token_id` int NOT NULL,
+  `image_url` varchar(512) DEFAULT NULL,
+  `rarity_rank` int DEFAULT NULL,
+  `fetched_at` datetime NOT NULL COMMENT 'When the metadata was fetched from Moralis',
+  PRIMARY KEY (`token_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
@@ -0,0 +1,8 @@
+-- Seller and previous price of every sale, filled by DataTransformer.attach_previous_sales at load time.
+-- Populate existing rows afterwards with `python rebuild.py sellers`.
+
+ALTER TABLE `transactions`
+  ADD COLUMN `seller_id` int DEFAULT NULL COMMENT 'Buyer of the previous sale of the same token',
+  ADD COLUMN `previous_price` decimal(20,2) DEFAULT NULL COMMENT 'Price of the previous sale of the same token',
+  ADD KEY `seller_id` (`seller_id`),
+  ADD CONSTRAINT `transactions_ibfk_4` FOREIGN KEY (`seller_id`) REFERENCES `addresses` (`id`);
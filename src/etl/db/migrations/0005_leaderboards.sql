@@ -0,0 +1,51 @@
+-- Incrementally maintained top buyer, seller and resale leaderboards, updated by
+-- DataLoader.update_leaderboards after every load. Fill them once with `python rebuild.py leaderboards`.
+
+CREATE TABLE IF NOT EXISTS `daily_address_stats` (
+  `role` varchar(6) NOT NULL COMMENT 'buyer or seller',
+  `day` date NOT NULL COMMENT 'UTC calendar day of the sales',
+  `address_id` int NOT NULL,
+  `total_volume` decimal(30,2) NOT NULL,
+  `transaction_count` int NOT NULL,
+  PRIMARY KEY (`role`,`day`,`address_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE IF NOT EXISTS `leaderboard_windows` (
+  `interval_id` tinyint NOT NULL COMMENT '0 = last 7 days, 1 = last 30 days, 2 = last year',
+  `window_start` date NOT NULL COMMENT 'First UTC day currently counted in the leaderboards',
+  PRIMARY KEY (`interval_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE IF NOT EXISTS `address_leaderboards` (
+  `role` varchar(6) NOT NULL COMMENT 'buyer or seller',
+  `interval_id` tinyint NOT NULL COMMENT '0 = last 7 days, 1 = last 30 days, 2 = last year, 3 = all time',
+  `address_id` int NOT NULL,
+  `total_volume` decimal(30,2) NOT NULL,
+  `transaction_count` int NOT NULL,
+  PRIMARY KEY (`role`,`interval_id`,`address_id`),
+  KEY `ranking` (`role`,`interval_id`,`total_volume`),
+  KEY `address_id` (`address_id`),
+  CONSTRAINT `address_leaderboards_ibfk_1` FOREIGN KEY (`address_id`) REFERENCES `addresses` (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE IF NOT EXISTS `daily_top_resales` (
+  `transaction_id` int NOT NULL,
+  `day` date NOT NULL COMMENT 'UTC calendar day of the sale',
+  `token_id` int NOT NULL,
+  `seller_id` int NOT NULL,
+  `price_difference` decimal(20,2) NOT NULL,
+  PRIMARY KEY (`transaction_id`),
+  KEY `ranking` (`day`,`price_difference`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE IF NOT EXISTS `resale_leaderboards` (
+  `interval_id` tinyint NOT NULL COMMENT '0 = last 7 days, 1 = last 30 days, 2 = last year, 3 = all time',
+  `transaction_id` int NOT NULL,
+  `token_id` int NOT NULL,
+  `seller_id` int NOT NULL,
+  `price_difference` decimal(20,2) NOT NULL,
+  PRIMARY KEY (`interval_id`,`transaction_id`),
+  KEY `ranking` (`interval_id`,`price_difference`),
+  KEY `seller_id` (`seller_id`),
+  CONSTRAINT `resale_leaderboards_ibfk_1` FOREIGN KEY (`seller_id`) REFERENCES `addresses` (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
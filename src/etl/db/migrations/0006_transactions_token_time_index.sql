@@ -0,0 +1,7 @@
+-- Composite index for keyset-paginated token histories: (token_id, time) plus the implicit
+-- primary key suffix serves `WHERE token_id = ? AND (time, transaction_id) < (?, ?) ORDER BY time DESC`.
+-- It also covers every lookup the single-column token_id index served, so that one is dropped.
+
+ALTER TABLE `transactions`
+  ADD KEY `token_time_idx` (`token_id`,`time`),
+  DROP KEY `token_id`;
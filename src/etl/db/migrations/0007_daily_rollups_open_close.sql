@@ -0,0 +1,14 @@
+-- First and last sale of every rollup row, for OHLC-style time series.
+-- Populate existing rows afterwards with `python rebuild.py rollups`.
+
+ALTER TABLE `daily_stats`
+  ADD COLUMN `open_price` decimal(20,2) DEFAULT NULL COMMENT 'Price of the first sale of the day',
+  ADD COLUMN `open_time` datetime DEFAULT NULL,
+  ADD COLUMN `close_price` decimal(20,2) DEFAULT NULL COMMENT 'Price of the last sale of the day',
+  ADD COLUMN `close_time` datetime DEFAULT NULL;
+
+ALTER TABLE `daily_market_stats`
+  ADD COLUMN `open_price` decimal(20,2) DEFAULT NULL COMMENT 'Price of the first sale of the day on this market',
+  ADD COLUMN `open_time` datetime DEFAULT NULL,
+  ADD COLUMN `close_price` decimal(20,2) DEFAULT NULL COMMENT 'Price of the last sale of the day on this market',
+  ADD COLUMN `close_time` datetime DEFAULT NULL;
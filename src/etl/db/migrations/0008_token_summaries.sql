@@ -0,0 +1,16 @@
+-- One summary row per token (0-9999), upserted by DataLoader.update_token_summaries for the
+-- tokens in each batch. Populate it afterwards with `python rebuild.py tokens`.
+
+CREATE TABLE IF NOT EXISTS `token_summaries` (
+  `token_id` int NOT NULL,
+  `sale_count` int NOT NULL DEFAULT '0',
+  `total_volume` decimal(30,2) NOT NULL DEFAULT '0.00',
+  `max_price` decimal(20,2) DEFAULT NULL COMMENT 'All-time high sale price',
+  `max_price_time` datetime DEFAULT NULL COMMENT 'Time of the earliest sale at the all-time high',
+  `last_price` decimal(20,2) DEFAULT NULL,
+  `last_sale_time` datetime DEFAULT NULL,
+  `last_buyer_id` int DEFAULT NULL COMMENT 'Buyer of the last sale, i.e. the current holder',
+  PRIMARY KEY (`token_id`),
+  KEY `last_buyer_id` (`last_buyer_id`),
+  CONSTRAINT `token_summaries_ibfk_1` FOREIGN KEY (`last_buyer_id`) REFERENCES `addresses` (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
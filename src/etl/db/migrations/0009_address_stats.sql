@@ -0,0 +1,13 @@
+-- Lifetime buy/sell totals of every address, merged from each batch by DataLoader.update_address_stats.
+-- Populate it afterwards with `python rebuild.py addresses`.
+
+CREATE TABLE IF NOT EXISTS `address_stats` (
+  `address_id` int NOT NULL,
+  `buy_count` int NOT NULL DEFAULT '0',
+  `buy_volume` decimal(30,2) NOT NULL DEFAULT '0.00',
+  `sell_count` int NOT NULL DEFAULT '0',
+  `sell_volume` decimal(30,2) NOT NULL DEFAULT '0.00',
+  `realized_pnl` decimal(30,2) NOT NULL DEFAULT '0.00' COMMENT 'Sum of price - previous_price over the sales made by this address',
+  PRIMARY KEY (`address_id`),
+  CONSTRAINT `address_stats_ibfk_1` FOREIGN KEY (`address_id`) REFERENCES `addresses` (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
@@ -0,0 +1,98 @@
+-- Monthly range partitions on `transactions` and covering indexes for its access paths:
+--   (time, market_id, price)  time-window totals and per-market totals read from the index alone
+--   (buyer_id, time, price)   per-buyer volume over a window (leaderboards, address stats, checks)
+--   (token_id, time)          token histories, already added by 0006
+-- MySQL cannot partition a table that has foreign keys, and every unique key must contain the
+-- partitioning column, so the foreign keys are dropped (the ETL resolves every id through its
+-- mappings before inserting) and the primary key becomes (transaction_id, time).
+-- The single-column time and buyer_id keys are prefixes of the new indexes and are dropped.
+-- p202104 also holds anything older; DataLoader.ensure_transaction_partitions splits new months
+-- off pmax before each load. Check the plans afterwards with `python -m src.api.plan_check`.
+
+ALTER TABLE `transactions`
+  DROP FOREIGN KEY `transactions_ibfk_1`,
+  DROP FOREIGN KEY `transactions_ibfk_2`,
+  DROP FOREIGN KEY `transactions_ibfk_3`,
+  DROP FOREIGN KEY `transactions_ibfk_4`;
+
+ALTER TABLE `transactions`
+  DROP PRIMARY KEY,
+  ADD PRIMARY KEY (`transaction_id`,`time`),
+  ADD KEY `time_market_price_idx` (`time`,`market_id`,`price`),
+  ADD KEY `buyer_time_price_idx` (`buyer_id`,`time`,`price`),
+  DROP KEY `time_idx`,
+  DROP KEY `buyer_id`;
+
+ALTER TABLE `transactions`
+  PARTITION BY RANGE COLUMNS(`time`) (
+    PARTITION p202104 VALUES LESS THAN ('2021-05-01'),
+    PARTITION p202105 VALUES LESS THAN ('2021-06-01'),
+    PARTITION p202106 VALUES LESS THAN ('2021-07-01'),
+    PARTITION p202107 VALUES LESS THAN ('2021-08-01'),
+    PARTITION p202108 VALUES LESS THAN ('2021-09-01'),
+    PARTITION p202109 VALUES LESS THAN ('2021-10-01'),
+    PARTITION p202110 VALUES LESS THAN ('2021-11-01'),
+    PARTITION p202111 VALUES LESS THAN ('2021-12-01'),
+    PARTITION p202112 VALUES LESS THAN ('2022-01-01'),
+    PARTITION p202201 VALUES LESS THAN ('2022-02-01'),
+    PARTITION p202202 VALUES LESS THAN ('2022-03-01'),
+    PARTITION p202203 VALUES LESS THAN ('2022-04-01'),
+    PARTITION p202204 VALUES LESS THAN ('2022-05-01'),
+    PARTITION p202205 VALUES LESS THAN ('2022-06-01'),
+    PARTITION p202206 VALUES LESS THAN ('2022-07-01'),
+    PARTITION p202207 VALUES LESS THAN ('2022-08-01'),
+    PARTITION p202208 VALUES LESS THAN ('2022-09-01'),
+    PARTITION p202209 VALUES LESS THAN ('2022-10-01'),
+    PARTITION p202210 VALUES LESS THAN ('2022-11-01'),
+    PARTITION p202211 VALUES LESS THAN ('2022-12-01'),
+    PARTITION p202212 VALUES LESS THAN ('2023-01-01'),
+    PARTITION p202301 VALUES LESS THAN ('2023-02-01'),
+    PARTITION p202302 VALUES LESS THAN ('2023-03-01'),
+    PARTITION p202303 VALUES LESS THAN ('2023-04-01'),
+    PARTITION p202304 VALUES LESS THAN ('2023-05-01'),
+    PARTITION p202305 VALUES LESS THAN ('2023-06-01'),
+    PARTITION p202306 VALUES LESS THAN ('2023-07-01'),
+    PARTITION p202307 VALUES LESS THAN ('2023-08-01'),
+    PARTITION p202308 VALUES LESS THAN ('2023-09-01'),
+    PARTITION p202309 VALUES LESS THAN ('2023-10-01'),
+    PARTITION p202310 VALUES LESS THAN ('2023-11-01'),
+    PARTITION p202311 VALUES LESS THAN ('2023-12-01'),
+    PARTITION p202312 VALUES LESS THAN ('2024-01-01'),
+    PARTITION p202401 VALUES LESS THAN ('2024-02-01'),
+    PARTITION p202402 VALUES LESS THAN ('2024-03-01'),
+    PARTITION p202403 VALUES LESS THAN ('2024-04-01'),
+    PARTITION p202404 VALUES LESS THAN ('2024-05-01'),
+    PARTITION p202405 VALUES LESS THAN ('2024-06-01'),
+    PARTITION p202406 VALUES LESS THAN ('2024-07-01'),
+    PARTITION p202407 VALUES LESS THAN ('2024-08-01'),
+    PARTITION p202408 VALUES LESS THAN ('2024-09-01'),
+    PARTITION p202409 VALUES LESS THAN ('2024-10-01'),
+    PARTITION p202410 VALUES LESS THAN ('2024-11-01'),
+    PARTITION p202411 VALUES LESS THAN ('2024-12-01'),
+    PARTITION p202412 VALUES LESS THAN ('2025-01-01'),
+    PARTITION p202501 VALUES LESS THAN ('2025-02-01'),
+    PARTITION p202502 VALUES LESS THAN ('2025-03-01'),
+    PARTITION p202503 VALUES LESS THAN ('2025-04-01'),
+    PARTITION p202504 VALUES LESS THAN ('2025-05-01'),
+    PARTITION p202505 VALUES LESS THAN ('2025-06-01'),
+    PARTITION p202506 VALUES LESS THAN ('2025-07-01'),
+    PARTITION p202507 VALUES LESS THAN ('2025-08-01'),
+    PARTITION p202508 VALUES LESS THAN ('2025-09-01'),
+    PARTITION p202509 VALUES LESS THAN ('2025-10-01'),
+    PARTITION p202510 VALUES LESS THAN ('2025-11-01'),
+    PARTITION p202511 VALUES LESS THAN ('2025-12-01'),
+    PARTITION p202512 VALUES LESS THAN ('2026-01-01'),
+    PARTITION p202601 VALUES LESS THAN ('2026-02-01'),
+    PARTITION p202602 VALUES LESS THAN ('2026-03-01'),
+    PARTITION p202603 VALUES LESS THAN ('2026-04-01'),
+    PARTITION p202604 VALUES LESS THAN ('2026-05-01'),
+    PARTITION p202605 VALUES LESS THAN ('2026-06-01'),
+    PARTITION p202606 VALUES LESS THAN ('2026-07-01'),
+    PARTITION p202607 VALUES LESS THAN ('2026-08-01'),
+    PARTITION p202608 VALUES LESS THAN ('2026-09-01'),
+    PARTITION p202609 VALUES LESS THAN ('2026-10-01'),
+    PARTITION p202610 VALUES LESS THAN ('2026-11-01'),
+    PARTITION p202611 VALUES LESS THAN ('2026-12-01'),
+    PARTITION p202612 VALUES LESS THAN ('2027-01-01'),
+    PARTITION pmax VALUES LESS THAN (MAXVALUE)
+  );
@@ -0,0 +1,5 @@
+-- Bumped together with `version` when rebuild.py (or benchmarks/generate_data.py) rewrites rows.
+-- The API's columnar engine appends new transactions on a version bump and reloads everything only when this changes.
+
+ALTER TABLE `data_version`
+  ADD COLUMN `rebuild_generation` bigint NOT NULL DEFAULT '0' COMMENT 'Bumped by rebuild.py after rewriting existing rows';
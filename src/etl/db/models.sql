@@ -76,17 +76,296 @@ CREATE TABLE `transactions` (
   `token_id` int NOT NULL,
   `price` decimal(20,2) NOT NULL,
   `market_id` int NOT NULL,
-  PRIMARY KEY (`transaction_id`),
+  `seller_id` int DEFAULT NULL COMMENT 'Buyer of the previous sale of the same token',
+  `previous_price` decimal(20,2) DEFAULT NULL COMMENT 'Price of the previous sale of the same token',
+  PRIMARY KEY (`transaction_id`,`time`),
   KEY `action_id` (`action_id`),
-  KEY `buyer_id` (`buyer_id`),
-  KEY `token_id` (`token_id`),
+  KEY `token_time_idx` (`token_id`,`time`),
   KEY `market_id` (`market_id`),
-  KEY `time_idx` (`time`),
-  CONSTRAINT `transactions_ibfk_1` FOREIGN KEY (`action_id`) REFERENCES `actions` (`id`),
-  CONSTRAINT `transactions_ibfk_2` FOREIGN KEY (`buyer_id`) REFERENCES `addresses` (`id`),
-  CONSTRAINT `transactions_ibfk_3` FOREIGN KEY (`market_id`) REFERENCES `markets` (`id`)
-) ENGINE=InnoDB AUTO_INCREMENT=175203 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+  KEY `seller_id` (`seller_id`),
+  KEY `time_market_price_idx` (`time`,`market_id`,`price`),
+  KEY `buyer_time_price_idx` (`buyer_id`,`time`,`price`)
+) ENGINE=InnoDB AUTO_INCREMENT=175203 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci
+/*!50500 PARTITION BY RANGE  COLUMNS(`time`)
+(PARTITION p202104 VALUES LESS THAN ('2021-05-01') ENGINE = InnoDB,
+PARTITION p202105 VALUES LESS THAN ('2021-06-01') ENGINE = InnoDB,
+PARTITION p202106 VALUES LESS THAN ('2021-07-01') ENGINE = InnoDB,
+PARTITION p202107 VALUES LESS THAN ('2021-08-01') ENGINE = InnoDB,
+PARTITION p202108 VALUES LESS THAN ('2021-09-01') ENGINE = InnoDB,
+PARTITION p202109 VALUES LESS THAN ('2021-10-01') ENGINE = InnoDB,
+PARTITION p202110 VALUES LESS THAN ('2021-11-01') ENGINE = InnoDB,
+PARTITION p202111 VALUES LESS THAN ('2021-12-01') ENGINE = InnoDB,
+PARTITION p202112 VALUES LESS THAN ('2022-01-01') ENGINE = InnoDB,
+PARTITION p202201 VALUES LESS THAN ('2022-02-01') ENGINE = InnoDB,
+PARTITION p202202 VALUES LESS THAN ('2022-03-01') ENGINE = InnoDB,
+PARTITION p202203 VALUES LESS THAN ('2022-04-01') ENGINE = InnoDB,
+PARTITION p202204 VALUES LESS THAN ('2022-05-01') ENGINE = InnoDB,
+PARTITION p202205 VALUES LESS THAN ('2022-06-01') ENGINE = InnoDB,
+PARTITION p202206 VALUES LESS THAN ('2022-07-01') ENGINE = InnoDB,
+PARTITION p202207 VALUES LESS THAN ('2022-08-01') ENGINE = InnoDB,
+PARTITION p202208 VALUES LESS THAN ('2022-09-01') ENGINE = InnoDB,
+PARTITION p202209 VALUES LESS THAN ('2022-10-01') ENGINE = InnoDB,
+PARTITION p202210 VALUES LESS THAN ('2022-11-01') ENGINE = InnoDB,
+PARTITION p202211 VALUES LESS THAN ('2022-12-01') ENGINE = InnoDB,
+PARTITION p202212 VALUES LESS THAN ('2023-01-01') ENGINE = InnoDB,
+PARTITION p202301 VALUES LESS THAN ('2023-02-01') ENGINE = InnoDB,
+PARTITION p202302 VALUES LESS THAN ('2023-03-01') ENGINE = InnoDB,
+PARTITION p202303 VALUES LESS THAN ('2023-04-01') ENGINE = InnoDB,
+PARTITION p202304 VALUES LESS THAN ('2023-05-01') ENGINE = InnoDB,
+PARTITION p202305 VALUES LESS THAN ('2023-06-01') ENGINE = InnoDB,
+PARTITION p202306 VALUES LESS THAN ('2023-07-01') ENGINE = InnoDB,
+PARTITION p202307 VALUES LESS THAN ('2023-08-01') ENGINE = InnoDB,
+PARTITION p202308 VALUES LESS THAN ('2023-09-01') ENGINE = InnoDB,
+PARTITION p202309 VALUES LESS THAN ('2023-10-01') ENGINE = InnoDB,
+PARTITION p202310 VALUES LESS THAN ('2023-11-01') ENGINE = InnoDB,
+PARTITION p202311 VALUES LESS THAN ('2023-12-01') ENGINE = InnoDB,
+PARTITION p202312 VALUES LESS THAN ('2024-01-01') ENGINE = InnoDB,
+PARTITION p202401 VALUES LESS THAN ('2024-02-01') ENGINE = InnoDB,
+PARTITION p202402 VALUES LESS THAN ('2024-03-01') ENGINE = InnoDB,
+PARTITION p202403 VALUES LESS THAN ('2024-04-01') ENGINE = InnoDB,
+PARTITION p202404 VALUES LESS THAN ('2024-05-01') ENGINE = InnoDB,
+PARTITION p202405 VALUES LESS THAN ('2024-06-01') ENGINE = InnoDB,
+PARTITION p202406 VALUES LESS THAN ('2024-07-01') ENGINE = InnoDB,
+PARTITION p202407 VALUES LESS THAN ('2024-08-01') ENGINE = InnoDB,
+PARTITION p202408 VALUES LESS THAN ('2024-09-01') ENGINE = InnoDB,
+PARTITION p202409 VALUES LESS THAN ('2024-10-01') ENGINE = InnoDB,
+PARTITION p202410 VALUES LESS THAN ('2024-11-01') ENGINE = InnoDB,
+PARTITION p202411 VALUES LESS THAN ('2024-12-01') ENGINE = InnoDB,
+PARTITION p202412 VALUES LESS THAN ('2025-01-01') ENGINE = InnoDB,
+PARTITION p202501 VALUES LESS THAN ('2025-02-01') ENGINE = InnoDB,
+PARTITION p202502 VALUES LESS THAN ('2025-03-01') ENGINE = InnoDB,
+PARTITION p202503 VALUES LESS THAN ('2025-04-01') ENGINE = InnoDB,
+PARTITION p202504 VALUES LESS THAN ('2025-05-01') ENGINE = InnoDB,
+PARTITION p202505 VALUES LESS THAN ('2025-06-01') ENGINE = InnoDB,
+PARTITION p202506 VALUES LESS THAN ('2025-07-01') ENGINE = InnoDB,
+PARTITION p202507 VALUES LESS THAN ('2025-08-01') ENGINE = InnoDB,
+PARTITION p202508 VALUES LESS THAN ('2025-09-01') ENGINE = InnoDB,
+PARTITION p202509 VALUES LESS THAN ('2025-10-01') ENGINE = InnoDB,
+PARTITION p202510 VALUES LESS THAN ('2025-11-01') ENGINE = InnoDB,
+PARTITION p202511 VALUES LESS THAN ('2025-12-01') ENGINE = InnoDB,
+PARTITION p202512 VALUES LESS THAN ('2026-01-01') ENGINE = InnoDB,
+PARTITION p202601 VALUES LESS THAN ('2026-02-01') ENGINE = InnoDB,
+PARTITION p202602 VALUES LESS THAN ('2026-03-01') ENGINE = InnoDB,
+PARTITION p202603 VALUES LESS THAN ('2026-04-01') ENGINE = InnoDB,
+PARTITION p202604 VALUES LESS THAN ('2026-05-01') ENGINE = InnoDB,
+PARTITION p202605 VALUES LESS THAN ('2026-06-01') ENGINE = InnoDB,
+PARTITION p202606 VALUES LESS THAN ('2026-07-01') ENGINE = InnoDB,
+PARTITION p202607 VALUES LESS THAN ('2026-08-01') ENGINE = InnoDB,
+PARTITION p202608 VALUES LESS THAN ('2026-09-01') ENGINE = InnoDB,
+PARTITION p202609 VALUES LESS THAN ('2026-10-01') ENGINE = InnoDB,
+PARTITION p202610 VALUES LESS THAN ('2026-11-01') ENGINE = InnoDB,
+PARTITION p202611 VALUES LESS THAN ('2026-12-01') ENGINE = InnoDB,
+PARTITION p202612 VALUES LESS THAN ('2027-01-01') ENGINE = InnoDB,
+PARTITION pmax VALUES LESS THAN (MAXVALUE) ENGINE = InnoDB) */;
+/*!40101 SET character_set_client = @saved_cs_client */;
+--
+-- Table structure for table `daily_stats`
+--
+
+DROP TABLE IF EXISTS `daily_stats`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `daily_stats` (
+  `day` date NOT NULL COMMENT 'UTC calendar day of the sales',
+  `total_volume` decimal(30,2) NOT NULL,
+  `transaction_count` int NOT NULL,
+  `min_price` decimal(20,2) NOT NULL,
+  `max_price` decimal(20,2) NOT NULL,
+  `max_price_token_id` int NOT NULL COMMENT 'Token of the highest sale of the day',
+  `open_price` decimal(20,2) DEFAULT NULL COMMENT 'Price of the first sale of the day',
+  `open_time` datetime DEFAULT NULL,
+  `close_price` decimal(20,2) DEFAULT NULL COMMENT 'Price of the last sale of the day',
+  `close_time` datetime DEFAULT NULL,
+  PRIMARY KEY (`day`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Table structure for table `daily_market_stats`
+--
+
+DROP TABLE IF EXISTS `daily_market_stats`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `daily_market_stats` (
+  `day` date NOT NULL COMMENT 'UTC calendar day of the sales',
+  `market_id` int NOT NULL,
+  `total_volume` decimal(30,2) NOT NULL,
+  `transaction_count` int NOT NULL,
+  `min_price` decimal(20,2) NOT NULL,
+  `max_price` decimal(20,2) NOT NULL,
+  `max_price_token_id` int NOT NULL COMMENT 'Token of the highest sale of the day on this market',
+  `open_price` decimal(20,2) DEFAULT NULL COMMENT 'Price of the first sale of the day on this market',
+  `open_time` datetime DEFAULT NULL,
+  `close_price` decimal(20,2) DEFAULT NULL COMMENT 'Price of the last sale of the day on this market',
+  `close_time` datetime DEFAULT NULL,
+  PRIMARY KEY (`day`,`market_id`),
+  KEY `market_id` (`market_id`),
+  CONSTRAINT `daily_market_stats_ibfk_1` FOREIGN KEY (`market_id`) REFERENCES `markets` (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+--
+-- Table structure for table `data_version`
+--
+
+DROP TABLE IF EXISTS `data_version`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `data_version` (
+  `id` tinyint NOT NULL DEFAULT '1',
+  `version` bigint NOT NULL COMMENT 'Bumped by the ETL after every committed load',
+  `updated_at` datetime NOT NULL,
+  `rebuild_generation` bigint NOT NULL DEFAULT '0' COMMENT 'Bumped by rebuild.py after rewriting existing rows',
+  PRIMARY KEY (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Table structure for table `nft_metadata`
+--
+
+DROP TABLE IF EXISTS `nft_metadata`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `nft_metadata` (
+  `token_id` int NOT NULL,
+  `image_url` varchar(512) DEFAULT NULL,
+  `rarity_rank` int DEFAULT NULL,
+  `fetched_at` datetime NOT NULL COMMENT 'When the metadata was fetched from Moralis',
+  PRIMARY KEY (`token_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Table structure for table `daily_address_stats`
+--
+
+DROP TABLE IF EXISTS `daily_address_stats`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `daily_address_stats` (
+  `role` varchar(6) NOT NULL COMMENT 'buyer or seller',
+  `day` date NOT NULL COMMENT 'UTC calendar day of the sales',
+  `address_id` int NOT NULL,
+  `total_volume` decimal(30,2) NOT NULL,
+  `transaction_count` int NOT NULL,
+  PRIMARY KEY (`role`,`day`,`address_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Table structure for table `leaderboard_windows`
+--
+
+DROP TABLE IF EXISTS `leaderboard_windows`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `leaderboard_windows` (
+  `interval_id` tinyint NOT NULL COMMENT '0 = last 7 days, 1 = last 30 days, 2 = last year',
+  `window_start` date NOT NULL COMMENT 'First UTC day currently counted in the leaderboards',
+  PRIMARY KEY (`interval_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Table structure for table `address_leaderboards`
+--
+
+DROP TABLE IF EXISTS `address_leaderboards`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `address_leaderboards` (
+  `role` varchar(6) NOT NULL COMMENT 'buyer or seller',
+  `interval_id` tinyint NOT NULL COMMENT '0 = last 7 days, 1 = last 30 days, 2 = last year, 3 = all time',
+  `address_id` int NOT NULL,
+  `total_volume` decimal(30,2) NOT NULL,
+  `transaction_count` int NOT NULL,
+  PRIMARY KEY (`role`,`interval_id`,`address_id`),
+  KEY `ranking` (`role`,`interval_id`,`total_volume`),
+  KEY `address_id` (`address_id`),
+  CONSTRAINT `address_leaderboards_ibfk_1` FOREIGN KEY (`address_id`) REFERENCES `addresses` (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Table structure for table `daily_top_resales`
+--
+
+DROP TABLE IF EXISTS `daily_top_resales`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `daily_top_resales` (
+  `transaction_id` int NOT NULL,
+  `day` date NOT NULL COMMENT 'UTC calendar day of the sale',
+  `token_id` int NOT NULL,
+  `seller_id` int NOT NULL,
+  `price_difference` decimal(20,2) NOT NULL,
+  PRIMARY KEY (`transaction_id`),
+  KEY `ranking` (`day`,`price_difference`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Table structure for table `resale_leaderboards`
+--
+
+DROP TABLE IF EXISTS `resale_leaderboards`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `resale_leaderboards` (
+  `interval_id` tinyint NOT NULL COMMENT '0 = last 7 days, 1 = last 30 days, 2 = last year, 3 = all time',
+  `transaction_id` int NOT NULL,
+  `token_id` int NOT NULL,
+  `seller_id` int NOT NULL,
+  `price_difference` decimal(20,2) NOT NULL,
+  PRIMARY KEY (`interval_id`,`transaction_id`),
+  KEY `ranking` (`interval_id`,`price_difference`),
+  KEY `seller_id` (`seller_id`),
+  CONSTRAINT `resale_leaderboards_ibfk_1` FOREIGN KEY (`seller_id`) REFERENCES `addresses` (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Table structure for table `token_summaries`
+--
+
+DROP TABLE IF EXISTS `token_summaries`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `token_summaries` (
+  `token_id` int NOT NULL,
+  `sale_count` int NOT NULL DEFAULT '0',
+  `total_volume` decimal(30,2) NOT NULL DEFAULT '0.00',
+  `max_price` decimal(20,2) DEFAULT NULL COMMENT 'All-time high sale price',
+  `max_price_time` datetime DEFAULT NULL COMMENT 'Time of the earliest sale at the all-time high',
+  `last_price` decimal(20,2) DEFAULT NULL,
+  `last_sale_time` datetime DEFAULT NULL,
+  `last_buyer_id` int DEFAULT NULL COMMENT 'Buyer of the last sale, i.e. the current holder',
+  PRIMARY KEY (`token_id`),
+  KEY `last_buyer_id` (`last_buyer_id`),
+  CONSTRAINT `token_summaries_ibfk_1` FOREIGN KEY (`last_buyer_id`) REFERENCES `addresses` (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Table structure for table `address_stats`
+--
+
+DROP TABLE IF EXISTS `address_stats`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `address_stats` (
+  `address_id` int NOT NULL,
+  `buy_count` int NOT NULL DEFAULT '0',
+  `buy_volume` decimal(30,2) NOT NULL DEFAULT '0.00',
+  `sell_count` int NOT NULL DEFAULT '0',
+  `sell_volume` decimal(30,2) NOT NULL DEFAULT '0.00',
+  `realized_pnl` decimal(30,2) NOT NULL DEFAULT '0.00' COMMENT 'Sum of price - previous_price over the sales made by this address',
+  PRIMARY KEY (`address_id`),
+  CONSTRAINT `address_stats_ibfk_1` FOREIGN KEY (`address_id`) REFERENCES `addresses` (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
 /*!40103 SET TIME_ZONE=@OLD_TIME_ZONE */;
 
 /*!40101 SET SQL_MODE=@OLD_SQL_MODE */;
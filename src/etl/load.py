@@ -1,3 +1,11 @@
+import pandas as pd
+from datetime import datetime, timedelta, timezone
+
+# 排行榜的區間（天數），對應 API 的 interval；None = 全部時間
+LEADERBOARD_INTERVALS = {0: 7, 1: 30, 2: 365, 3: None}
+LEADERBOARD_SIZE = 100
+TOKEN_COUNT = 10000
+
 class DataLoader:
     def __init__(self, db):
         self.db = db
@@ -44,18 +52,490 @@ class DataLoader:
         except Exception as e:
             print(f'Error inserting actions: {e}')
 
+    def ensure_transaction_partitions(self, months_ahead=2):
+        # 新的月份在資料進來前從 pmax 切出來；pmax 保持是空的，切分時不用搬資料
+        try:
+            partitions = self.db.fetch_all("""
+                SELECT PARTITION_NAME FROM information_schema.PARTITIONS
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'transactions' AND PARTITION_NAME IS NOT NULL
+                """)
+            existing = {name for (name,) in partitions}
+            if 'pmax' not in existing:
+                return
+
+            month = datetime.now(timezone.utc).date().replace(day=1)
+            for _ in range(months_ahead + 1):
+                next_month = (month + timedelta(days=32)).replace(day=1)
+                name = f'p{month:%Y%m}'
+                if name not in existing:
+                    self.db.execute(f"""
+                        ALTER TABLE transactions REORGANIZE PARTITION pmax INTO (
+                            PARTITION {name} VALUES LESS THAN ('{next_month:%Y-%m-%d}'),
+                            PARTITION pmax VALUES LESS THAN (MAXVALUE)
+                        )
+                        """)
+                    print(f'Partition {name} added to transactions.')
+                month = next_month
+        except Exception as e:
+            print(f'Error adding transaction partitions: {e}')
+
     def insert_transactions(self, transactions_df):
+        # 回傳是否整批寫入；失敗時整批退回（executemany 可能已經寫了前幾段），衍生表就不能再更新
         try:
             sql = """
-            INSERT INTO transactions (transaction_hash, time, price, token_id, market_id, action_id, buyer_id)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            INSERT INTO transactions (transaction_hash, time, price, token_id, market_id, action_id, buyer_id, seller_id, previous_price)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
             """
             params = list(transactions_df.itertuples(index=False, name=None))
-            self.db.executemany(sql, params)
-            self.db.commit()
+            if self.db.executemany(sql, params) is None or not self.db.commit():
+                self.db.rollback()
+                print(f'Error inserting transactions: none of the {len(params)} rows were kept.')
+                return False
             print(f'{len(params)} transactions inserted successfully.')
+            return True
         except Exception as e:
+            self.db.rollback()
             print(f'Error inserting transactions: {e}')
+            return False
+
+    def transactions_since(self, since_transaction_id):
+        # 衍生表的增量一律從 transactions 裡實際寫入的資料算，不用記憶體中的 DataFrame
+        rows = self.db.fetch_all("""
+            SELECT transaction_id, time, price, token_id, market_id, buyer_id
+            FROM transactions
+            WHERE transaction_id > %s
+            ORDER BY time, transaction_id
+            """, (since_transaction_id,))
+        df = pd.DataFrame(list(rows), columns=['transaction_id', 'time', 'Price', 'Token ID', 'market_id', 'buyer_id'])
+        df['time'] = pd.to_datetime(df['time'])
+        df['Price'] = df['Price'].astype(float)
+        return df
+
+    def update_daily_rollups(self, since_transaction_id):
+        # 這批新交易（transaction_id > since_transaction_id）併進每日 rollup
+        try:
+            df = self.transactions_since(since_transaction_id)
+            if df.empty:
+                print('No new transactions for the daily rollups.')
+                return
+            df['day'] = df['time'].dt.date
+
+            daily_params = self.__aggregate_by_day(df, ['day'])
+            self.db.executemany(self.__rollup_upsert_sql('daily_stats', ['day']), daily_params)
+
+            market_params = self.__aggregate_by_day(df, ['day', 'market_id'])
+            self.db.executemany(self.__rollup_upsert_sql('daily_market_stats', ['day', 'market_id']), market_params)
+
+            self.db.commit()
+            print(f'{len(daily_params)} daily rollups and {len(market_params)} daily market rollups updated successfully.')
+        except Exception as e:
+            print(f'Error updating daily rollups: {e}')
+
+    def rebuild_daily_rollups(self):
+        try:
+            self.db.execute("DELETE FROM daily_market_stats")
+            self.db.execute("DELETE FROM daily_stats")
+            self.db.execute(self.__rollup_rebuild_sql('daily_stats', ['day']))
+            self.db.execute(self.__rollup_rebuild_sql('daily_market_stats', ['day', 'market_id']))
+            self.db.commit()
+            print('Daily rollups rebuilt successfully.')
+        except Exception as e:
+            print(f'Error rebuilding daily rollups: {e}')
+
+    def backfill_previous_sales(self):
+        try:
+            sql = """
+            UPDATE transactions t
+            JOIN (
+                SELECT transaction_id,
+                    LAG(buyer_id) OVER w AS seller_id,
+                    LAG(price) OVER w AS previous_price
+                FROM transactions
+                WINDOW w AS (PARTITION BY token_id ORDER BY time, transaction_id)
+            ) prev ON prev.transaction_id = t.transaction_id
+            SET t.seller_id = prev.seller_id, t.previous_price = prev.previous_price
+            """
+            cursor = self.db.execute(sql)
+            self.db.commit()
+            print(f'{cursor.rowcount if cursor else 0} transactions backfilled with seller and previous price.')
+        except Exception as e:
+            print(f'Error backfilling previous sales: {e}')
+
+    def update_token_summaries(self, since_transaction_id):
+        # 只更新這批新交易（transaction_id > since_transaction_id）有出現的 token；
+        # max/last 的比較規則和 rebuild 一致（同價取較早、同時間取較晚，已依 time, transaction_id 排序）
+        try:
+            df = self.transactions_since(since_transaction_id)
+            if df.empty:
+                print('No new transactions for the token summaries.')
+                return
+
+            grouped = df.groupby('Token ID')
+            stats = grouped['Price'].agg(['count', 'sum', 'max'])
+            highest = df.loc[grouped['Price'].idxmax()].set_index('Token ID')
+            last = grouped.tail(1).set_index('Token ID')
+            params = [
+                (
+                    int(token_id), int(row['count']), round(row['sum'], 2),
+                    row['max'], highest.at[token_id, 'time'].to_pydatetime(),
+                    last.at[token_id, 'Price'], last.at[token_id, 'time'].to_pydatetime(),
+                    None if pd.isna(last.at[token_id, 'buyer_id']) else int(last.at[token_id, 'buyer_id'])
+                )
+                for token_id, row in stats.iterrows()
+            ]
+
+            # max_price_time、last_price、last_buyer_id 必須在 max_price、last_sale_time 之前更新，才能和舊值比較
+            sql = """
+            INSERT INTO token_summaries (token_id, sale_count, total_volume, max_price, max_price_time, last_price, last_sale_time, last_buyer_id)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s) AS new
+            ON DUPLICATE KEY UPDATE
+                max_price_time = IF(token_summaries.max_price IS NULL OR new.max_price > token_summaries.max_price, new.max_price_time, token_summaries.max_price_time),
+                last_price = IF(token_summaries.last_sale_time IS NULL OR new.last_sale_time >= token_summaries.last_sale_time, new.last_price, token_summaries.last_price),
+                last_buyer_id = IF(token_summaries.last_sale_time IS NULL OR new.last_sale_time >= token_summaries.last_sale_time, new.last_buyer_id, token_summaries.last_buyer_id),
+                sale_count = token_summaries.sale_count + new.sale_count,
+                total_volume = token_summaries.total_volume + new.total_volume,
+                max_price = GREATEST(COALESCE(token_summaries.max_price, new.max_price), new.max_price),
+                last_sale_time = GREATEST(COALESCE(token_summaries.last_sale_time, new.last_sale_time), new.last_sale_time)
+            """
+            self.db.executemany(sql, params)
+            self.db.commit()
+            print(f'{len(params)} token summaries updated successfully.')
+        except Exception as e:
+            print(f'Error updating token summaries: {e}')
+
+    def rebuild_token_summaries(self):
+        try:
+            # 每個 token 都有一列，沒有成交過的就是 0 筆
+            self.db.executemany("INSERT IGNORE INTO token_summaries (token_id) VALUES (%s)", [(token_id,) for token_id in range(TOKEN_COUNT)])
+            self.db.execute("""
+            UPDATE token_summaries s
+            LEFT JOIN (
+                SELECT token_id,
+                    COUNT(*) OVER w AS sale_count,
+                    SUM(price) OVER w AS total_volume,
+                    FIRST_VALUE(price) OVER (PARTITION BY token_id ORDER BY price DESC, time, transaction_id) AS max_price,
+                    FIRST_VALUE(time) OVER (PARTITION BY token_id ORDER BY price DESC, time, transaction_id) AS max_price_time,
+                    price AS last_price,
+                    time AS last_sale_time,
+                    buyer_id AS last_buyer_id,
+                    ROW_NUMBER() OVER (PARTITION BY token_id ORDER BY time DESC, transaction_id DESC) AS rn
+                FROM transactions
+                WINDOW w AS (PARTITION BY token_id)
+            ) t ON t.token_id = s.token_id AND t.rn = 1
+            SET s.sale_count = COALESCE(t.sale_count, 0),
+                s.total_volume = COALESCE(t.total_volume, 0),
+                s.max_price = t.max_price,
+                s.max_price_time = t.max_price_time,
+                s.last_price = t.last_price,
+                s.last_sale_time = t.last_sale_time,
+                s.last_buyer_id = t.last_buyer_id
+            """)
+            self.db.commit()
+            print('Token summaries rebuilt successfully.')
+        except Exception as e:
+            print(f'Error rebuilding token summaries: {e}')
+
+    def update_address_stats(self, since_transaction_id):
+        # 這批新交易（transaction_id > since_transaction_id）的買方、賣方增量
+        try:
+            self.__merge_address_stats(since_transaction_id)
+            self.db.commit()
+            print('Address stats updated successfully.')
+        except Exception as e:
+            print(f'Error updating address stats: {e}')
+
+    def rebuild_address_stats(self):
+        try:
+            self.db.execute("DELETE FROM address_stats")
+            self.__merge_address_stats(0)
+            self.db.commit()
+            print('Address stats rebuilt successfully.')
+        except Exception as e:
+            print(f'Error rebuilding address stats: {e}')
+
+    def __merge_address_stats(self, since_transaction_id):
+        self.db.execute("""
+            INSERT INTO address_stats (address_id, buy_count, buy_volume)
+            SELECT * FROM (
+                SELECT buyer_id AS address_id, COUNT(*) AS buy_count, SUM(price) AS buy_volume
+                FROM transactions
+                WHERE transaction_id > %s AND buyer_id IS NOT NULL
+                GROUP BY buyer_id
+            ) AS new
+            ON DUPLICATE KEY UPDATE
+                buy_count = address_stats.buy_count + new.buy_count,
+                buy_volume = address_stats.buy_volume + new.buy_volume
+            """, (since_transaction_id,))
+        # 賣方的已實現損益 = 賣價 - 他當初買進的價格（上一筆成交價）
+        self.db.execute("""
+            INSERT INTO address_stats (address_id, sell_count, sell_volume, realized_pnl)
+            SELECT * FROM (
+                SELECT seller_id AS address_id, COUNT(*) AS sell_count, SUM(price) AS sell_volume,
+                    COALESCE(SUM(price - previous_price), 0) AS realized_pnl
+                FROM transactions
+                WHERE transaction_id > %s AND seller_id IS NOT NULL
+                GROUP BY seller_id
+            ) AS new
+            ON DUPLICATE KEY UPDATE
+                sell_count = address_stats.sell_count + new.sell_count,
+                sell_volume = address_stats.sell_volume + new.sell_volume,
+                realized_pnl = address_stats.realized_pnl + new.realized_pnl
+            """, (since_transaction_id,))
+
+    def latest_transaction_id(self):
+        row = self.db.fetch_one("SELECT COALESCE(MAX(transaction_id), 0) FROM transactions")
+        return row[0] if row else 0
+
+    def update_leaderboards(self, since_transaction_id):
+        # 先把滑出區間的日子扣掉，再把這批新交易（transaction_id > since_transaction_id）加進去
+        try:
+            today = datetime.now(timezone.utc).date()
+            windows = dict(self.db.fetch_all("SELECT interval_id, window_start FROM leaderboard_windows"))
+
+            for interval_id, days in LEADERBOARD_INTERVALS.items():
+                if days is not None:
+                    self.__advance_window(interval_id, windows.get(interval_id), today - timedelta(days=days))
+
+            for role in ('buyer', 'seller'):
+                self.db.execute(f"""
+                    INSERT INTO daily_address_stats (role, day, address_id, total_volume, transaction_count)
+                    SELECT * FROM ({self.__address_totals_sql(role, 'DATE(time)')}) AS new
+                    ON DUPLICATE KEY UPDATE
+                        total_volume = daily_address_stats.total_volume + new.total_volume,
+                        transaction_count = daily_address_stats.transaction_count + new.transaction_count
+                    """, (since_transaction_id,))
+
+                for interval_id, days in LEADERBOARD_INTERVALS.items():
+                    window_start = today - timedelta(days=days) if days is not None else None
+                    self.db.execute(f"""
+                        INSERT INTO address_leaderboards (role, interval_id, address_id, total_volume, transaction_count)
+                        SELECT * FROM ({self.__address_totals_sql(role, str(interval_id), window_start)}) AS new
+                        ON DUPLICATE KEY UPDATE
+                            total_volume = address_leaderboards.total_volume + new.total_volume,
+                            transaction_count = address_leaderboards.transaction_count + new.transaction_count
+                        """, (since_transaction_id,) + ((window_start,) if window_start else ()))
+
+            self.db.execute("""
+                INSERT INTO daily_top_resales (transaction_id, day, token_id, seller_id, price_difference)
+                SELECT transaction_id, DATE(time), token_id, seller_id, price - previous_price
+                FROM transactions
+                WHERE transaction_id > %s AND previous_price IS NOT NULL AND seller_id IS NOT NULL
+                """, (since_transaction_id,))
+            self.db.execute("""
+                DELETE d FROM daily_top_resales d
+                JOIN (
+                    SELECT transaction_id,
+                        ROW_NUMBER() OVER (PARTITION BY day ORDER BY price_difference DESC, transaction_id) AS rn
+                    FROM daily_top_resales
+                    WHERE day >= (SELECT COALESCE(MIN(DATE(time)), CURDATE()) FROM transactions WHERE transaction_id > %s)
+                ) ranked ON ranked.transaction_id = d.transaction_id
+                WHERE ranked.rn > %s
+                """, (since_transaction_id, LEADERBOARD_SIZE))
+
+            for interval_id, days in LEADERBOARD_INTERVALS.items():
+                if days is not None:
+                    self.__refill_resale_leaderboard(interval_id, today - timedelta(days=days))
+                else:
+                    self.__merge_resale_leaderboard(interval_id, since_transaction_id)
+
+            self.db.commit()
+            print(f'Leaderboards updated successfully with transactions after {since_transaction_id}.')
+        except Exception as e:
+            print(f'Error updating leaderboards: {e}')
+
+    def rebuild_leaderboards(self):
+        try:
+            today = datetime.now(timezone.utc).date()
+            for table in ('resale_leaderboards', 'daily_top_resales', 'address_leaderboards', 'leaderboard_windows', 'daily_address_stats'):
+                self.db.execute(f"DELETE FROM {table}")
+
+            for role in ('buyer', 'seller'):
+                self.db.execute(f"""
+                    INSERT INTO daily_address_stats (role, day, address_id, total_volume, transaction_count)
+                    {self.__address_totals_sql(role, 'DATE(time)')}
+                    """, (0,))
+
+            self.db.execute("""
+                INSERT INTO daily_top_resales (transaction_id, day, token_id, seller_id, price_difference)
+                SELECT transaction_id, day, token_id, seller_id, price_difference
+                FROM (
+                    SELECT transaction_id, DATE(time) AS day, token_id, seller_id, price - previous_price AS price_difference,
+                        ROW_NUMBER() OVER (PARTITION BY DATE(time) ORDER BY price - previous_price DESC, transaction_id) AS rn
+                    FROM transactions
+                    WHERE previous_price IS NOT NULL AND seller_id IS NOT NULL
+                ) ranked
+                WHERE rn <= %s
+                """, (LEADERBOARD_SIZE,))
+
+            for interval_id, days in LEADERBOARD_INTERVALS.items():
+                window_start = today - timedelta(days=days) if days is not None else None
+                if window_start:
+                    self.__advance_window(interval_id, None, window_start)
+                else:
+                    self.__rebuild_address_leaderboard(interval_id, None)
+                self.__refill_resale_leaderboard(interval_id, window_start)
+
+            self.db.commit()
+            print('Leaderboards rebuilt successfully.')
+        except Exception as e:
+            print(f'Error rebuilding leaderboards: {e}')
+
+    def __address_totals_sql(self, role, group_column, window_start=None):
+        # role 對應 transactions 的欄位：買家 buyer_id，賣家 seller_id
+        address_column = 'buyer_id' if role == 'buyer' else 'seller_id'
+        conditions = ['transaction_id > %s', f'{address_column} IS NOT NULL']
+        if window_start:
+            conditions.append('time >= %s')
+        return f"""
+            SELECT '{role}' AS role, {group_column} AS bucket, {address_column} AS address_id,
+                SUM(price) AS total_volume, COUNT(*) AS transaction_count
+            FROM transactions
+            WHERE {' AND '.join(conditions)}
+            GROUP BY bucket, {address_column}
+            """
+
+    def __advance_window(self, interval_id, window_start, new_window_start):
+        if window_start is None or window_start > new_window_start:
+            self.__rebuild_address_leaderboard(interval_id, new_window_start)
+        elif window_start < new_window_start:
+            self.db.execute("""
+                UPDATE address_leaderboards l
+                JOIN (
+                    SELECT role, address_id, SUM(total_volume) AS total_volume, SUM(transaction_count) AS transaction_count
+                    FROM daily_address_stats
+                    WHERE day >= %s AND day < %s
+                    GROUP BY role, address_id
+                ) expired ON expired.role = l.role AND expired.address_id = l.address_id
+                SET l.total_volume = l.total_volume - expired.total_volume,
+                    l.transaction_count = l.transaction_count - expired.transaction_count
+                WHERE l.interval_id = %s
+                """, (window_start, new_window_start, interval_id))
+            self.db.execute("DELETE FROM address_leaderboards WHERE interval_id = %s AND transaction_count <= 0", (interval_id,))
+
+        self.db.execute("""
+            INSERT INTO leaderboard_windows (interval_id, window_start) VALUES (%s, %s) AS new
+            ON DUPLICATE KEY UPDATE window_start = new.window_start
+            """, (interval_id, new_window_start))
+
+    def __rebuild_address_leaderboard(self, interval_id, window_start):
+        self.db.execute("DELETE FROM address_leaderboards WHERE interval_id = %s", (interval_id,))
+        self.db.execute(f"""
+            INSERT INTO address_leaderboards (role, interval_id, address_id, total_volume, transaction_count)
+            SELECT role, %s, address_id, SUM(total_volume), SUM(transaction_count)
+            FROM daily_address_stats
+            {'WHERE day >= %s' if window_start else ''}
+            GROUP BY role, address_id
+            """, (interval_id,) + ((window_start,) if window_start else ()))
+
+    def __refill_resale_leaderboard(self, interval_id, window_start):
+        # 每天只留前 LEADERBOARD_SIZE 名，所以區間內的前幾名一定在 daily_top_resales 裡
+        self.db.execute("DELETE FROM resale_leaderboards WHERE interval_id = %s", (interval_id,))
+        self.db.execute(f"""
+            INSERT INTO resale_leaderboards (interval_id, transaction_id, token_id, seller_id, price_difference)
+            SELECT %s, transaction_id, token_id, seller_id, price_difference
+            FROM daily_top_resales
+            {'WHERE day >= %s' if window_start else ''}
+            ORDER BY price_difference DESC, transaction_id
+            LIMIT %s
+            """, (interval_id,) + ((window_start,) if window_start else ()) + (LEADERBOARD_SIZE,))
+
+    def __merge_resale_leaderboard(self, interval_id, since_transaction_id):
+        self.db.execute("""
+            INSERT IGNORE INTO resale_leaderboards (interval_id, transaction_id, token_id, seller_id, price_difference)
+            SELECT %s, transaction_id, token_id, seller_id, price - previous_price
+            FROM transactions
+            WHERE transaction_id > %s AND previous_price IS NOT NULL AND seller_id IS NOT NULL
+            ORDER BY price - previous_price DESC, transaction_id
+            LIMIT %s
+            """, (interval_id, since_transaction_id, LEADERBOARD_SIZE))
+        self.db.execute("""
+            DELETE r FROM resale_leaderboards r
+            JOIN (
+                SELECT transaction_id,
+                    ROW_NUMBER() OVER (ORDER BY price_difference DESC, transaction_id) AS rn
+                FROM resale_leaderboards
+                WHERE interval_id = %s
+            ) ranked ON ranked.transaction_id = r.transaction_id
+            WHERE r.interval_id = %s AND ranked.rn > %s
+            """, (interval_id, interval_id, LEADERBOARD_SIZE))
+
+    def bump_data_version(self, rebuild=False):
+        # rebuild=True 表示舊的列被改寫過（rebuild.py），API 的記憶體副本要整個重載，不能只接新的 transaction_id
+        rebuild_generation = ', rebuild_generation = rebuild_generation + 1' if rebuild else ''
+        try:
+            sql = f"""
+            INSERT INTO data_version (id, version, updated_at)
+            VALUES (1, 1, UTC_TIMESTAMP())
+            ON DUPLICATE KEY UPDATE version = version + 1, updated_at = UTC_TIMESTAMP(){rebuild_generation}
+            """
+            self.db.execute(sql)
+            self.db.commit()
+            print('Data version bumped successfully.')
+        except Exception as e:
+            print(f'Error bumping data version: {e}')
+
+    def __aggregate_by_day(self, df, keys):
+        # 依時間排序（同時間保留原本順序），first/last 才是當天第一筆和最後一筆
+        df = df.sort_values('time', kind='stable')
+        grouped = df.groupby(keys)['Price']
+        stats = grouped.agg(['sum', 'count', 'min', 'max', 'first', 'last'])
+        # 當天最高價的 token（argmax）
+        stats['max_price_token_id'] = df.loc[grouped.idxmax(), keys + ['Token ID']].set_index(keys)['Token ID']
+        times = df.groupby(keys)['time'].agg(['first', 'last'])
+        stats['open_time'], stats['close_time'] = times['first'], times['last']
+        stats = stats.reset_index()
+        return [
+            tuple(row[key] for key in keys) + (
+                round(row['sum'], 2), int(row['count']), row['min'], row['max'], int(row['max_price_token_id']),
+                row['first'], row['open_time'].to_pydatetime(), row['last'], row['close_time'].to_pydatetime()
+            )
+            for _, row in stats.iterrows()
+        ]
+
+    def __rollup_upsert_sql(self, table, keys):
+        # max_price_token_id、open_price、close_price 必須在 max_price、open_time、close_time 之前更新，才能和舊值比較
+        columns = keys + [
+            'total_volume', 'transaction_count', 'min_price', 'max_price', 'max_price_token_id',
+            'open_price', 'open_time', 'close_price', 'close_time'
+        ]
+        return f"""
+            INSERT INTO {table} ({', '.join(columns)})
+            VALUES ({', '.join(['%s'] * len(columns))}) AS new
+            ON DUPLICATE KEY UPDATE
+                max_price_token_id = IF(new.max_price > {table}.max_price, new.max_price_token_id, {table}.max_price_token_id),
+                open_price = IF({table}.open_time IS NULL OR new.open_time < {table}.open_time, new.open_price, {table}.open_price),
+                close_price = IF({table}.close_time IS NULL OR new.close_time >= {table}.close_time, new.close_price, {table}.close_price),
+                total_volume = {table}.total_volume + new.total_volume,
+                transaction_count = {table}.transaction_count + new.transaction_count,
+                min_price = LEAST({table}.min_price, new.min_price),
+                max_price = GREATEST({table}.max_price, new.max_price),
+                open_time = IF({table}.open_time IS NULL OR new.open_time < {table}.open_time, new.open_time, {table}.open_time),
+                close_time = IF({table}.close_time IS NULL OR new.close_time >= {table}.close_time, new.close_time, {table}.close_time)
+            """
+
+    def __rollup_rebuild_sql(self, table, keys):
+        partition = ', '.join('DATE(time)' if key == 'day' else key for key in keys)
+        return f"""
+            INSERT INTO {table} ({', '.join(keys)}, total_volume, transaction_count, min_price, max_price, max_price_token_id,
+                open_price, open_time, close_price, close_time)
+            SELECT {', '.join(keys)}, total_volume, transaction_count, min_price, max_price, token_id,
+                open_price, open_time, close_price, close_time
+            FROM (
+                SELECT DATE(time) AS day, market_id, token_id,
+                    SUM(price) OVER w AS total_volume,
+                    COUNT(*) OVER w AS transaction_count,
+                    MIN(price) OVER w AS min_price,
+                    MAX(price) OVER w AS max_price,
+                    FIRST_VALUE(price) OVER (PARTITION BY {partition} ORDER BY time, transaction_id) AS open_price,
+                    MIN(time) OVER w AS open_time,
+                    FIRST_VALUE(price) OVER (PARTITION BY {partition} ORDER BY time DESC, transaction_id DESC) AS close_price,
+                    MAX(time) OVER w AS close_time,
+                    ROW_NUMBER() OVER (PARTITION BY {partition} ORDER BY price DESC, transaction_id) AS rn
+                FROM transactions
+                WINDOW w AS (PARTITION BY {partition})
+            ) ranked
+            WHERE rn = 1
+            """
 
     def close_connection(self):
         self.db.close()
\ No newline at end of file
@@ -0,0 +1,86 @@
+import argparse, os, sys
+from db.manager import DataBaseManager
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'db', 'migrations')
+
+def list_migrations():
+    return sorted(name for name in os.listdir(MIGRATIONS_DIR) if name.endswith('.sql'))
+
+def split_statements(sql):
+    # 去掉 -- 註解後以分號切開；migration 的字串裡不要放分號
+    lines = [line for line in sql.splitlines() if not line.lstrip().startswith('--')]
+    return [statement.strip() for statement in '\n'.join(lines).split(';') if statement.strip()]
+
+class MigrationRunner:
+    """Apply the numbered SQL files in db/migrations that this database has not run yet.
+
+    Applied files are recorded in `schema_migrations`. MySQL commits DDL
+    statement by statement, so a file that fails halfway is not recorded and
+    has to be finished by hand before running again.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version varchar(255) NOT NULL,
+                applied_at datetime NOT NULL,
+                PRIMARY KEY (version)
+            )
+            """)
+        self.db.commit()
+
+    def applied(self):
+        return {version for (version,) in self.db.fetch_all("SELECT version FROM schema_migrations")}
+
+    def pending(self):
+        applied = self.applied()
+        return [name for name in list_migrations() if name not in applied]
+
+    def record(self, name):
+        self.db.execute("INSERT INTO schema_migrations (version, applied_at) VALUES (%s, UTC_TIMESTAMP())", (name,))
+        self.db.commit()
+
+    def apply(self, name):
+        with open(os.path.join(MIGRATIONS_DIR, name)) as f:
+            statements = split_statements(f.read())
+        for statement in statements:
+            if self.db.execute(statement) is None:
+                print(f'Migration {name} failed; it was not recorded.')
+                return False
+        self.record(name)
+        print(f'Migration {name} applied.')
+        return True
+
+    def migrate(self):
+        pending = self.pending()
+        if not pending:
+            print('Schema is up to date.')
+        return all(self.apply(name) for name in pending)
+
+    def baseline(self, upto):
+        # 已經用 models.sql 建好、或手動跑過 migration 的資料庫，只記錄不執行
+        for name in self.pending():
+            if name[:len(upto)] <= upto:
+                self.record(name)
+                print(f'Migration {name} marked as applied.')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Apply pending schema migrations from db/migrations.')
+    parser.add_argument('--status', action='store_true', help='List applied and pending migrations without running anything.')
+    parser.add_argument('--baseline', metavar='VERSION', help='Mark migrations up to VERSION (e.g. 0009) as applied without running them.')
+    args = parser.parse_args()
+
+    db = DataBaseManager()
+    runner = MigrationRunner(db)
+    try:
+        if args.status:
+            applied = runner.applied()
+            for name in list_migrations():
+                print(f"{'applied' if name in applied else 'pending'}  {name}")
+        elif args.baseline:
+            runner.baseline(args.baseline)
+        elif not runner.migrate():
+            sys.exit(1)
+    finally:
+        db.close()
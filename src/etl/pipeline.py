@@ -5,6 +5,7 @@ from db.manager import DataBaseManager
 from extract import DataExtractor
 from transform import DataTransformer
 from load import DataLoader
+from snapshot import SnapshotPublisher
 
 class Pipeline:
     def __init__(self):
@@ -14,6 +15,7 @@ class Pipeline:
         self.crawler = DataExtractor(base_url=os.getenv('CRAW_PAGE'))
         self.transformer = DataTransformer(db=self.db)
         self.loader = DataLoader(db=self.db)
+        self.publisher = SnapshotPublisher(db=self.db)
     
     def run(self):
         # 取得最後一筆資料的時間
@@ -26,6 +28,10 @@ class Pipeline:
 
         if not new_data_saved:
             print("No new data crawled. Exit pipeline.")
+            # 沒有新資料也要讓排行榜的區間往前移
+            self.loader.update_leaderboards(since_transaction_id=self.loader.latest_transaction_id())
+            self.loader.bump_data_version()
+            self.publisher.publish()
             self.loader.close_connection()
             return
         
@@ -50,6 +56,25 @@ class Pipeline:
         self.transformer.create_buyers_mapping()
 
         normalize_transactions = self.transformer.normalize_transactions(df=cleaned_data)
-        self.loader.insert_transactions(transactions_df=normalize_transactions)
+        try:
+            normalize_transactions = self.transformer.attach_previous_sales(df=normalize_transactions)
+        except Exception as e:
+            # 沒有上一筆成交就不寫入，下次執行會重新抓這批
+            print(f"Error attaching previous sales: {e}. Exit pipeline.")
+            self.loader.close_connection()
+            return
+        last_transaction_id = self.loader.latest_transaction_id()
+        self.loader.ensure_transaction_partitions()
+        if not self.loader.insert_transactions(transactions_df=normalize_transactions):
+            # 資料沒寫進去就不動衍生表和資料版本，下次執行會重新抓這批
+            print("Transactions were not loaded. Exit pipeline.")
+            self.loader.close_connection()
+            return
+        self.loader.update_daily_rollups(since_transaction_id=last_transaction_id)
+        self.loader.update_token_summaries(since_transaction_id=last_transaction_id)
+        self.loader.update_leaderboards(since_transaction_id=last_transaction_id)
+        self.loader.update_address_stats(since_transaction_id=last_transaction_id)
+        self.loader.bump_data_version()
+        self.publisher.publish()
 
         self.loader.close_connection()
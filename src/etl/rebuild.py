@@ -0,0 +1,33 @@
+import argparse
+from db.manager import DataBaseManager
+from load import DataLoader
+from snapshot import SnapshotPublisher
+
+TARGETS = ['rollups', 'sellers', 'leaderboards', 'tokens', 'addresses']
+
+def rebuild(target, loader):
+    if target == 'rollups':
+        loader.rebuild_daily_rollups()
+    elif target == 'sellers':
+        loader.backfill_previous_sales()
+    elif target == 'leaderboards':
+        loader.rebuild_leaderboards()
+    elif target == 'tokens':
+        loader.rebuild_token_summaries()
+    elif target == 'addresses':
+        loader.rebuild_address_stats()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Rebuild tables derived from transactions from scratch.')
+    parser.add_argument('targets', nargs='+', choices=TARGETS, help='Derived tables to rebuild.')
+    args = parser.parse_args()
+
+    db = DataBaseManager()
+    loader = DataLoader(db=db)
+    try:
+        for target in args.targets:
+            rebuild(target, loader)
+        loader.bump_data_version(rebuild=True)
+        SnapshotPublisher(db=db).publish()
+    finally:
+        loader.close_connection()
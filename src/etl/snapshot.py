@@ -0,0 +1,133 @@
+import os, json, struct
+import numpy as np
+from datetime import timezone
+from load import LEADERBOARD_INTERVALS, LEADERBOARD_SIZE
+
+# 快照檔格式（little-endian），API 端的 src/api/snapshot.py 讀同一個格式：
+#   header: magic, data version, updated_at (epoch seconds), section 數
+#   index:  每個 section 的名稱、offset、長度
+#   sections: 每小時統計（numpy structured array）與排行榜（JSON），各自對齊 8 bytes
+MAGIC = b'APESNAP1'
+HEADER = struct.Struct('<8sQqI')
+INDEX_ENTRY = struct.Struct('<32sQQ')
+SECTION_ALIGNMENT = 8
+
+# 價格一律存成整數 cents，加總才會和 DECIMAL 一樣精確
+HOURLY_STATS_DTYPE = np.dtype([
+    ('hour', '<i8'), ('total_volume', '<i8'), ('transaction_count', '<i8'),
+    ('max_price', '<i8'), ('max_price_token_id', '<i8'),
+])
+HOURLY_MARKET_STATS_DTYPE = np.dtype([
+    ('hour', '<i8'), ('market_id', '<i8'), ('total_volume', '<i8'), ('transaction_count', '<i8'),
+])
+
+HOUR_SQL = "TIMESTAMPDIFF(HOUR, '1970-01-01', time)"
+
+def to_cents(value):
+    return int(value * 100)
+
+class SnapshotPublisher:
+    def __init__(self, db, path=None):
+        self.db = db
+        self.path = path or os.getenv('SNAPSHOT_PATH')
+
+    def publish(self):
+        # 寫到暫存檔再 os.replace，API worker 只會看到舊檔或完整的新檔
+        if not self.path:
+            return
+        try:
+            version, updated_at = self.db.fetch_one("SELECT version, updated_at FROM data_version WHERE id = 1")
+            sections = {
+                'hourly_stats': self.__hourly_stats(),
+                'hourly_market_stats': self.__hourly_market_stats(),
+                'markets': self.__json({market_id: name for market_id, name in self.db.fetch_all("SELECT id, name FROM markets")}),
+            }
+            for interval_id in LEADERBOARD_INTERVALS:
+                sections[f'top_buyers/{interval_id}'] = self.__json(self.__top_addresses('buyer', interval_id))
+                sections[f'top_sellers/{interval_id}'] = self.__json(self.__top_addresses('seller', interval_id))
+                sections[f'top_resales/{interval_id}'] = self.__json(self.__top_resales(interval_id))
+
+            temp_path = f'{self.path}.tmp-{os.getpid()}'
+            with open(temp_path, 'wb') as f:
+                f.write(self.__encode(version, updated_at, sections))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+            print(f'Snapshot version {version} published to {self.path}.')
+        except Exception as e:
+            print(f'Error publishing snapshot: {e}')
+
+    def __hourly_stats(self):
+        # 同價時取 transaction_id 小的，和 daily rollup 的規則一致
+        rows = self.db.fetch_all(f"""
+            SELECT hour, total_volume, transaction_count, price, token_id
+            FROM (
+                SELECT {HOUR_SQL} AS hour, price, token_id,
+                    SUM(price) OVER w AS total_volume,
+                    COUNT(*) OVER w AS transaction_count,
+                    ROW_NUMBER() OVER (PARTITION BY {HOUR_SQL} ORDER BY price DESC, transaction_id) AS rn
+                FROM transactions
+                WINDOW w AS (PARTITION BY {HOUR_SQL})
+            ) ranked
+            WHERE rn = 1
+            ORDER BY hour
+            """)
+        return np.array(
+            [(hour, to_cents(volume), count, to_cents(price), token_id) for hour, volume, count, price, token_id in rows],
+            dtype=HOURLY_STATS_DTYPE
+        ).tobytes()
+
+    def __hourly_market_stats(self):
+        rows = self.db.fetch_all(f"""
+            SELECT {HOUR_SQL} AS hour, market_id, SUM(price), COUNT(*)
+            FROM transactions
+            WHERE market_id IS NOT NULL
+            GROUP BY hour, market_id
+            ORDER BY hour, market_id
+            """)
+        return np.array(
+            [(hour, market_id, to_cents(volume), count) for hour, market_id, volume, count in rows],
+            dtype=HOURLY_MARKET_STATS_DTYPE
+        ).tobytes()
+
+    def __top_addresses(self, role, interval_id):
+        return [
+            [address, str(total_volume), transaction_count]
+            for address, total_volume, transaction_count in self.db.fetch_all("""
+                SELECT a.address, l.total_volume, l.transaction_count
+                FROM address_leaderboards l
+                JOIN addresses a ON a.id = l.address_id
+                WHERE l.role = %s AND l.interval_id = %s
+                ORDER BY l.total_volume DESC, l.address_id DESC
+                LIMIT %s
+                """, (role, interval_id, LEADERBOARD_SIZE))
+        ]
+
+    def __top_resales(self, interval_id):
+        return [
+            [token_id, str(price_difference), seller]
+            for token_id, price_difference, seller in self.db.fetch_all("""
+                SELECT r.token_id, r.price_difference, a.address
+                FROM resale_leaderboards r
+                JOIN addresses a ON a.id = r.seller_id
+                WHERE r.interval_id = %s
+                ORDER BY r.price_difference DESC, r.transaction_id
+                LIMIT %s
+                """, (interval_id, LEADERBOARD_SIZE))
+        ]
+
+    def __json(self, value):
+        return json.dumps(value, separators=(',', ':')).encode()
+
+    def __encode(self, version, updated_at, sections):
+        offset = HEADER.size + INDEX_ENTRY.size * len(sections)
+        index, body = [], []
+        for name, payload in sections.items():
+            padding = -offset % SECTION_ALIGNMENT
+            body.append(b'\0' * padding + payload)
+            offset += padding
+            index.append(INDEX_ENTRY.pack(name.encode(), offset, len(payload)))
+            offset += len(payload)
+
+        updated_at = int(updated_at.replace(tzinfo=timezone.utc).timestamp()) if updated_at else 0
+        return HEADER.pack(MAGIC, version, updated_at, len(sections)) + b''.join(index) + b''.join(body)
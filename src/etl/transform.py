@@ -97,6 +97,44 @@ class DataTransformer:
         df.drop(columns=['Buyer'], inplace=True)
         return df
     
+    def attach_previous_sales(self, df):
+        # 每筆交易的賣家 = 同一個 token 上一筆交易的買家，只查這批有出現的 token 的最後一筆
+        df = df.sort_values(by='DateTime (UTC)', kind='stable')
+        token_ids = df['Token ID'].drop_duplicates().tolist()
+        latest_sales = {}
+
+        # 查詢失敗一定要往上丟：當成沒有上一筆寫進去，這批每個 token 第一筆的賣家和上一手價格會永遠是 NULL，
+        # 賣家統計、已實現損益和轉售排行榜都會跟著錯，之後也沒有東西會重算
+        if token_ids:
+            sql = f"""
+            SELECT token_id, buyer_id, price
+            FROM (
+                SELECT token_id, buyer_id, price,
+                    ROW_NUMBER() OVER (PARTITION BY token_id ORDER BY time DESC, transaction_id DESC) AS rn
+                FROM transactions
+                WHERE token_id IN ({', '.join(['%s'] * len(token_ids))})
+            ) latest
+            WHERE rn = 1
+            """
+            # fetch_all 出錯時回傳空的結果，和「都沒有上一筆」分不出來，所以用 execute 判斷
+            cursor = self.db.execute(sql, token_ids)
+            if cursor is None:
+                raise RuntimeError("Could not retrieve previous sales for this batch's tokens.")
+            latest_sales = {token_id: (buyer_id, price) for token_id, buyer_id, price in cursor.fetchall()}
+            print(f"Previous sales retrieved for {len(latest_sales)} tokens.")
+
+        by_token = df.groupby('Token ID')
+        seller_id = by_token['buyer_id'].shift(1).fillna(
+            df['Token ID'].map(lambda token_id: latest_sales.get(token_id, (None, None))[0])
+        )
+        previous_price = by_token['Price'].shift(1).fillna(
+            df['Token ID'].map(lambda token_id: latest_sales.get(token_id, (None, None))[1])
+        )
+
+        df['seller_id'] = seller_id.astype('Int64').astype(object).where(seller_id.notna(), None)
+        df['previous_price'] = previous_price.astype(object).where(previous_price.notna(), None)
+        return df
+
     def load_from_s3(self, key):
         try:
             response = self.s3_client.get_object(Bucket=os.getenv('BUCKET_NAME'), Key=key)
@@ -417,16 +417,9 @@ async function fetchTokenTransactions() {
     tokenDetailsEl.classList.remove("hidden");
     tokenChartEl.classList.remove("hidden");
 
-    const response = await fetch(
-      `${BASE_URL}/token-transaction?token_id=${tokenIdInt}&interval=${interval}`
-    );
-    if (!response.ok) {
-      throw new Error(`Failed to fetch token transactions: ${response.status}`);
-    }
-
-    const data = await response.json();
+    const data = { data: await fetchAllTokenTransactions(tokenIdInt, interval) };
 
-    if (!data.data || data.data.length === 0) {
+    if (data.data.length === 0) {
       emptyText.classList.remove("hidden");
       return;
     }
@@ -473,6 +466,26 @@ async function fetchTokenTransactions() {
   }
 }
 
+// API 一頁最多 1000 筆，依 next_cursor 取完整段歷史
+async function fetchAllTokenTransactions(tokenId, interval) {
+  const transactions = [];
+  let cursor = null;
+  do {
+    const cursorParam = cursor ? `&cursor=${encodeURIComponent(cursor)}` : "";
+    const response = await fetch(
+      `${BASE_URL}/token-transaction?token_id=${tokenId}&interval=${interval}${cursorParam}`
+    );
+    if (!response.ok) {
+      throw new Error(`Failed to fetch token transactions: ${response.status}`);
+    }
+
+    const page = await response.json();
+    transactions.push(...(page.data || []));
+    cursor = page.next_cursor;
+  } while (cursor);
+  return transactions;
+}
+
 async function fetchNFTDetails(tokenId) {
   try {
     const response = await fetch(`${BASE_URL}/nft-details?token_id=${tokenId}`);
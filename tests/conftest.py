@@ -0,0 +1,5 @@
+import os
+
+# src.api.db.database 在 import 時就建 engine，測試不連 MySQL，給個位址讓網址組得起來即可
+for name, value in (('DB_USER', 'test'), ('DB_PASSWORD', 'test'), ('DB_HOST', 'localhost'), ('DB_PORT', '3306'), ('DB_NAME', 'bayc')):
+    os.environ.setdefault(name, value)
@@ -0,0 +1,105 @@
+import asyncio, contextlib
+import pytest
+import src.api.cache as cache
+from src.api.singleflight import SingleFlight
+
+CALLERS = 50
+
+class CountingCompute:
+    # 假的查詢：記錄被呼叫幾次，等一下才回傳，讓所有呼叫端都在它跑完前到達
+    def __init__(self, delay=0.05):
+        self.calls = 0
+        self.delay = delay
+
+    async def __call__(self, value):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return {'value': value, 'call': self.calls}
+
+@pytest.fixture
+def fresh_cache(monkeypatch):
+    response_cache = cache.ResponseCache(max_entries=16, max_bytes=1 << 20, ttl_seconds=60, version_check_seconds=60)
+    response_cache._version = 1
+
+    async def sync_version(db=None):
+        pass
+
+    monkeypatch.setattr(response_cache, 'sync_version', sync_version)
+    monkeypatch.setattr(cache, 'response_cache', response_cache)
+    monkeypatch.setattr(cache, 'query_flights', SingleFlight())
+    monkeypatch.setattr(cache, 'AsyncSessionLocal', contextlib.nullcontext)
+    return response_cache
+
+def test_single_flight_runs_concurrent_calls_once():
+    flights = SingleFlight()
+    compute = CountingCompute()
+
+    async def run():
+        return await asyncio.gather(*[flights.do('key', lambda: compute('a')) for _ in range(CALLERS)])
+
+    results = asyncio.run(run())
+    assert compute.calls == 1
+    assert all(result == {'value': 'a', 'call': 1} for result, _ in results)
+    assert sum(not joined for _, joined in results) == 1
+    assert flights.stats() == {'inflight': 0, 'calls': 1, 'coalesced': CALLERS - 1}
+
+def test_single_flight_runs_again_after_finishing():
+    flights = SingleFlight()
+    compute = CountingCompute(delay=0)
+
+    async def run():
+        first, _ = await flights.do('key', lambda: compute('a'))
+        second, _ = await flights.do('key', lambda: compute('a'))
+        return first, second
+
+    assert asyncio.run(run()) == ({'value': 'a', 'call': 1}, {'value': 'a', 'call': 2})
+    assert compute.calls == 2
+
+def test_single_flight_keeps_keys_apart():
+    flights = SingleFlight()
+    compute = CountingCompute()
+
+    async def run():
+        return await asyncio.gather(*[flights.do(key, lambda key=key: compute(key)) for key in ('a', 'b') * 10])
+
+    results = asyncio.run(run())
+    assert compute.calls == 2
+    assert {result['value'] for result, _ in results} == {'a', 'b'}
+
+def test_cached_computes_concurrent_misses_once(fresh_cache):
+    compute = CountingCompute()
+
+    @cache.cached('time-based-data')
+    async def endpoint(interval: int, db=None):
+        return await compute(interval)
+
+    async def run():
+        return await asyncio.gather(*[endpoint(interval=0, db=None) for _ in range(CALLERS)])
+
+    responses = asyncio.run(run())
+    assert compute.calls == 1
+    assert {response.body for response in responses} == {b'{"value":0,"call":1}'}
+    assert len(fresh_cache._entries) == 1
+
+    # 之後的請求直接讀快取，不再計算
+    assert asyncio.run(endpoint(interval=0, db=None)).body == b'{"value":0,"call":1}'
+    assert compute.calls == 1
+
+def test_cached_skips_result_computed_under_an_older_version(fresh_cache):
+    compute = CountingCompute()
+
+    @cache.cached('time-based-data')
+    async def endpoint(interval: int, db=None):
+        return await compute(interval)
+
+    async def run():
+        request = asyncio.create_task(endpoint(interval=0, db=None))
+        await asyncio.sleep(compute.delay / 2)
+        # 計算途中 ETL 發布了新版本
+        fresh_cache.clear()
+        fresh_cache._version = 2
+        return await request
+
+    assert asyncio.run(run()).body == b'{"value":0,"call":1}'
+    assert len(fresh_cache._entries) == 0
+    assert fresh_cache.last_good(('time-based-data', ('interval', 0))) is None
@@ -0,0 +1,202 @@
+import asyncio
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal
+import pytest
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import StaticPool
+import src.api.aggregates as aggregates
+import src.api.db.models as db_models
+from src.api.db.database import Base
+from src.api.cache import response_cache
+from src.api.columnar import ColumnarEngine
+
+pytest.importorskip('aiosqlite')
+
+MARKETS = {1: 'OpenSea', 2: 'Blur'}
+ADDRESSES = {address_id: f'0x{address_id:040x}' for address_id in range(1, 7)}
+# (transaction_id, time, token_id, buyer_id, seller_id, market_id, price, previous_price)
+# 同額的買家（5、6）、同額的轉售（3、4）、同價的最高價（7、8），價格加總要進位到分
+SALES = [
+    (1, datetime(2024, 3, 1, 9), 1, 1, None, 1, '10.01', None),
+    (2, datetime(2024, 3, 1, 15, 30), 2, 2, None, 2, '33.33', None),
+    (3, datetime(2024, 3, 2), 1, 3, 1, 1, '20.01', '10.01'),
+    (4, datetime(2024, 3, 2, 12), 2, 4, 2, 1, '43.33', '33.33'),
+    (5, datetime(2024, 3, 2, 18), 3, 1, None, 2, '0.05', None),
+    (6, datetime(2024, 3, 3, 6), 1, 2, 3, 2, '20.01', '20.01'),
+    (7, datetime(2024, 3, 3, 7), 3, 5, 1, 1, '50.00', '0.05'),
+    (8, datetime(2024, 3, 3, 8), 4, 6, None, 1, '50.00', None),
+]
+# interval -> 排行榜區間的第一天；3 是全期間
+WINDOWS = {0: date(2024, 3, 2), 3: None}
+
+def transactions():
+    return [
+        db_models.Transaction(
+            transaction_id=transaction_id, transaction_hash=f'0x{transaction_id:064x}', time=time, token_id=token_id,
+            buyer_id=buyer_id, seller_id=seller_id, market_id=market_id, action_id=1,
+            price=Decimal(price), previous_price=Decimal(previous_price) if previous_price else None
+        )
+        for transaction_id, time, token_id, buyer_id, seller_id, market_id, price, previous_price in SALES
+    ]
+
+def rollups(rows):
+    # 和 ETL 一樣：同價時 max_price_token_id 取當天較早的一筆
+    days, market_days = {}, {}
+    for row in rows:
+        for stats, key in ((days, row.time.date()), (market_days, (row.time.date(), row.market_id))):
+            day = stats.setdefault(key, {'total_volume': Decimal(0), 'transaction_count': 0, 'min_price': row.price, 'max_price': row.price, 'max_price_token_id': row.token_id})
+            day['total_volume'] += row.price
+            day['transaction_count'] += 1
+            day['min_price'] = min(day['min_price'], row.price)
+            if row.price > day['max_price']:
+                day['max_price'], day['max_price_token_id'] = row.price, row.token_id
+    return (
+        [db_models.DailyStats(day=day, **stats) for day, stats in days.items()]
+        + [db_models.DailyMarketStats(day=day, market_id=market_id, **stats) for (day, market_id), stats in market_days.items()]
+    )
+
+def leaderboards(rows):
+    tables = []
+    for interval_id, window_start in WINDOWS.items():
+        in_window = [row for row in rows if window_start is None or row.time.date() >= window_start]
+        if window_start:
+            tables.append(db_models.LeaderboardWindow(interval_id=interval_id, window_start=window_start))
+        for role in ('buyer', 'seller'):
+            totals = defaultdict(lambda: [Decimal(0), 0])
+            for row in in_window:
+                address_id = row.buyer_id if role == 'buyer' else row.seller_id
+                if address_id is not None:
+                    totals[address_id][0] += row.price
+                    totals[address_id][1] += 1
+            tables += [
+                db_models.AddressLeaderboard(role=role, interval_id=interval_id, address_id=address_id, total_volume=volume, transaction_count=count)
+                for address_id, (volume, count) in totals.items()
+            ]
+        tables += [
+            db_models.ResaleLeaderboard(interval_id=interval_id, transaction_id=row.transaction_id, token_id=row.token_id, seller_id=row.seller_id, price_difference=row.price - row.previous_price)
+            for row in in_window if row.previous_price is not None and row.seller_id is not None
+        ]
+    return tables
+
+@pytest.fixture
+def database(monkeypatch):
+    engine = create_async_engine('sqlite+aiosqlite://', poolclass=StaticPool)
+    sessions = async_sessionmaker(bind=engine, expire_on_commit=False)
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with sessions() as db:
+            rows = transactions()
+            db.add_all([db_models.Market(id=market_id, name=name) for market_id, name in MARKETS.items()])
+            db.add_all([db_models.Address(id=address_id, address=address) for address_id, address in ADDRESSES.items()])
+            db.add_all([db_models.Action(id=1, name='Bought'), db_models.DataVersion(id=1, version=1, updated_at=datetime(2024, 3, 4))])
+            db.add_all(rows + rollups(rows) + leaderboards(rows))
+            await db.commit()
+
+    asyncio.run(setup())
+    # 每次 sync 都重新讀 data_version
+    monkeypatch.setattr(response_cache, 'version_check_seconds', 0)
+    response_cache.clear()
+    response_cache._version = None
+    yield sessions
+    response_cache._version = None
+    asyncio.run(engine.dispose())
+
+def run_both(sessions, query):
+    async def run():
+        engine = ColumnarEngine()
+        async with sessions() as db:
+            return await query(aggregates, db), await query(engine, db)
+    return asyncio.run(run())
+
+def as_tuples(rows):
+    return [tuple(row) for row in rows]
+
+@pytest.mark.parametrize('start_time', [None, datetime(2024, 3, 2), datetime(2024, 3, 1, 12), datetime(2024, 3, 2, 0, 0, 1), datetime(2024, 3, 5)])
+def test_time_based_totals_match(database, start_time):
+    sql, columnar = run_both(database, lambda engine, db: engine.time_based_totals(db, start_time))
+    assert columnar == sql
+    if start_time is None:
+        assert sql['total_volume'] == Decimal('226.74')
+        # 7 和 8 同價，取較早的 7（token 3）
+        assert (sql['highest_price_token_id'], sql['highest_price']) == (3, Decimal('50.00'))
+
+@pytest.mark.parametrize('start_time', [None, datetime(2024, 3, 1, 12), datetime(2024, 3, 3)])
+def test_marketplace_totals_match(database, start_time):
+    sql, columnar = run_both(database, lambda engine, db: engine.marketplace_totals(db, start_time))
+    assert columnar == sql
+
+@pytest.mark.parametrize('interval', list(WINDOWS))
+@pytest.mark.parametrize('role', ['buyer', 'seller'])
+@pytest.mark.parametrize('limit', [1, 2, 3, 10])
+def test_top_addresses_match(database, interval, role, limit):
+    sql, columnar = run_both(database, lambda engine, db: engine.top_addresses(db, role, interval, limit))
+    assert as_tuples(columnar) == as_tuples(sql)
+
+def test_top_addresses_tie_break(database):
+    # 同額時 address_id 大的在前；limit 切在同分之間也一樣
+    sql, columnar = run_both(database, lambda engine, db: engine.top_addresses(db, 'buyer', 3, 2))
+    expected = [(ADDRESSES[2], Decimal('53.34'), 2), (ADDRESSES[6], Decimal('50.00'), 1)]
+    assert as_tuples(sql) == as_tuples(columnar) == expected
+
+@pytest.mark.parametrize('interval', list(WINDOWS))
+@pytest.mark.parametrize('limit', [1, 2, 3, 10])
+def test_top_resales_match(database, interval, limit):
+    sql, columnar = run_both(database, lambda engine, db: engine.top_resales(db, interval, limit))
+    assert as_tuples(columnar) == as_tuples(sql)
+
+def test_top_resales_tie_break(database):
+    # 同額時 transaction_id 小的在前
+    sql, columnar = run_both(database, lambda engine, db: engine.top_resales(db, 3, 2))
+    expected = [(3, Decimal('49.95'), ADDRESSES[1]), (1, Decimal('10.00'), ADDRESSES[1])]
+    assert as_tuples(sql) == as_tuples(columnar) == expected
+
+def bump_version(sessions, rebuild=False):
+    async def run():
+        values = {'version': db_models.DataVersion.version + 1}
+        if rebuild:
+            values['rebuild_generation'] = db_models.DataVersion.rebuild_generation + 1
+        async with sessions() as db:
+            await db.execute(update(db_models.DataVersion).values(**values))
+            await db.commit()
+    asyncio.run(run())
+
+def test_sync_appends_and_reloads_only_on_rebuild(database):
+    engine = ColumnarEngine()
+
+    async def sync(change=None):
+        async with database() as db:
+            if change is not None:
+                await db.execute(change)
+                await db.commit()
+            await engine.sync(db)
+
+    asyncio.run(sync())
+    assert len(engine.transaction_id) == len(SALES)
+
+    # 沒有新資料的版本更新（例如只移動排行榜區間）不重載：改掉的舊列不會被讀回來
+    asyncio.run(sync(update(db_models.Transaction).where(db_models.Transaction.transaction_id == 1).values(price=Decimal('99.99'))))
+    bump_version(database)
+    asyncio.run(sync())
+    assert engine.version == 2
+    assert engine.price[0] == 1001
+
+    # 新的列照 transaction_id 接在後面
+    async def insert():
+        async with database() as db:
+            db.add(db_models.Transaction(transaction_id=9, transaction_hash='0x9', time=datetime(2024, 3, 4), token_id=5, buyer_id=1, market_id=1, action_id=1, price=Decimal('1.00')))
+            await db.commit()
+    asyncio.run(insert())
+    bump_version(database)
+    asyncio.run(sync())
+    assert list(engine.transaction_id) == list(range(1, 10))
+    assert engine.price[0] == 1001
+
+    # rebuild.py 改寫過舊列後會加 rebuild_generation，這時整個重載
+    bump_version(database, rebuild=True)
+    asyncio.run(sync())
+    assert list(engine.transaction_id) == list(range(1, 10))
+    assert engine.price[0] == 9999
@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.testclient import TestClient
+import src.api.cache as cache
+import src.api.conditional as conditional
+
+ANCHOR = datetime(2024, 3, 10, 15, tzinfo=timezone.utc)
+LOADED_AT = datetime(2024, 3, 10, 15, 20, 30)
+
+@pytest.fixture
+def app(monkeypatch):
+    response_cache = cache.ResponseCache(max_entries=16, max_bytes=1 << 20, ttl_seconds=60, version_check_seconds=60)
+    response_cache._version, response_cache.updated_at = 3, LOADED_AT
+
+    async def sync_version(db=None):
+        pass
+
+    monkeypatch.setattr(response_cache, 'sync_version', sync_version)
+    monkeypatch.setattr(conditional, 'response_cache', response_cache)
+    monkeypatch.setattr(conditional, 'window_anchor', lambda: ANCHOR)
+
+    app = FastAPI()
+    app.middleware('http')(conditional.conditional_get)
+    app.state.calls = 0
+    app.state.cache = response_cache
+
+    @app.get('/api/v1/time-based-data')
+    async def time_based_data(stale: bool = False):
+        app.state.calls += 1
+        return Response(b'{}', media_type='application/json', headers={'Warning': '110 - "Response is Stale"'} if stale else None)
+
+    @app.get('/api/v1/live')
+    async def live():
+        return Response(b'')
+
+    return app
+
+def test_first_response_carries_validators(app):
+    response = TestClient(app).get('/api/v1/time-based-data')
+    assert response.status_code == 200
+    assert response.headers['ETag'] == f'W/"3-{int(ANCHOR.timestamp())}"'
+    # 載入時間比錨點晚，Last-Modified 用載入時間
+    assert response.headers['Last-Modified'] == 'Sun, 10 Mar 2024 15:20:30 GMT'
+    assert response.headers['Cache-Control'].startswith('public, max-age=')
+
+@pytest.mark.parametrize('if_none_match', ['{etag}', 'W/"1-1", {etag}', '*'])
+def test_matching_etag_is_answered_with_304_before_the_endpoint(app, if_none_match):
+    client = TestClient(app)
+    etag = client.get('/api/v1/time-based-data').headers['ETag']
+    response = client.get('/api/v1/time-based-data', headers={'If-None-Match': if_none_match.format(etag=etag)})
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag
+    assert response.content == b''
+    assert app.state.calls == 1
+
+def test_etag_changes_after_a_data_version_bump(app):
+    client = TestClient(app)
+    etag = client.get('/api/v1/time-based-data').headers['ETag']
+    app.state.cache._version = 4
+    response = client.get('/api/v1/time-based-data', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] == f'W/"4-{int(ANCHOR.timestamp())}"' != etag
+
+@pytest.mark.parametrize('if_modified_since, status', [
+    ('Sun, 10 Mar 2024 15:20:30 GMT', 304),
+    ('Sun, 10 Mar 2024 16:00:00 GMT', 304),
+    ('Sun, 10 Mar 2024 15:20:29 GMT', 200),
+    # "-0000" 解析出來不帶時區，當成 UTC
+    ('Sun, 10 Mar 2024 15:20:30 -0000', 304),
+    ('Sun, 10 Mar 2024 15:20:29 -0000', 200),
+    ('Sun, 10 Mar 2024 23:20:30 +0800', 304),
+    ('not a date', 200),
+])
+def test_if_modified_since(app, if_modified_since, status):
+    response = TestClient(app).get('/api/v1/time-based-data', headers={'If-Modified-Since': if_modified_since})
+    assert response.status_code == status
+
+def test_if_none_match_wins_over_if_modified_since(app):
+    response = TestClient(app).get('/api/v1/time-based-data', headers={
+        'If-None-Match': 'W/"1-1"',
+        'If-Modified-Since': format_datetime(datetime.now(timezone.utc) + timedelta(days=1), usegmt=True),
+    })
+    assert response.status_code == 200
+
+def test_stale_response_gets_no_validators(app):
+    response = TestClient(app).get('/api/v1/time-based-data?stale=true')
+    assert response.status_code == 200
+    assert 'ETag' not in response.headers
+
+def test_unknown_version_and_other_paths_are_left_alone(app):
+    client = TestClient(app)
+    assert 'ETag' not in client.get('/api/v1/live').headers
+    app.state.cache._version = None
+    assert 'ETag' not in client.get('/api/v1/time-based-data', headers={'If-None-Match': '*'}).headers
+    assert app.state.calls == 1
@@ -0,0 +1,64 @@
+from datetime import date, datetime, timedelta, timezone
+import pytest
+import src.api.intervals as intervals
+from src.api.aggregates import split_at_day_boundary
+
+MIDNIGHT = datetime(2024, 3, 10, tzinfo=timezone.utc)
+
+def test_split_at_midnight_reads_only_rollups():
+    assert split_at_day_boundary(MIDNIGHT) == (date(2024, 3, 10), None)
+
+def test_split_one_second_after_midnight():
+    first_rollup_day, edge_end = split_at_day_boundary(MIDNIGHT + timedelta(seconds=1))
+    assert first_rollup_day == date(2024, 3, 11)
+    assert edge_end == datetime(2024, 3, 11, tzinfo=timezone.utc)
+
+def test_split_all_time():
+    assert split_at_day_boundary(None) == (None, None)
+
+def test_split_keeps_start_timezone():
+    start = datetime(2024, 3, 10, 15, 30, tzinfo=timezone(timedelta(hours=8)))
+    first_rollup_day, edge_end = split_at_day_boundary(start)
+    assert first_rollup_day == date(2024, 3, 11)
+    assert edge_end == datetime(2024, 3, 11, tzinfo=start.tzinfo)
+    assert edge_end.utcoffset() == timedelta(hours=8)
+
+def test_split_naive_start():
+    first_rollup_day, edge_end = split_at_day_boundary(datetime(2024, 3, 10, 0, 0, 1))
+    assert first_rollup_day == date(2024, 3, 11)
+    assert edge_end == datetime(2024, 3, 11) and edge_end.tzinfo is None
+
+@pytest.mark.parametrize('granularity, expected', [
+    ('minute', datetime(2024, 3, 10, 15, 42, tzinfo=timezone.utc)),
+    ('hour', datetime(2024, 3, 10, 15, tzinfo=timezone.utc)),
+    ('day', datetime(2024, 3, 10, tzinfo=timezone.utc)),
+])
+def test_window_anchor_floors_to_granularity(monkeypatch, granularity, expected):
+    monkeypatch.setattr(intervals, 'INTERVAL_GRANULARITY', granularity)
+    now = datetime(2024, 3, 10, 15, 42, 17, 123456, tzinfo=timezone.utc)
+    assert intervals.window_anchor(now) == expected
+    # 落在邊界上的時間就是自己的 anchor
+    assert intervals.window_anchor(expected) == expected
+    # 同一個區間裡的請求拿到同一個 anchor，下一個區間才換
+    step = intervals.GRANULARITIES[granularity]
+    assert intervals.window_anchor(expected + step - timedelta(microseconds=1)) == expected
+    assert intervals.window_anchor(expected + step) == expected + step
+
+@pytest.mark.parametrize('granularity', list(intervals.GRANULARITIES))
+def test_window_anchor_converts_other_timezones(monkeypatch, granularity):
+    monkeypatch.setattr(intervals, 'INTERVAL_GRANULARITY', granularity)
+    now = datetime(2024, 3, 10, 23, 42, 17, tzinfo=timezone(timedelta(hours=8)))
+    assert intervals.window_anchor(now) == intervals.window_anchor(now.astimezone(timezone.utc))
+
+@pytest.mark.parametrize('granularity', list(intervals.GRANULARITIES))
+def test_interval_start_is_anchor_minus_days(monkeypatch, granularity):
+    monkeypatch.setattr(intervals, 'INTERVAL_GRANULARITY', granularity)
+    now = datetime(2024, 3, 10, 15, 42, 17, tzinfo=timezone.utc)
+    for interval, days in intervals.INTERVAL_DAYS.items():
+        start = intervals.get_interval_date_range(interval, now)
+        assert start == (None if days is None else intervals.window_anchor(now) - timedelta(days=days))
+
+def test_day_granularity_windows_start_at_midnight(monkeypatch):
+    monkeypatch.setattr(intervals, 'INTERVAL_GRANULARITY', 'day')
+    start = intervals.get_interval_date_range(0, datetime(2024, 3, 10, 15, 42, tzinfo=timezone.utc))
+    assert split_at_day_boundary(start) == (date(2024, 3, 3), None)
@@ -0,0 +1,147 @@
+import asyncio, json
+from datetime import datetime, timedelta, timezone
+import httpx
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import StaticPool
+import src.api.db.models as db_models
+import src.api.moralis as moralis
+from src.api.db.database import Base
+
+pytest.importorskip('aiosqlite')
+
+WAITERS = 20
+
+class SqliteUpsert:
+    # MoralisClient 用 MySQL 的 ON DUPLICATE KEY UPDATE 存資料，測試的 SQLite 換成 ON CONFLICT DO UPDATE
+    def __init__(self, table):
+        self.table = table
+
+    def values(self, **row):
+        self.statement = sqlite.insert(self.table).values(**row)
+        self.inserted = self.statement.excluded
+        return self
+
+    def on_duplicate_key_update(self, **columns):
+        return self.statement.on_conflict_do_update(index_elements=['token_id'], set_=columns)
+
+class StubMoralis:
+    """Counts upstream calls and answers them after a short delay, so concurrent callers overlap."""
+
+    def __init__(self, status=200, body=None, error=None):
+        self.calls = 0
+        self.status = status
+        self.body = body
+        self.error = error
+
+    async def __call__(self, request):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        if self.error:
+            raise self.error
+        token_id = request.url.path.rsplit('/', 1)[1]
+        body = self.body if self.body is not None else {
+            'token_id': token_id,
+            'rarity_rank': 42,
+            'metadata': json.dumps({'image': f'ipfs://QmImage{token_id}'}),
+        }
+        return httpx.Response(self.status, json=body)
+
+@pytest.fixture
+def setup(monkeypatch):
+    engine = create_async_engine('sqlite+aiosqlite://', poolclass=StaticPool)
+    sessions = async_sessionmaker(bind=engine, expire_on_commit=False)
+
+    async def create():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create())
+    monkeypatch.setattr(moralis, 'AsyncSessionLocal', sessions)
+    monkeypatch.setattr(moralis, 'insert', SqliteUpsert)
+
+    def client(stub):
+        client = moralis.MoralisClient(base_url='http://moralis.test', api_key='key', ttl=timedelta(days=30), timeout=5, max_connections=5)
+        client._client = httpx.AsyncClient(base_url=client.base_url, transport=httpx.MockTransport(stub))
+        return client
+
+    yield client, sessions
+    asyncio.run(engine.dispose())
+
+async def lookup_all(client, sessions, token_id, count=WAITERS):
+    async def lookup():
+        async with sessions() as db:
+            return await client.get_metadata(db, token_id)
+    return await asyncio.gather(*[lookup() for _ in range(count)], return_exceptions=True)
+
+async def stored(sessions, token_id):
+    async with sessions() as db:
+        return await db.get(db_models.NFTMetadata, token_id)
+
+def test_concurrent_misses_share_one_upstream_call(setup):
+    make_client, sessions = setup
+    stub = StubMoralis()
+    client = make_client(stub)
+
+    async def run():
+        results = await lookup_all(client, sessions, 7)
+        return results, await stored(sessions, 7)
+
+    results, row = asyncio.run(run())
+    assert stub.calls == 1
+    assert {(result.token_id, result.image_url, result.rarity_rank) for result in results} == {(7, 'https://ipfs.io/ipfs/QmImage7', 42)}
+    assert (row.image_url, row.rarity_rank) == ('https://ipfs.io/ipfs/QmImage7', 42)
+    assert client._inflight == {}
+
+def test_stored_row_needs_no_upstream_call(setup):
+    make_client, sessions = setup
+    stub = StubMoralis()
+    client = make_client(stub)
+
+    async def run():
+        await lookup_all(client, sessions, 7, count=1)
+        results = await lookup_all(client, sessions, 7)
+        return results
+
+    results = asyncio.run(run())
+    assert stub.calls == 1
+    assert all(result.image_url == 'https://ipfs.io/ipfs/QmImage7' for result in results)
+
+def test_expired_row_is_fetched_again(setup):
+    make_client, sessions = setup
+    stub = StubMoralis()
+    client = make_client(stub)
+
+    async def run():
+        async with sessions() as db:
+            db.add(db_models.NFTMetadata(token_id=7, image_url='old', rarity_rank=1, fetched_at=datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=31)))
+            await db.commit()
+        results = await lookup_all(client, sessions, 7)
+        return results, await stored(sessions, 7)
+
+    results, row = asyncio.run(run())
+    assert stub.calls == 1
+    assert {result.image_url for result in results} == {row.image_url} == {'https://ipfs.io/ipfs/QmImage7'}
+
+@pytest.mark.parametrize('stub, status', [
+    (StubMoralis(status=503, body={}), 503),
+    (StubMoralis(body={'token_id': None}), 404),
+    (StubMoralis(error=httpx.ConnectError('connection refused')), 500),
+])
+def test_upstream_error_reaches_every_waiter(setup, stub, status):
+    make_client, sessions = setup
+    client = make_client(stub)
+
+    async def run():
+        results = await lookup_all(client, sessions, 7)
+        return results, await stored(sessions, 7)
+
+    results, row = asyncio.run(run())
+    assert stub.calls == 1
+    assert all(isinstance(result, HTTPException) and result.status_code == status for result in results)
+    assert row is None
+    # 失敗不會留在 in-flight 裡，下一個請求重新呼叫上游
+    asyncio.run(lookup_all(client, sessions, 7, count=1))
+    assert stub.calls == 2
@@ -0,0 +1,185 @@
+import asyncio, re, sqlite3
+from datetime import date, datetime
+from decimal import Decimal
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import Session
+import src.api.aggregates as aggregates
+import src.api.db.models as db_models
+from src.api.db.database import Base
+from src.etl.load import DataLoader
+
+pytest.importorskip('aiosqlite')
+
+# rollup 的主鍵，給 ON CONFLICT 用
+ROLLUP_KEYS = {'daily_stats': 'day', 'daily_market_stats': 'day, market_id'}
+UPSERT = re.compile(r'INSERT INTO (\w+) (\([^)]*\))\s*VALUES (\([^)]*\)) AS new\s*ON DUPLICATE KEY UPDATE', re.S)
+
+def to_sqlite(sql):
+    # ETL 的 MySQL 語法換成 SQLite 的對應寫法；ON DUPLICATE KEY UPDATE 的 SET 照順序算、參照的是還沒改的欄位，
+    # 和 SQLite ON CONFLICT DO UPDATE 一律讀舊值的結果相同
+    sql = UPSERT.sub(lambda match: f'INSERT INTO {match[1]} {match[2]} VALUES {match[3]} ON CONFLICT ({ROLLUP_KEYS[match[1]]}) DO UPDATE SET', sql)
+    sql = re.sub(r'\bnew\.', 'excluded.', sql)
+    for mysql, sqlite in (('IF(', 'IIF('), ('LEAST(', 'MIN('), ('GREATEST(', 'MAX(')):
+        sql = sql.replace(mysql, sqlite)
+    return sql.replace('%s', '?')
+
+def to_param(value):
+    # 和 SQLAlchemy 在 SQLite 存的格式一致，API 的時間比較才對得上
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S.%f')
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+class SqliteManager:
+    """DataBaseManager's interface over sqlite3, so DataLoader's own SQL runs in the tests."""
+
+    def __init__(self, path):
+        self.connection = sqlite3.connect(path)
+        self.cursor = self.connection.cursor()
+
+    def execute(self, sql, params=None):
+        return self.cursor.execute(to_sqlite(sql), [to_param(value) for value in params or ()])
+
+    def executemany(self, sql, params_list):
+        return self.cursor.executemany(to_sqlite(sql), [[to_param(value) for value in params] for params in params_list])
+
+    def fetch_one(self, sql, params=None):
+        return self.execute(sql, params).fetchone()
+
+    def fetch_all(self, sql, params=None):
+        return self.execute(sql, params).fetchall()
+
+    def commit(self):
+        self.connection.commit()
+        return True
+
+    def rollback(self):
+        self.connection.rollback()
+
+    def close(self):
+        self.connection.close()
+
+# (transaction_id, time, token_id, market_id, price)；transaction_id 隨時間遞增，和 ETL 寫入的順序一樣
+FIRST_BATCH = [
+    (1, datetime(2024, 3, 1, 9), 1, 1, '10.01'),
+    (2, datetime(2024, 3, 1, 15, 30), 2, 2, '80.00'),
+    (3, datetime(2024, 3, 1, 20), 3, 1, '33.33'),
+    (4, datetime(2024, 3, 2, 1), 4, 1, '5.55'),
+    (5, datetime(2024, 3, 2, 6), 5, 2, '60.00'),
+]
+# 第二批接著同一天：3/1 有和第一批同價的最高價（留較早的 token 2）、和上一批最後一筆同時間的收盤，3/2 有新的最高價
+SECOND_BATCH = [
+    (6, datetime(2024, 3, 1, 20), 6, 1, '12.34'),
+    (7, datetime(2024, 3, 1, 22), 7, 2, '80.00'),
+    (8, datetime(2024, 3, 2, 6), 8, 2, '60.00'),
+    (9, datetime(2024, 3, 2, 23, 59, 59), 9, 1, '99.99'),
+    (10, datetime(2024, 3, 3, 0, 0), 10, 1, '0.01'),
+    (11, datetime(2024, 3, 3, 12), 11, 2, '0.05'),
+]
+ROLLUP_COLUMNS = ('total_volume', 'transaction_count', 'min_price', 'max_price', 'max_price_token_id', 'open_price', 'open_time', 'close_price', 'close_time')
+
+def insert(engine, batch):
+    with Session(engine) as db:
+        db.add_all([
+            db_models.Transaction(
+                transaction_id=transaction_id, transaction_hash=f'0x{transaction_id:064x}', time=time, token_id=token_id,
+                buyer_id=1, market_id=market_id, action_id=1, price=Decimal(price)
+            )
+            for transaction_id, time, token_id, market_id, price in batch
+        ])
+        db.commit()
+
+def read_rollups(engine):
+    with Session(engine) as db:
+        return (
+            {row.day: tuple(getattr(row, column) for column in ROLLUP_COLUMNS) for row in db.query(db_models.DailyStats)},
+            {(row.day, row.market_id): tuple(getattr(row, column) for column in ROLLUP_COLUMNS) for row in db.query(db_models.DailyMarketStats)},
+        )
+
+def expected_rollups(sales, key):
+    # 直接從全部交易算：同價取較早的一筆，開盤是最早、收盤是最晚（同時間取 transaction_id 大的）
+    groups = {}
+    for sale in sorted(sales, key=lambda sale: (sale[1], sale[0])):
+        groups.setdefault(key(sale), []).append(sale)
+    rollups = {}
+    for group_key, group in groups.items():
+        prices = [Decimal(sale[4]) for sale in group]
+        highest = next(sale for sale in group if Decimal(sale[4]) == max(prices))
+        rollups[group_key] = (
+            sum(prices), len(group), min(prices), max(prices), highest[2],
+            Decimal(group[0][4]), group[0][1], Decimal(group[-1][4]), group[-1][1],
+        )
+    return rollups
+
+@pytest.fixture(scope='module')
+def database(tmp_path_factory):
+    path = tmp_path_factory.mktemp('rollups') / 'etl.db'
+    engine = create_engine(f'sqlite:///{path}')
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add_all([db_models.Address(id=1, address='0x' + '1' * 40), db_models.Action(id=1, name='Bought')])
+        db.add_all([db_models.Market(id=1, name='OpenSea'), db_models.Market(id=2, name='Blur')])
+        db.commit()
+
+    # 兩批分開寫入，每批照 pipeline 的做法用寫入前的最大 transaction_id 增量合併
+    loader = DataLoader(db=SqliteManager(str(path)))
+    for batch in (FIRST_BATCH, SECOND_BATCH):
+        since_transaction_id = loader.db.fetch_one("SELECT COALESCE(MAX(transaction_id), 0) FROM transactions")[0]
+        insert(engine, batch)
+        loader.update_daily_rollups(since_transaction_id)
+    incremental = read_rollups(engine)
+
+    loader.rebuild_daily_rollups()
+    rebuilt = read_rollups(engine)
+    loader.close_connection()
+    yield path, incremental, rebuilt
+    engine.dispose()
+
+def test_incremental_rollups_match_raw_transactions(database):
+    _, (daily, market), _ = database
+    sales = FIRST_BATCH + SECOND_BATCH
+    assert daily == expected_rollups(sales, lambda sale: sale[1].date())
+    assert market == expected_rollups(sales, lambda sale: (sale[1].date(), sale[3]))
+
+def test_incremental_rollups_match_rebuild(database):
+    _, incremental, rebuilt = database
+    assert incremental == rebuilt
+
+def raw_totals(start_time):
+    sales = [sale for sale in FIRST_BATCH + SECOND_BATCH if start_time is None or sale[1] >= start_time]
+    total_volume = sum((Decimal(sale[4]) for sale in sales), Decimal(0))
+    highest = min(sales, key=lambda sale: (-Decimal(sale[4]), sale[1], sale[0]))
+    return total_volume, len(sales), highest[2], Decimal(highest[4])
+
+@pytest.mark.parametrize('start_time', [
+    None,
+    datetime(2024, 3, 1),
+    datetime(2024, 3, 1, 15, 30),
+    datetime(2024, 3, 1, 20),
+    datetime(2024, 3, 1, 20, 0, 1),
+    datetime(2024, 3, 2, 6),
+    datetime(2024, 3, 2, 23, 59, 59),
+])
+def test_time_based_totals_match_raw_transactions(database, start_time):
+    path, _, _ = database
+    engine = create_async_engine(f'sqlite+aiosqlite:///{path}')
+
+    async def run():
+        async with async_sessionmaker(bind=engine)() as db:
+            totals = await aggregates.time_based_totals(db, start_time)
+            markets = await aggregates.marketplace_totals(db, start_time)
+        await engine.dispose()
+        return totals, markets
+
+    totals, markets = asyncio.run(run())
+    total_volume, transaction_count, highest_token_id, highest_price = raw_totals(start_time)
+    assert (totals['total_volume'], totals['transaction_count']) == (total_volume, transaction_count)
+    assert (totals['highest_price_token_id'], totals['highest_price']) == (highest_token_id, highest_price)
+    assert sum(market['total_volume'] for market in markets) == total_volume
+    assert sum(market['transaction_count'] for market in markets) == transaction_count
@@ -0,0 +1,108 @@
+import asyncio, time
+from datetime import datetime, timedelta
+from decimal import Decimal
+import httpx
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+import src.api.aggregates as aggregates
+import src.api.cache as cache
+import src.api.db.models as db_models
+import src.api.main as main
+from src.api.db.database import Base
+from src.api.singleflight import SingleFlight
+
+pytest.importorskip('aiosqlite')
+
+TOKENS = 200
+FAST_REQUESTS = 200
+FAST_CONCURRENCY = 8
+SLOW_REQUESTS = 4
+SLOW_QUERY_SECONDS = 2
+# 代替全期間的轉售排行榜查詢：在連線的執行緒裡等 2 秒、不佔 CPU，就像在等遠端的 MySQL
+SLOW_QUERY = text(f"SELECT sleep({SLOW_QUERY_SECONDS})")
+
+@pytest.fixture
+def api(monkeypatch, tmp_path):
+    # 檔案資料庫，每條連線各有自己的 aiosqlite 執行緒，慢查詢不會卡住其他連線
+    engine = create_async_engine(f'sqlite+aiosqlite:///{tmp_path / "api.db"}')
+    sessions = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+    @event.listens_for(engine.sync_engine, 'connect')
+    def add_sleep(dbapi_connection, connection_record):
+        dbapi_connection.create_function('sleep', 1, time.sleep)
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with sessions() as db:
+            db.add_all([db_models.Address(id=1, address='0x' + '1' * 40), db_models.Market(id=1, name='OpenSea'), db_models.Action(id=1, name='Bought')])
+            db.add(db_models.DataVersion(id=1, version=1, updated_at=datetime(2024, 3, 1)))
+            db.add_all([
+                db_models.Transaction(
+                    transaction_id=index + 1, transaction_hash=f'0x{index:064x}', time=datetime.utcnow() - timedelta(hours=index),
+                    token_id=index % TOKENS, buyer_id=1, market_id=1, action_id=1, price=Decimal('10.00')
+                )
+                for index in range(TOKENS * 5)
+            ])
+            await db.commit()
+
+    async def slow_top_resales(db, interval, limit):
+        await db.execute(SLOW_QUERY)
+        return []
+
+    asyncio.run(setup())
+    # 快取全部不命中，每個請求都真的查資料庫
+    monkeypatch.setattr(cache, 'response_cache', cache.ResponseCache(max_entries=0, max_bytes=0, ttl_seconds=0, version_check_seconds=60))
+    monkeypatch.setattr(cache, 'query_flights', SingleFlight())
+    monkeypatch.setattr(cache, 'AsyncSessionLocal', sessions)
+    monkeypatch.setattr(main, 'AsyncSessionLocal', sessions)
+    monkeypatch.setattr(aggregates, 'top_resales', slow_top_resales)
+    yield main.app
+    asyncio.run(engine.dispose())
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+async def measure(app, slow_requests):
+    """Return the fast and slow request latencies in seconds and when the last fast request finished."""
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test') as client:
+        fast, slow = [], []
+        paths = iter(f'/api/v1/token-transaction?token_id={index % TOKENS}&interval=3&limit=20' for index in range(FAST_REQUESTS))
+
+        async def fast_client():
+            for path in paths:
+                started = time.perf_counter()
+                response = await client.get(path)
+                fast.append(time.perf_counter() - started)
+                assert response.status_code == 200
+
+        async def slow_request(limit):
+            started = time.perf_counter()
+            response = await client.get(f'/api/v1/top-resale-token?interval=3&limit={limit}')
+            slow.append(time.perf_counter() - started)
+            assert response.status_code == 200
+
+        fast_tasks = [asyncio.create_task(fast_client()) for _ in range(FAST_CONCURRENCY)]
+        # 快的請求已經在跑了，慢查詢才進來
+        await asyncio.sleep(0.05)
+        slow_tasks = [asyncio.create_task(slow_request(limit)) for limit in range(1, slow_requests + 1)]
+        await asyncio.gather(*fast_tasks)
+        fast_done = time.perf_counter()
+        await asyncio.gather(*slow_tasks)
+        return fast, slow, fast_done
+
+def test_slow_query_does_not_hold_up_fast_requests(api):
+    async def run():
+        baseline, _, _ = await measure(api, 0)
+        started = time.perf_counter()
+        fast, slow, fast_done = await measure(api, SLOW_REQUESTS)
+        return baseline, fast, slow, fast_done - started
+
+    baseline, fast, slow, fast_seconds = asyncio.run(run())
+    assert min(slow) >= SLOW_QUERY_SECONDS
+    # 快的請求全部在慢查詢回來之前就做完，沒有一個等到慢查詢，p95 和沒有慢查詢時差不多：事件迴圈沒有被等 SQL 的請求卡住
+    assert fast_seconds < SLOW_QUERY_SECONDS
+    assert max(fast) < SLOW_QUERY_SECONDS / 4
+    assert percentile(fast, 95) < max(3 * percentile(baseline, 95), 0.05)
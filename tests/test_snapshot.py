@@ -0,0 +1,78 @@
+import os, asyncio, json
+from decimal import Decimal
+import numpy as np
+import pytest
+import src.api.aggregates as aggregates
+import src.api.cache as cache
+import src.api.snapshot as snapshot
+from src.api.snapshot import SnapshotEngine, Resale, MAGIC, HEADER, INDEX_ENTRY, HOURLY_STATS_DTYPE, HOURLY_MARKET_STATS_DTYPE
+
+SNAPSHOT_RESALES = [[7, '120.50', '0xseller']]
+SQL_RESALES = [Resale(9, Decimal('1.00'), '0xsql')]
+
+def write_snapshot(path, version):
+    # 和 ETL 寫出的格式相同，只放 top_resales 需要的 section
+    sections = {
+        'hourly_stats': np.zeros(0, HOURLY_STATS_DTYPE).tobytes(),
+        'hourly_market_stats': np.zeros(0, HOURLY_MARKET_STATS_DTYPE).tobytes(),
+        'markets': b'{}',
+        'top_resales/1': json.dumps(SNAPSHOT_RESALES).encode(),
+    }
+    offset = HEADER.size + INDEX_ENTRY.size * len(sections)
+    index, body = [], []
+    for name, payload in sections.items():
+        padding = -offset % 8
+        body.append(b'\0' * padding + payload)
+        offset += padding
+        index.append(INDEX_ENTRY.pack(name.encode(), offset, len(payload)))
+        offset += len(payload)
+    # 和 ETL 一樣換檔而不是覆寫，舊的 mmap 還指著舊檔
+    temp_path = path.with_suffix('.tmp')
+    temp_path.write_bytes(HEADER.pack(MAGIC, version, 0, len(sections)) + b''.join(index) + b''.join(body))
+    os.replace(temp_path, path)
+
+@pytest.fixture
+def data_version(monkeypatch):
+    # data_version 由測試直接指定，不查資料庫
+    response_cache = cache.ResponseCache(max_entries=16, max_bytes=1 << 20, ttl_seconds=60, version_check_seconds=60)
+
+    async def sync_version(db=None):
+        pass
+
+    async def top_resales(db, interval, limit):
+        return SQL_RESALES
+
+    monkeypatch.setattr(response_cache, 'sync_version', sync_version)
+    monkeypatch.setattr(snapshot, 'response_cache', response_cache)
+    monkeypatch.setattr(aggregates, 'top_resales', top_resales)
+    return response_cache
+
+def test_serves_snapshot_matching_data_version(tmp_path, data_version):
+    path = tmp_path / 'analytics.snapshot'
+    write_snapshot(path, version=3)
+    data_version._version = 3
+    engine = SnapshotEngine(str(path), check_seconds=0)
+
+    assert asyncio.run(engine.top_resales(None, 1, 10)) == [Resale(7, Decimal('120.50'), '0xseller')]
+
+def test_falls_back_to_sql_until_snapshot_catches_up(tmp_path, data_version):
+    # ETL 已經 bump data_version、快照還沒發布（或沒設定 SNAPSHOT_PATH）：不能回上一版的資料
+    path = tmp_path / 'analytics.snapshot'
+    write_snapshot(path, version=3)
+    data_version._version = 4
+    engine = SnapshotEngine(str(path), check_seconds=0)
+
+    assert asyncio.run(engine.top_resales(None, 1, 10)) == SQL_RESALES
+
+    write_snapshot(path, version=4)
+    assert asyncio.run(engine.top_resales(None, 1, 10)) == [Resale(7, Decimal('120.50'), '0xseller')]
+
+def test_cache_version_comes_from_data_version(tmp_path, data_version):
+    # 快照只決定自己能不能用，回應快取的版本（和 ETag）仍然是 data_version
+    path = tmp_path / 'analytics.snapshot'
+    write_snapshot(path, version=5)
+    data_version._version = 4
+    engine = SnapshotEngine(str(path), check_seconds=0)
+
+    asyncio.run(engine.top_resales(None, 1, 10))
+    assert data_version.version == 4
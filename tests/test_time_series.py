@@ -0,0 +1,110 @@
+import asyncio
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import StaticPool
+import src.api.aggregates as aggregates
+import src.api.db.models as db_models
+from src.api.db.database import Base
+
+pytest.importorskip('aiosqlite')
+
+# 2024-01-01（星期一）到 2024-03-31，每 13 小時一筆，價格和 token 輪著變，有的日子一筆、有的兩筆
+FIRST_SALE = datetime(2024, 1, 1, 3)
+SALES = [
+    (index + 1, FIRST_SALE + timedelta(hours=13 * index), index % 37, Decimal(1000 + index * 7919 % 50000) / 100)
+    for index in range(166)
+]
+
+def daily_stats():
+    days = {}
+    for transaction_id, time, token_id, price in SALES:
+        day = days.get(time.date())
+        if day is None:
+            days[time.date()] = day = db_models.DailyStats(
+                day=time.date(), total_volume=Decimal(0), transaction_count=0, min_price=price, max_price=price,
+                max_price_token_id=token_id, open_price=price, open_time=time
+            )
+        day.total_volume += price
+        day.transaction_count += 1
+        day.min_price = min(day.min_price, price)
+        if price > day.max_price:
+            day.max_price, day.max_price_token_id = price, token_id
+        day.close_price, day.close_time = price, time
+    return list(days.values())
+
+@pytest.fixture
+def sessions():
+    engine = create_async_engine('sqlite+aiosqlite://', poolclass=StaticPool)
+    sessions = async_sessionmaker(bind=engine, expire_on_commit=False)
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with sessions() as db:
+            db.add_all([db_models.Address(id=1, address='0x' + '1' * 40), db_models.Market(id=1, name='OpenSea'), db_models.Action(id=1, name='Bought')])
+            db.add_all([
+                db_models.Transaction(
+                    transaction_id=transaction_id, transaction_hash=f'0x{transaction_id:064x}', time=time, token_id=token_id,
+                    buyer_id=1, market_id=1, action_id=1, price=price
+                )
+                for transaction_id, time, token_id, price in SALES
+            ])
+            db.add_all(daily_stats())
+            await db.commit()
+
+    asyncio.run(setup())
+    yield sessions
+    asyncio.run(engine.dispose())
+
+def raw_sales(start, end):
+    return [(time, token_id, price) for _, time, token_id, price in SALES if start <= time.date() <= end]
+
+RANGES = [
+    (date(2024, 1, 1), date(2024, 3, 31)),
+    # 從星期三開始、在星期五結束：第一週和最後一週都不完整
+    (date(2024, 1, 10), date(2024, 2, 16)),
+    # 從月中開始、在月中結束
+    (date(2024, 1, 15), date(2024, 3, 14)),
+    (date(2024, 2, 29), date(2024, 2, 29)),
+    (date(2023, 12, 1), date(2024, 1, 2)),
+]
+
+@pytest.mark.parametrize('bucket', aggregates.BUCKETS)
+@pytest.mark.parametrize('start, end', RANGES)
+def test_buckets_sum_to_raw_totals(sessions, bucket, start, end):
+    async def run():
+        async with sessions() as db:
+            return await aggregates.time_series(db, start, end, bucket)
+
+    series = asyncio.run(run())
+    sales = raw_sales(start, end)
+    assert sum(point['total_volume'] for point in series) == sum(price for _, _, price in sales)
+    assert sum(point['transaction_count'] for point in series) == len(sales)
+
+    # 每個 bucket 只含 start 到 end 之間、屬於它的那幾天
+    for point in series:
+        in_bucket = [sale for sale in sales if aggregates.bucket_start(sale[0].date(), bucket) == point['bucket_start']]
+        prices = [price for _, _, price in in_bucket]
+        assert (point['total_volume'], point['transaction_count']) == (sum(prices), len(prices))
+        assert (point['min_price'], point['max_price']) == (min(prices), max(prices))
+        assert point['max_price_token_id'] == next(token_id for _, token_id, price in in_bucket if price == max(prices))
+        assert (point['open_price'], point['close_price']) == (prices[0], prices[-1])
+        assert point['average_price'] == point['total_volume'] / point['transaction_count']
+    assert [point['bucket_start'] for point in series] == sorted({aggregates.bucket_start(sale[0].date(), bucket) for sale in sales})
+
+@pytest.mark.parametrize('bucket', aggregates.BUCKETS)
+@pytest.mark.parametrize('start', [date(2024, 1, 1), date(2024, 1, 10), date(2024, 2, 29), date(2024, 3, 25)])
+def test_buckets_match_time_based_totals(sessions, bucket, start):
+    # 到最後一筆交易為止的序列，加總起來要和 time-based-data 從 start 00:00 起算的結果一樣
+    end = SALES[-1][1].date()
+
+    async def run():
+        async with sessions() as db:
+            return await aggregates.time_series(db, start, end, bucket), await aggregates.time_based_totals(db, datetime.combine(start, datetime.min.time()))
+
+    series, totals = asyncio.run(run())
+    assert sum(point['total_volume'] for point in series) == totals['total_volume']
+    assert sum(point['transaction_count'] for point in series) == totals['transaction_count']
+    assert max(point['max_price'] for point in series) == totals['highest_price']
@@ -0,0 +1,102 @@
+import asyncio
+from datetime import datetime, timedelta
+from decimal import Decimal
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import StaticPool
+import src.api.cache as cache
+import src.api.db.models as db_models
+import src.api.main as main
+from src.api.db.database import Base
+from src.api.pagination import encode_cursor
+from src.api.singleflight import SingleFlight
+
+pytest.importorskip('aiosqlite')
+
+TOKEN_ID = 7
+NOW = datetime.utcnow().replace(microsecond=0)
+# 五個時間點各四筆：同一個 time 的多筆要靠 transaction_id 分頁，不能漏也不能重複
+SALES = [
+    (transaction_id, NOW - timedelta(hours=transaction_id // 4))
+    for transaction_id in range(1, 21)
+]
+
+def expected_hashes():
+    return [f'0x{transaction_id:064x}' for transaction_id, _ in sorted(SALES, key=lambda sale: (sale[1], sale[0]), reverse=True)]
+
+@pytest.fixture
+def client(monkeypatch):
+    engine = create_async_engine('sqlite+aiosqlite://', poolclass=StaticPool)
+    sessions = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with sessions() as db:
+            db.add_all([db_models.Address(id=1, address='0x' + '1' * 40), db_models.Market(id=1, name='OpenSea'), db_models.Action(id=1, name='Bought')])
+            db.add(db_models.DataVersion(id=1, version=1, updated_at=NOW))
+            db.add_all([
+                db_models.Transaction(
+                    transaction_id=transaction_id, transaction_hash=f'0x{transaction_id:064x}', time=time,
+                    token_id=TOKEN_ID, buyer_id=1, market_id=1, action_id=1, price=Decimal(transaction_id)
+                )
+                for transaction_id, time in SALES
+            ])
+            await db.commit()
+
+    asyncio.run(setup())
+    monkeypatch.setattr(cache, 'response_cache', cache.ResponseCache(max_entries=16, max_bytes=1 << 20, ttl_seconds=60, version_check_seconds=60))
+    monkeypatch.setattr(cache, 'query_flights', SingleFlight())
+    monkeypatch.setattr(cache, 'AsyncSessionLocal', sessions)
+    monkeypatch.setattr(main, 'AsyncSessionLocal', sessions)
+    yield TestClient(main.app)
+    asyncio.run(engine.dispose())
+
+def url(**params):
+    return '/api/v1/token-transaction?' + '&'.join(f'{name}={value}' for name, value in {'token_id': TOKEN_ID, 'interval': 3, **params}.items())
+
+@pytest.mark.parametrize('limit', [1, 3, 4, 7, 20])
+def test_next_cursor_pages_through_equal_times(client, limit):
+    hashes, cursor, pages = [], None, 0
+    while True:
+        response = client.get(url(limit=limit, **({'cursor': cursor} if cursor else {})))
+        assert response.status_code == 200
+        body = response.json()
+        hashes += [row['transaction_hash'] for row in body['data']]
+        pages += 1
+        cursor = body['next_cursor']
+        if cursor is None:
+            break
+    assert hashes == expected_hashes()
+    assert pages == -(-len(SALES) // limit)
+
+def test_json_without_limit_pages_at_max_page_size(client, monkeypatch):
+    monkeypatch.setattr(main, 'MAX_PAGE_SIZE', 8)
+    first = client.get(url()).json()
+    assert len(first['data']) == 8 and first['next_cursor']
+    second = client.get(url(cursor=first['next_cursor'])).json()
+    assert [row['transaction_hash'] for row in first['data'] + second['data']] == expected_hashes()[:16]
+
+@pytest.mark.parametrize('cursor', ['not-a-cursor', encode_cursor(NOW, 1)[:-3] + '!!!', 'MjAyNC0wMS0wMXxhYmM'])
+def test_malformed_cursor_is_rejected(client, cursor):
+    response = client.get(url(limit=5, cursor=cursor))
+    assert response.status_code == 400
+    assert 'Invalid cursor' in response.json()['detail']
+
+def test_ndjson_page_sets_next_cursor_header(client):
+    lines, cursor = [], None
+    while True:
+        response = client.get(url(limit=6, format='ndjson', **({'cursor': cursor} if cursor else {})))
+        assert response.status_code == 200
+        assert response.headers['content-type'].startswith('application/x-ndjson')
+        lines += response.text.splitlines()
+        cursor = response.headers.get('X-Next-Cursor')
+        if cursor is None:
+            break
+    assert [main.api_models.TokenTransactionData.model_validate_json(line).transaction_hash for line in lines] == expected_hashes()
+
+def test_ndjson_without_limit_streams_everything(client):
+    response = client.get(url(format='ndjson'))
+    assert 'X-Next-Cursor' not in response.headers
+    assert len(response.text.splitlines()) == len(SALES)